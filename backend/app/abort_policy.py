@@ -0,0 +1,141 @@
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+# k6 thresholds in the builder script are only evaluated at the end of the
+# run. An abort policy watches k6's live metrics through its REST API
+# (``k6 run --address``) and stops the run through the same API, which lets
+# k6 finish gracefully: outputs are flushed and the summary is still written.
+K6_ABORT_POLL_SECONDS = float(os.getenv("K6_ABORT_POLL_SECONDS", "2"))
+K6_ABORT_ERROR_RATE = os.getenv("K6_ABORT_ERROR_RATE", "")
+K6_ABORT_P95_MS = os.getenv("K6_ABORT_P95_MS", "")
+# A rule must be breached on every poll for this long before the run stops.
+K6_ABORT_FOR_SECONDS = float(os.getenv("K6_ABORT_FOR_SECONDS", "10"))
+# Polls during warm-up are ignored.
+K6_ABORT_GRACE_SECONDS = float(os.getenv("K6_ABORT_GRACE_SECONDS", "10"))
+
+
+def abort_policy(error_rate=None, p95_ms=None, for_seconds=None, grace_seconds=None) -> dict | None:
+    """Request overrides merged over the ``K6_ABORT_*`` defaults; None without a rule."""
+    policy = {
+        "error_rate": error_rate if error_rate is not None else (float(K6_ABORT_ERROR_RATE) if K6_ABORT_ERROR_RATE else None),
+        "p95_ms": p95_ms if p95_ms is not None else (float(K6_ABORT_P95_MS) if K6_ABORT_P95_MS else None),
+        "for_seconds": for_seconds if for_seconds is not None else K6_ABORT_FOR_SECONDS,
+        "grace_seconds": grace_seconds if grace_seconds is not None else K6_ABORT_GRACE_SECONDS,
+    }
+    if policy["error_rate"] is None and policy["p95_ms"] is None:
+        return None
+    return policy
+
+
+def free_address() -> str:
+    """A loopback ``host:port`` for k6's REST API that no other run is using."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"127.0.0.1:{sock.getsockname()[1]}"
+
+
+def _sample(metrics: dict, name: str) -> dict:
+    for item in metrics.get("data", []):
+        if item.get("id") == name:
+            return (item.get("attributes") or {}).get("sample") or {}
+    return {}
+
+
+class AbortWatcher:
+    """Poll a running k6 (``run_supervisor.K6Process``) and stop it when ``policy`` is breached.
+
+    ``start()`` after k6 is spawned with ``--address``, ``await stop()`` once
+    it exits; ``stop`` returns the abort record, or None if the run was not
+    aborted.
+
+    The error rate is measured per poll interval (failed checks among the
+    requests completed since the previous poll); p95 is k6's running p95.
+    """
+
+    def __init__(self, proc, address: str, policy: dict, interval: float = K6_ABORT_POLL_SECONDS):
+        self.proc = proc
+        self.address = address
+        self.policy = policy
+        self.interval = interval
+        self.aborted = None
+        self._task = None
+        self._started = None
+        self._last = None
+        self._breach_since: dict[str, float] = {}
+
+    def start(self) -> None:
+        self._started = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> dict | None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        return self.aborted
+
+    async def _run(self) -> None:
+        async with httpx.AsyncClient(base_url=f"http://{self.address}", timeout=self.interval) as client:
+            while self.aborted is None:
+                await asyncio.sleep(self.interval)
+                try:
+                    resp = await client.get("/v1/metrics")
+                    resp.raise_for_status()
+                    metrics = resp.json()
+                except (httpx.HTTPError, ValueError):
+                    continue  # API not up yet, or k6 is shutting down
+                breach = self._check(time.monotonic(), metrics)
+                if breach:
+                    self.aborted = breach
+                    await self._stop_k6(client)
+
+    def _check(self, now: float, metrics: dict) -> dict | None:
+        requests = _sample(metrics, "http_reqs").get("count", 0)
+        check_rate = _sample(metrics, "checks").get("rate")
+        failed = requests * (1 - check_rate) if check_rate is not None else 0
+        p95 = _sample(metrics, "http_req_duration").get("p(95)")
+
+        last, self._last = self._last, (requests, failed)
+        if now - self._started < self.policy["grace_seconds"]:
+            return None
+
+        values = {}
+        if self.policy["error_rate"] is not None and last and requests > last[0]:
+            values["error_rate"] = (failed - last[1]) / (requests - last[0])
+        if self.policy["p95_ms"] is not None and p95 is not None:
+            values["p95_ms"] = p95
+
+        for rule, value in values.items():
+            limit = self.policy[rule]
+            if value <= limit:
+                self._breach_since.pop(rule, None)
+                continue
+            since = self._breach_since.setdefault(rule, now)
+            if now - since >= self.policy["for_seconds"]:
+                return {
+                    "reason": rule,
+                    "value": round(value, 4),
+                    "limit": limit,
+                    "for_seconds": self.policy["for_seconds"],
+                    "at": datetime.now(timezone.utc).isoformat(),
+                    "elapsed_s": round(now - self._started, 1),
+                    "policy": self.policy,
+                }
+        return None
+
+    async def _stop_k6(self, client) -> None:
+        body = {"data": {"type": "status", "id": "default", "attributes": {"stopped": True}}}
+        try:
+            resp = await client.patch("/v1/status", json=body)
+            resp.raise_for_status()
+        except httpx.HTTPError:
+            # SIGINT takes the same graceful path: k6 still flushes and writes its summary.
+            self.proc.stop("aborted")
@@ -0,0 +1,188 @@
+"""Auto-capacity search: the highest request rate a target sustains under an SLO.
+
+Every step is a short ``constant-arrival-rate`` k6 run at one rate, judged
+with ``scoring.evaluate_slo`` on that step's aggregates. The rate grows by
+``growth`` while steps pass; after the first failure the search bisects
+between the highest passing and the lowest failing rate until the gap is
+within ``CAPACITY_TOLERANCE`` (the knee). Every step becomes one point of the
+latency-vs-load curve.
+
+``search_capacity`` streams k6 console lines plus two markers:
+
+    __CAPACITY_STEP__:<json point>   after each step
+    __CAPACITY__:<json result>       once, at the end
+"""
+import json
+import math
+import os
+from contextlib import aclosing
+
+from .k6_parser import parse_run_output
+from .k6_runner import build_scenario, run_k6_stream
+from .run_supervisor import remove_workspace
+from .saturation import assess
+from .scoring import evaluate_slo
+
+CAPACITY_STEP_DURATION = os.getenv("CAPACITY_STEP_DURATION", "30s")
+CAPACITY_MAX_STEPS = int(os.getenv("CAPACITY_MAX_STEPS", "10"))
+# Stop bisecting when (failing - passing) rate is within this share of the failing rate.
+CAPACITY_TOLERANCE = float(os.getenv("CAPACITY_TOLERANCE", "0.1"))
+
+
+def next_rate(curve: list[dict], start_rate: int, max_rate: int, growth: float, tolerance: float):
+    """Rate of the next step, or None when the search is done."""
+    if not curve:
+        return start_rate
+    passing = max((p["rate"] for p in curve if p["passed"]), default=0)
+    failing = min((p["rate"] for p in curve if not p["passed"]), default=None)
+
+    if failing is None:
+        if passing >= max_rate:
+            return None
+        return min(max_rate, max(passing + 1, math.ceil(passing * growth)))
+
+    if failing - passing <= max(1, failing * tolerance):
+        return None
+    return (passing + failing) // 2
+
+
+async def _run_step(url, rate, duration, pinned_ips, pre_allocated_vus, max_vus, step, handle=None):
+    """One k6 step; yields console lines, then a final parsed-result dict."""
+    scenario = build_scenario(
+        [],
+        "constant-arrival-rate",
+        rate=rate,
+        duration=duration,
+        pre_allocated_vus=pre_allocated_vus,
+        max_vus=max_vus,
+    )
+    output_path = summary_path = tmp_dir = None
+    samples = []
+    agent_failures = []
+    try:
+        lines = run_k6_stream(url, [], pinned_ips, scenario=scenario, handle=handle)
+        async with aclosing(lines):
+            async for line in lines:
+                if line.startswith("__SATURATION__:"):
+                    samples = json.loads(line.replace("__SATURATION__:", "", 1))
+                elif line.startswith("__AGENT_FAILED__:"):
+                    agent_failures.append(json.loads(line.replace("__AGENT_FAILED__:", "", 1)))
+                elif line.startswith("__TMP_DIR__:"):
+                    tmp_dir = line.replace("__TMP_DIR__:", "").strip()
+                elif line.startswith("__SUMMARY_PATH__:"):
+                    summary_path = line.replace("__SUMMARY_PATH__:", "").strip()
+                elif line.startswith("__OUTPUT_PATH__:"):
+                    output_path = line.replace("__OUTPUT_PATH__:", "").strip()
+                else:
+                    yield f"[step {step} @ {rate}/s] {line}"
+
+        parsed = parse_run_output(output_path, summary_path)
+        parsed["samples"] = samples
+        parsed["agent_failures"] = agent_failures
+        yield parsed
+    finally:
+        remove_workspace(tmp_dir)
+
+
+async def search_capacity(
+    url,
+    pinned_ips=None,
+    start_rate=10,
+    max_rate=1000,
+    growth=2.0,
+    step_duration=None,
+    max_steps=None,
+    p95_ms=None,
+    error_rate=None,
+    pre_allocated_vus=None,
+    max_vus=None,
+    handle=None,
+):
+    """Run the step search against ``url``; see the module docstring for the stream.
+
+    Cancelling ``handle`` stops the current step and ends the search.
+    """
+    step_duration = step_duration or CAPACITY_STEP_DURATION
+    max_steps = max_steps or CAPACITY_MAX_STEPS
+
+    curve: list[dict] = []
+    steps: dict[int, dict] = {}
+    timeline = {"latency": {}, "requests": {}, "checks": {}}
+    samples: list[dict] = []
+    agent_failures: list[dict] = []
+    stopped = "max_steps"
+
+    while len(curve) < max_steps:
+        if handle and handle.cancelled:
+            stopped = "cancelled"
+            break
+        rate = next_rate(curve, start_rate, max_rate, growth, CAPACITY_TOLERANCE)
+        if rate is None:
+            stopped = "knee" if any(not p["passed"] for p in curve) else "max_rate"
+            break
+
+        parsed = {}
+        items = _run_step(url, rate, step_duration, pinned_ips, pre_allocated_vus, max_vus, len(curve) + 1, handle)
+        async with aclosing(items):
+            async for item in items:
+                if isinstance(item, dict):
+                    parsed = item
+                else:
+                    yield item
+
+        metrics = parsed.get("metrics", {})
+        step_samples = parsed.get("samples") or []
+        slo = evaluate_slo(metrics, p95_ms=p95_ms, error_rate=error_rate)
+        generator = assess(step_samples)
+        point = {
+            "step": len(curve) + 1,
+            "rate": rate,
+            "achieved_rps": metrics.get("http_reqs", {}).get("rate"),
+            "p95": slo["p95"],
+            "p99": metrics.get("http_req_duration", {}).get("p(99)"),
+            "error_rate": slo["error_rate"],
+            "dropped_rate": slo["dropped_rate"],
+            "passed": slo["passed"],
+            "violations": slo["violations"],
+            "generator_saturated": generator["saturated"],
+        }
+        if handle and handle.cancelled:
+            # A step cut short says nothing about its rate.
+            stopped = "cancelled"
+            break
+        if parsed.get("agent_failures"):
+            # Nor does one that ran without a failed generator node's share.
+            agent_failures = parsed["agent_failures"]
+            stopped = "agent_failed"
+            break
+        curve.append(point)
+        steps[rate] = metrics
+        samples.extend(step_samples)
+        for series, buckets in (parsed.get("timeline") or {}).items():
+            timeline.setdefault(series, {}).update(buckets)
+        yield "__CAPACITY_STEP__:" + json.dumps(point)
+
+        # Beyond this rate the generator, not the target, would be measured.
+        if generator["saturated"]:
+            stopped = "generator_saturated"
+            break
+
+    passing = [p for p in curve if p["passed"]]
+    failing = [p for p in curve if not p["passed"]]
+    best = max(passing, key=lambda p: p["rate"]) if passing else None
+    reported = best or (curve[0] if curve else None)
+
+    yield "__CAPACITY__:" + json.dumps({
+        "max_rate": best["rate"] if best else None,
+        "max_rps": best["achieved_rps"] if best else None,
+        "knee_rate": min(p["rate"] for p in failing) if failing else None,
+        "stopped": stopped,
+        "slo": evaluate_slo({}, p95_ms=p95_ms, error_rate=error_rate)["limits"],
+        "step_duration": step_duration,
+        "curve": sorted(curve, key=lambda p: p["rate"]),
+        # The saved run reports the highest passing step (else the first one).
+        "metrics": steps.get(reported["rate"], {}) if reported else {},
+        "timeline": timeline,
+        "samples": samples,
+        "agent_failures": agent_failures,
+    })
@@ -0,0 +1,256 @@
+"""A stand-in ``k6`` binary that replays synthetic output (``app.synthetic_k6``).
+
+Point the backend at it to load-test the whole pipeline offline::
+
+    K6_BINARY="python -m app.fake_k6" uvicorn app.main:app
+
+``fake_k6 run`` reads the scenario from the generated builder script
+(``ramping-vus`` stages at ``FAKE_K6_RPS_PER_VU`` requests/s per VU, or the
+arrival-rate executors' rates), honours ``--out json=``/``--out csv=``,
+``--summary-export=`` and ``--execution-segment`` (its share of the rate),
+and writes samples second by second at ``FAKE_K6_SPEED`` times real time
+(``0``: as fast as possible), printing k6-like progress lines. SIGINT/SIGTERM
+end the run early with the summary written, like k6. Uploaded scripts without
+a builder scenario run for ``FAKE_K6_DURATION`` seconds at ``FAKE_K6_RPS``.
+
+Shape of the synthetic traffic (see ``synthetic_points``):
+``FAKE_K6_LATENCY_MS``, ``FAKE_K6_LATENCY_SIGMA``, ``FAKE_K6_SLOW_FRACTION``,
+``FAKE_K6_ERROR_RATE``, ``FAKE_K6_BURSTS`` (``start:length:error_rate[:latency_factor],...``),
+``FAKE_K6_TAG_CARDINALITY`` and ``FAKE_K6_SEED``. ``FAKE_K6_RPS`` /
+``FAKE_K6_DURATION`` also override builder scenarios when set.
+"""
+import csv
+import gzip
+import json
+import os
+import re
+import signal
+import sys
+import time
+from fractions import Fraction
+
+from .k6_runner import duration_seconds
+from .synthetic_k6 import (
+    CSV_HEADER,
+    DEFAULT_TREND_STATS,
+    Summary,
+    csv_rows,
+    ndjson_lines,
+    parse_bursts,
+    profile_seconds,
+    synthetic_points,
+)
+
+_SCENARIO = re.compile(r"Scenario_1: (\{.*\})\s*$", re.M)
+_URL = re.compile(r"^export const URL = (\".*\");$", re.M)
+_TREND_STATS = re.compile(r"^\s*summaryTrendStats: (\[.*\]),\s*$", re.M)
+
+EXIT_INTERRUPTED = 105  # k6's exit code for an externally aborted run
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+def parse_args(argv: list[str]) -> dict:
+    opts = {"outs": [], "summary": None, "segment": None, "script": None, "trend_stats": None}
+    args = iter(argv)
+    for arg in args:
+        if arg.startswith("--summary-export"):
+            opts["summary"] = arg.split("=", 1)[1] if "=" in arg else next(args)
+        elif arg == "--out":
+            opts["outs"].append(next(args))
+        elif arg == "--summary-trend-stats":
+            opts["trend_stats"] = [s.strip() for s in next(args).split(",") if s.strip()]
+        elif arg == "--execution-segment":
+            opts["segment"] = next(args)
+        elif arg in ("--address", "--execution-segment-sequence"):
+            next(args)
+        elif not arg.startswith("-"):
+            opts["script"] = arg
+    return opts
+
+
+def segment_share(segment: str | None) -> float:
+    """Share of the load in a k6 execution segment such as ``"1/3:2/3"``."""
+    if not segment:
+        return 1.0
+    start, _, end = segment.partition(":")
+    return float(Fraction(end or "1") - Fraction(start or "0"))
+
+
+def trend_stats(script: str | None, flag: list[str] | None) -> list[str]:
+    """``--summary-trend-stats`` over the script's ``summaryTrendStats`` over k6's default."""
+    if flag:
+        return flag
+    if script and os.path.exists(script):
+        with open(script) as f:
+            match = _TREND_STATS.search(f.read())
+        if match:
+            return json.loads(match.group(1))
+    return list(DEFAULT_TREND_STATS)
+
+
+def load_profile(script: str | None) -> dict:
+    """``synthetic_points`` rate arguments for the builder script's scenario."""
+    text = ""
+    if script and os.path.exists(script):
+        with open(script) as f:
+            text = f.read()
+    match = _SCENARIO.search(text)
+    url = _URL.search(text)
+    profile = {"url": json.loads(url.group(1)) if url else "https://example.com/"}
+    scenario = json.loads(match.group(1)) if match else None
+
+    if scenario is None:
+        profile.update(duration=_env_float("FAKE_K6_DURATION", 30), rps=_env_float("FAKE_K6_RPS", 50))
+    elif scenario["executor"] == "ramping-vus":
+        per_vu = _env_float("FAKE_K6_RPS_PER_VU", 10)
+        profile["stages"] = [(duration_seconds(s["duration"]), s["target"] * per_vu) for s in scenario["stages"]]
+    else:
+        unit = duration_seconds(scenario.get("timeUnit", "1s"))
+        if scenario["executor"] == "constant-arrival-rate":
+            profile.update(duration=duration_seconds(scenario["duration"]), rps=scenario["rate"] / unit)
+        else:
+            profile["start_rps"] = scenario.get("startRate", 0) / unit
+            profile["stages"] = [(duration_seconds(s["duration"]), s["target"] / unit) for s in scenario["stages"]]
+
+    if os.getenv("FAKE_K6_RPS") or os.getenv("FAKE_K6_DURATION"):
+        planned = profile.get("duration") or profile_seconds(None, profile.get("stages") or [])
+        profile.update(
+            duration=_env_float("FAKE_K6_DURATION", planned),
+            rps=_env_float("FAKE_K6_RPS", profile.get("rps") or 50),
+            stages=None,
+        )
+        profile.pop("start_rps", None)
+    return profile
+
+
+class _Outputs:
+    """The ``--out`` files, written as samples arrive."""
+
+    def __init__(self, outs: list[str]):
+        self.writers = []
+        self._files = []
+        for out in outs:
+            kind, _, path = out.partition("=")
+            if kind == "csv":
+                f = gzip.open(path, "wt", newline="") if path.endswith(".gz") else open(path, "w", newline="")
+                writer = csv.writer(f)
+                writer.writerow(CSV_HEADER)
+                time_format = os.getenv("K6_CSV_TIME_FORMAT", "unix")
+                self.writers.append(lambda points, w=writer, t=time_format: w.writerows(csv_rows(points, t)))
+            else:
+                f = open(path, "w")
+                declared = set()
+                self.writers.append(lambda points, f=f, d=declared: f.writelines(ndjson_lines(points, d)))
+            self._files.append(f)
+
+    def write(self, points: list) -> None:
+        for write in self.writers:
+            write(points)
+        for f in self._files:
+            f.flush()
+
+    def close(self) -> None:
+        for f in self._files:
+            f.close()
+
+
+def run(argv: list[str]) -> int:
+    opts = parse_args(argv)
+    profile = load_profile(opts["script"])
+    share = segment_share(opts["segment"])
+    for key in ("rps", "start_rps"):
+        if key in profile:
+            profile[key] *= share
+    if profile.get("stages"):
+        profile["stages"] = [(seconds, target * share) for seconds, target in profile["stages"]]
+    speed = _env_float("FAKE_K6_SPEED", 1)
+
+    stopped = []
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stopped.append(True))
+
+    print("\n  execution: local (fake k6)", flush=True)
+    print(f"     script: {opts['script']}", flush=True)
+    for out in opts["outs"]:
+        print(f"     output: {out}", flush=True)
+
+    started_wall = time.time()
+    points = synthetic_points(
+        **profile,
+        latency_median_ms=_env_float("FAKE_K6_LATENCY_MS", 80),
+        latency_sigma=_env_float("FAKE_K6_LATENCY_SIGMA", 0.4),
+        slow_fraction=_env_float("FAKE_K6_SLOW_FRACTION", 0),
+        error_rate=_env_float("FAKE_K6_ERROR_RATE", 0.005),
+        bursts=parse_bursts(os.getenv("FAKE_K6_BURSTS", "")),
+        tag_cardinality=int(os.getenv("FAKE_K6_TAG_CARDINALITY", "1")),
+        seed=int(os.getenv("FAKE_K6_SEED", "1")),
+        start=started_wall,
+    )
+    outputs = _Outputs(opts["outs"])
+    summary = Summary()
+    second, pending, iterations, vus = 0, [], 0, 0
+    last_print = 0.0
+
+    def flush_second():
+        nonlocal last_print
+        outputs.write(pending)
+        pending.clear()
+        if speed > 0:
+            time.sleep(max(0.0, started_wall + (second + 1) / speed - time.time()))
+        now = time.time()
+        if now - last_print >= 1:
+            last_print = now
+            print(f"running ({(second + 1) // 60}m{(second + 1) % 60:04.1f}s), {vus:03d}/{vus:03d} VUs, "
+                  f"{iterations} complete and 0 interrupted iterations", flush=True)
+
+    for point in points:
+        if stopped:
+            break
+        metric, ts, value, _ = point
+        if int(ts - started_wall) > second:
+            flush_second()
+            second = int(ts - started_wall)
+        pending.append(point)
+        summary.add(metric, ts, value)
+        if metric == "iterations":
+            iterations += 1
+        elif metric == "vus":
+            vus = value
+    if not stopped:
+        flush_second()
+    else:
+        outputs.write(pending)
+    outputs.close()
+
+    export = summary.export(
+        elapsed=min(second + 1, profile_seconds(profile.get("duration"), profile.get("stages"))),
+        trend_stats=trend_stats(opts["script"], opts["trend_stats"]),
+    )
+    if opts["summary"]:
+        with open(opts["summary"], "w") as f:
+            json.dump(export, f)
+    duration = export["metrics"].get("http_req_duration", {})
+    print(f"\n     http_reqs......................: {summary.requests}", flush=True)
+    if duration:
+        stats = " ".join(f"{stat}={value:.2f}ms" for stat, value in duration.items())
+        print(f"     http_req_duration..............: {stats}", flush=True)
+    print(f"     checks.........................: {export['metrics']['checks']['value'] * 100:.2f}%", flush=True)
+    return EXIT_INTERRUPTED if stopped else 0
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["version"]:
+        print("k6 v0.0.0-fake (app.fake_k6)")
+        return 0
+    if argv[:1] != ["run"]:
+        print("usage: python -m app.fake_k6 run [--out json=PATH|csv=PATH] [--summary-export=PATH] SCRIPT", file=sys.stderr)
+        return 2
+    return run(argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
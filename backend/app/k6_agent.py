@@ -0,0 +1,299 @@
+"""Distributed k6: generator-node agent and the coordinator that drives it.
+
+A single k6 process on the backend container tops out at a few thousand VUs,
+after which results describe the generator rather than the target. With
+``K6_AGENTS`` set, ``run_k6_stream`` hands the run to ``run_distributed``:
+every agent runs the same script with its own k6 execution segment (k6 splits
+the stage VU targets and arrival rates between segments), streams its console output and result
+points back, and the coordinator merges the points into one NDJSON file that
+the normal parser turns into a single timeline.
+
+Run an agent on each generator node (same image as the backend):
+
+    K6_AGENT_TOKEN=... uvicorn app.k6_agent:app --host 0.0.0.0 --port 8100
+
+Agent stream protocol (text, one record per line):
+
+    L <k6 console line>
+    S <saturation samples>  (JSON list, see ``saturation``)
+    A <abort record>        (JSON, only when the abort policy stopped k6)
+    P <k6 output line>      (NDJSON or CSV, as requested by the coordinator)
+    D                       (run finished, all points sent)
+
+Points are bucketed by wall-clock second, so generator clocks must be NTP-synced.
+An agent sends its ``P`` lines only after its k6 process exits, so during the
+run the coordinator has console output but no per-sample data; the merged
+file is complete once every agent has sent ``D``.
+Abort policies are evaluated by every agent on its own share of the load.
+"""
+import asyncio
+import gzip
+import hmac
+import json
+import os
+import threading
+from contextlib import aclosing
+from fractions import Fraction
+
+import httpx
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import StreamingResponse
+
+from .k6_parser import open_output, output_format
+from .k6_runner import output_target, run_k6_local
+from .run_supervisor import make_workspace, remove_workspace
+from .schemas import AgentRunRequest
+from .url_safety import UnsafeUrlError, _check_ips, resolve_target
+
+K6_AGENT_TOKEN = os.getenv("K6_AGENT_TOKEN", "")
+K6_AGENT_CONNECT_TIMEOUT_SECONDS = float(os.getenv("K6_AGENT_CONNECT_TIMEOUT_SECONDS", "10"))
+# Merged points are written off the event loop in batches of this many lines.
+K6_AGENT_WRITE_BATCH = 2000
+
+app = FastAPI(title="k6 agent")
+
+
+def execution_segments(n: int) -> tuple[list[str], str]:
+    """Split ``0..1`` into ``n`` equal k6 execution segments.
+
+    Returns the per-agent segments (``["0:1/3", "1/3:2/3", "2/3:1"]``) and the
+    shared segment sequence (``"0,1/3,2/3,1"``) that keeps k6's VU
+    partitioning consistent across agents.
+    """
+    bounds = [Fraction(i, n) for i in range(n + 1)]
+    segments = [f"{bounds[i]}:{bounds[i + 1]}" for i in range(n)]
+    return segments, ",".join(str(b) for b in bounds)
+
+
+# ================= AGENT =================
+
+def _verify_agent_token(token: str | None) -> None:
+    if not K6_AGENT_TOKEN:
+        raise HTTPException(status_code=503, detail="K6_AGENT_TOKEN is not configured")
+    if not token or not hmac.compare_digest(token, K6_AGENT_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid agent token")
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.post("/run")
+async def agent_run(req: AgentRunRequest, x_agent_token: str | None = Header(None)):
+    _verify_agent_token(x_agent_token)
+
+    # The coordinator already validated the target; re-check so a leaked token
+    # cannot turn an agent into an SSRF proxy.
+    try:
+        await resolve_target(req.url)
+        if req.pinned_ips:
+            _check_ips(list(req.pinned_ips.values()))
+    except UnsafeUrlError as exc:
+        raise HTTPException(status_code=400, detail=f"Unsafe target url: {exc}") from exc
+
+    async def stream():
+        tmp_dir = None
+        output_path = None
+        try:
+            lines = run_k6_local(
+                req.url,
+                [s.dict() for s in req.stages],
+                req.pinned_ips,
+                segment=req.segment,
+                segment_sequence=req.segment_sequence,
+                output_format=req.output_format,
+                scenario=req.scenario,
+                abort_policy=req.abort_policy,
+                # Per-agent percentiles cannot be merged; the coordinator
+                # aggregates the streamed points instead.
+                export_summary=False,
+            )
+            async with aclosing(lines):
+                async for line in lines:
+                    if line.startswith("__TMP_DIR__:"):
+                        tmp_dir = line.replace("__TMP_DIR__:", "").strip()
+                    elif line.startswith("__OUTPUT_PATH__:"):
+                        output_path = line.replace("__OUTPUT_PATH__:", "").strip()
+                    elif line.startswith("__SATURATION__:"):
+                        yield "S " + line.replace("__SATURATION__:", "", 1) + "\n"
+                    elif line.startswith("__ABORT__:"):
+                        yield "A " + line.replace("__ABORT__:", "", 1) + "\n"
+                    else:
+                        yield f"L {line.rstrip()}\n"
+
+            if output_path and os.path.exists(output_path):
+                with open_output(output_path) as f:
+                    for point in f:
+                        if point.strip():
+                            yield f"P {point.rstrip()}\n"
+            yield "D\n"
+        finally:
+            remove_workspace(tmp_dir)
+
+    return StreamingResponse(stream(), media_type="text/plain")
+
+
+# ================= COORDINATOR =================
+
+class _MergedOutput:
+    """The merged output file; batches are written in a worker thread, one at a time."""
+
+    def __init__(self, f):
+        self._f = f
+        self._lock = threading.Lock()
+
+    def _write(self, data: str) -> None:
+        with self._lock:
+            self._f.write(data)
+
+    async def write(self, lines: list[str]) -> None:
+        if lines:
+            await asyncio.to_thread(self._write, "".join(lines))
+
+    def wait(self) -> None:
+        """Block until a write still running in its thread (cancelled caller) is done."""
+        with self._lock:
+            pass
+
+
+async def _drive_agent(client, index, agent, payload, out, queue, samples, merged, aborts, failed):
+    prefix = f"[agent {index + 1}]"
+    csv_header = payload["output_format"] == "csv"
+    finished = False
+    error = None
+    batch: list[str] = []
+    try:
+        async with client.stream(
+            "POST",
+            f"{agent}/run",
+            json=payload,
+            headers={"x-agent-token": K6_AGENT_TOKEN},
+        ) as resp:
+            if resp.status_code != 200:
+                body = (await resp.aread()).decode(errors="ignore")[:200]
+                error = f"HTTP {resp.status_code}: {body}"
+                return
+            async for line in resp.aiter_lines():
+                if line.startswith("P "):
+                    if csv_header:
+                        # Each agent's CSV starts with a header row; the merged
+                        # file keeps the first one.
+                        csv_header = False
+                        if merged["csv_header"]:
+                            continue
+                        merged["csv_header"] = True
+                    batch.append(line[2:] + "\n")
+                    if len(batch) >= K6_AGENT_WRITE_BATCH:
+                        await out.write(batch)
+                        batch = []
+                elif line.startswith("L "):
+                    await queue.put(f"{prefix} {line[2:]}\n")
+                elif line.startswith("S "):
+                    samples.extend({**sample, "node": index + 1} for sample in json.loads(line[2:]))
+                elif line.startswith("A "):
+                    aborts.append({**json.loads(line[2:]), "node": index + 1})
+                elif line == "D":
+                    finished = True
+            await out.write(batch)
+        if not finished:
+            error = "stream ended before the run finished"
+    except httpx.HTTPError as exc:
+        error = f"{type(exc).__name__}: {exc}"
+    finally:
+        if error:
+            failed.append({"node": index + 1, "error": error})
+            await queue.put(f"K6_AGENT_ERROR {prefix} {error}\n")
+        await queue.put(None)
+
+
+async def run_distributed(agents, url, stages, pinned_ips=None, scenario=None, abort_policy=None, handle=None):
+    """Run ``stages`` split across ``agents`` and stream their console output.
+
+    k6 splits VU targets and arrival rates of ``scenario`` between segments.
+    The first agent abort (if any) is yielded as ``__ABORT__``. Every agent
+    that failed (HTTP error, lost connection, stream ended before ``D``) is
+    yielded as ``__AGENT_FAILED__:{"node": ..., "error": ...}``: the merged
+    points then cover only the other agents' share of the load. Cancelling
+    ``handle`` closes the agent streams, which stops k6 on every agent.
+
+    Yields the same ``__SATURATION__``/``__TMP_DIR__``/``__OUTPUT_PATH__``
+    markers as ``run_k6_local``; the output file (in ``K6_OUTPUT_FORMAT``)
+    holds the merged points of every agent (complete only after all agents
+    finish, see the module docstring) and the samples carry a ``node`` index.
+    """
+    segments, sequence = execution_segments(len(agents))
+
+    tmpdir = make_workspace()
+    handed_over = False
+    try:
+        output_path, _ = output_target(tmpdir)
+        fmt = output_format(output_path)
+
+        yield f"Distributing run across {len(agents)} k6 agents\n"
+
+        queue: asyncio.Queue = asyncio.Queue()
+        samples: list[dict] = []
+        merged = {"csv_header": False}
+        aborts: list[dict] = []
+        failed: list[dict] = []
+        timeout = httpx.Timeout(None, connect=K6_AGENT_CONNECT_TIMEOUT_SECONDS)
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            with (gzip.open(output_path, "wt") if output_path.endswith(".gz") else open(output_path, "w")) as f:
+                out = _MergedOutput(f)
+                tasks = [
+                    asyncio.create_task(
+                        _drive_agent(
+                            client,
+                            i,
+                            agent,
+                            {
+                                "url": url,
+                                "stages": stages,
+                                "pinned_ips": pinned_ips or {},
+                                "segment": segments[i],
+                                "segment_sequence": sequence,
+                                "output_format": fmt,
+                                "scenario": scenario,
+                                "abort_policy": abort_policy,
+                            },
+                            out,
+                            queue,
+                            samples,
+                            merged,
+                            aborts,
+                            failed,
+                        )
+                    )
+                    for i, agent in enumerate(agents)
+                ]
+                forget = handle.on_cancel(lambda: [task.cancel() for task in tasks]) if handle else None
+                try:
+                    remaining = len(tasks)
+                    while remaining:
+                        line = await queue.get()
+                        if line is None:
+                            remaining -= 1
+                            continue
+                        yield line
+                finally:
+                    # Client went away, the run was cancelled or aborted: closing
+                    # the agent streams makes every agent stop its k6 process.
+                    if forget:
+                        forget()
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    out.wait()
+
+        if aborts:
+            yield "__ABORT__:" + json.dumps(min(aborts, key=lambda a: a["at"]))
+        for failure in sorted(failed, key=lambda f: f["node"]):
+            yield "__AGENT_FAILED__:" + json.dumps(failure)
+        yield "__SATURATION__:" + json.dumps(samples)
+        handed_over = True
+        yield "__TMP_DIR__:" + tmpdir
+        yield "__OUTPUT_PATH__:" + output_path
+    finally:
+        if not handed_over:
+            remove_workspace(tmpdir)
@@ -1,33 +1,156 @@
+import csv
+import gzip
 import json
+import os
+import re
+from itertools import chain
+
 import numpy as np
 from collections import defaultdict
-from datetime import datetime
+from datetime import datetime, timezone
 
-def parse_k6_ndjson(raw: str):
+from .sketch import LatencySketch
+
+# Only these metrics feed the summary/timeline; everything else is skipped
+# before its value is decoded.
+USED_METRICS = frozenset({"http_req_duration", "http_reqs", "checks", "dropped_iterations"})
+
+# Latency stats the summary export must have for the samples' own to be skipped.
+SUMMARY_LATENCY_STATS = ("avg", "min", "max", "p(95)", "p(99)")
+
+
+class _Aggregator:
+    """Accumulates k6 samples into the summary + per-second timeline.
+
+    Without ``latency_stats`` (k6's summary export supplies them) the latency
+    percentiles are not computed; the timeline and sketch are.
+    """
+
+    def __init__(self, latency_stats: bool = True):
+        self.latency_stats = latency_stats
+        self.latency_count = 0
+        self.timeline_latency = defaultdict(list)
+        # http_reqs is a Counter: k6 emits one point per request with the
+        # increment as its value, so per-bucket sums give the request count. Sums
+        # also merge cleanly when points from several agents are interleaved.
+        self.timeline_requests = defaultdict(float)
+        self.timeline_checks = defaultdict(lambda: {"pass": 0, "fail": 0})
+        self.dropped_iterations = None
+        self.first_ts = None
+        self.last_ts = None
+
+    def add(self, metric: str, value: float, epoch: float, bucket: str) -> None:
+        if metric == "dropped_iterations":
+            # Emitted after the fact by arrival-rate executors; not a request,
+            # so it must not stretch the measured duration.
+            self.dropped_iterations = (self.dropped_iterations or 0) + value
+            return
+
+        # ---- Track real test duration ----
+        # min/max rather than first/last line: merged agent output is not ordered.
+        if self.first_ts is None or epoch < self.first_ts:
+            self.first_ts = epoch
+        if self.last_ts is None or epoch > self.last_ts:
+            self.last_ts = epoch
+
+        if metric == "http_req_duration":
+            self.latency_count += 1
+            self.timeline_latency[bucket].append(value)
+
+        elif metric == "http_reqs":
+            self.timeline_requests[bucket] += value
+
+        elif metric == "checks":
+            if value == 1:
+                self.timeline_checks[bucket]["pass"] += 1
+            else:
+                self.timeline_checks[bucket]["fail"] += 1
+
+    def result(self) -> dict:
+        summary = {}
+
+        # Every latency sample is in a timeline bucket; one array serves the
+        # stats and the sketch.
+        arr = None
+        if self.latency_count:
+            arr = np.fromiter(chain.from_iterable(self.timeline_latency.values()), float, self.latency_count)
 
-    latency_values = []
-    timeline_latency = defaultdict(list)
-    # http_reqs is a Counter in k6 JSON output; values are cumulative.
-    # We store the maximum observed value per second bucket.
-    timeline_requests = defaultdict(float)
-    timeline_checks = defaultdict(lambda: {"pass": 0, "fail": 0})
+        # ================= LATENCY =================
+        if arr is not None and self.latency_stats:
+            summary["http_req_duration"] = {
+                "avg": round(float(np.mean(arr)), 2),
+                "p(95)": round(float(np.percentile(arr, 95)), 2),
+                "p(99)": round(float(np.percentile(arr, 99)), 2),
+                "min": round(float(np.min(arr)), 2),
+                "max": round(float(np.max(arr)), 2),
+            }
 
-    first_ts = None
-    last_ts = None
+        # ================= ERROR RATE =================
+        total_pass = sum(v["pass"] for v in self.timeline_checks.values())
+        total_fail = sum(v["fail"] for v in self.timeline_checks.values())
+        total_checks = total_pass + total_fail
 
-    for line in raw.splitlines():
-        if not line.strip():
+        error_rate = total_fail / total_checks if total_checks else 0
+
+        summary["checks"] = {
+            "passes": total_pass,
+            "fails": total_fail,
+            "error_rate": round(error_rate, 4)
+        }
+
+        # ================= REQUESTS / RPS =================
+        total_requests = int(sum(self.timeline_requests.values()))
+
+        if self.first_ts is not None and self.last_ts is not None and self.last_ts > self.first_ts:
+            duration_seconds = self.last_ts - self.first_ts
+            rps = total_requests / duration_seconds if duration_seconds > 0 else 0
+        else:
+            rps = 0
+
+        summary["http_reqs"] = {
+            "count": total_requests,
+            "rate": round(rps, 2)
+        }
+
+        # ================= DROPPED ITERATIONS =================
+        if self.dropped_iterations is not None:
+            summary["dropped_iterations"] = {"count": int(self.dropped_iterations)}
+
+        result = {
+            "metrics": summary,
+            "timeline": {
+                "latency": dict(self.timeline_latency),
+                "requests": dict(self.timeline_requests),
+                "checks": dict(self.timeline_checks),
+            }
+        }
+        # Mergeable latency distribution for regression baselines and run comparison.
+        if arr is not None:
+            result["latency_sketch"] = LatencySketch.from_values(arr).to_dict()
+        return result
+
+
+_USED_METRIC_RE = re.compile("|".join(f'"{re.escape(name)}"' for name in sorted(USED_METRICS)))
+
+
+def _feed_ndjson(agg: _Aggregator, lines) -> None:
+    for line in lines:
+        # Cheap substring test first: most lines are metrics we never use and
+        # are not worth a json.loads.
+        if not _USED_METRIC_RE.search(line):
             continue
 
         try:
             obj = json.loads(line)
-        except:
+        except ValueError:
             continue
 
         if obj.get("type") != "Point":
             continue
 
         metric = obj.get("metric")
+        if metric not in USED_METRICS:
+            continue
         data = obj.get("data", {})
         value = data.get("value")
         timestamp = data.get("time")
@@ -35,78 +158,168 @@ def parse_k6_ndjson(raw: str):
         if value is None or timestamp is None:
             continue
 
-        value = float(value)
-
         ts = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        bucket = ts.replace(microsecond=0).isoformat()
+        agg.add(metric, float(value), ts.timestamp(), bucket)
 
-        # ---- Track real test duration ----
-        if not first_ts:
-            first_ts = ts
-        last_ts = ts
 
-        bucket = ts.replace(microsecond=0).isoformat()
+def _decode_csv_time(raw: str) -> float:
+    """k6 CSV timestamps: unix seconds by default, finer units or RFC 3339
+    depending on ``K6_CSV_TIME_FORMAT``."""
+    try:
+        number = float(raw)
+    except ValueError:
+        return datetime.fromisoformat(raw.replace("Z", "+00:00")).timestamp()
+    if number > 1e17:
+        return number / 1e9
+    if number > 1e14:
+        return number / 1e6
+    if number > 1e11:
+        return number / 1e3
+    return number
 
-        if metric == "http_req_duration":
-            latency_values.append(value)
-            timeline_latency[bucket].append(value)
 
-        if metric == "http_reqs":
-            # Keep max cumulative count observed in this bucket.
-            if value > timeline_requests[bucket]:
-                timeline_requests[bucket] = value
+def _feed_csv(agg: _Aggregator, lines) -> None:
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        return
+    try:
+        i_metric = header.index("metric_name")
+        i_time = header.index("timestamp")
+        i_value = header.index("metric_value")
+    except ValueError:
+        return
+    width = max(i_metric, i_time, i_value) + 1
 
-        if metric == "checks":
-            if value == 1:
-                timeline_checks[bucket]["pass"] += 1
-            else:
-                timeline_checks[bucket]["fail"] += 1
+    labels: dict[int, str] = {}
+    for row in reader:
+        if len(row) < width:
+            continue
+        metric = row[i_metric]
+        if metric not in USED_METRICS:  # also skips repeated headers in merged files
+            continue
+        try:
+            value = float(row[i_value])
+            epoch = _decode_csv_time(row[i_time])
+        except ValueError:
+            continue
+
+        second = int(epoch)
+        bucket = labels.get(second)
+        if bucket is None:
+            bucket = labels[second] = datetime.fromtimestamp(second, tz=timezone.utc).isoformat()
+        agg.add(metric, value, epoch, bucket)
+
+
+def parse_k6_ndjson(raw: str):
+    agg = _Aggregator()
+    _feed_ndjson(agg, raw.splitlines())
+    return agg.result()
+
+
+def parse_k6_csv(lines):
+    """Parse k6 ``--out csv`` rows (any iterable of text lines, header first)."""
+    agg = _Aggregator()
+    _feed_csv(agg, lines)
+    return agg.result()
+
+
+def output_format(path: str) -> str:
+    """``"csv"`` or ``"json"`` from a k6 output file name (``.gz`` allowed)."""
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.endswith(".csv") else "json"
+
+
+def open_output(path: str):
+    """Open a k6 output file for text reading, transparently gunzipping."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="")
+    return open(path, newline="")
+
+
+def parse_k6_output(path: str, latency_stats: bool = True):
+    """Parse a k6 output file (NDJSON or CSV, optionally gzipped) by streaming it."""
+    agg = _Aggregator(latency_stats)
+    with open_output(path) as f:
+        if output_format(path) == "csv":
+            _feed_csv(agg, f)
+        else:
+            _feed_ndjson(agg, f)
+    return agg.result()
 
+
+def load_summary_export(path: str):
+    """Read a k6 ``--summary-export`` file; None when missing or unreadable."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def summary_metrics(export: dict) -> dict:
+    """Map a k6 ``--summary-export`` document onto the ``metrics`` shape the
+    point parser produces (plus any extra trend stats such as ``med``/``p(90)``)."""
+    metrics = (export or {}).get("metrics") or {}
     summary = {}
 
-    # ================= LATENCY =================
-    if latency_values:
-        arr = np.array(latency_values)
+    duration = metrics.get("http_req_duration")
+    if duration:
         summary["http_req_duration"] = {
-            "avg": round(float(np.mean(arr)), 2),
-            "p(95)": round(float(np.percentile(arr, 95)), 2),
-            "p(99)": round(float(np.percentile(arr, 99)), 2),
-            "min": round(float(np.min(arr)), 2),
-            "max": round(float(np.max(arr)), 2),
+            stat: round(float(value), 2)
+            for stat, value in duration.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
         }
 
-    # ================= ERROR RATE =================
-    total_pass = sum(v["pass"] for v in timeline_checks.values())
-    total_fail = sum(v["fail"] for v in timeline_checks.values())
-    total_checks = total_pass + total_fail
-
-    error_rate = total_fail / total_checks if total_checks else 0
-
+    checks = metrics.get("checks") or {}
+    passes = int(checks.get("passes", 0))
+    fails = int(checks.get("fails", 0))
+    total = passes + fails
     summary["checks"] = {
-        "passes": total_pass,
-        "fails": total_fail,
-        "error_rate": round(error_rate, 4)
+        "passes": passes,
+        "fails": fails,
+        "error_rate": round(fails / total, 4) if total else 0,
     }
 
-    # ================= REQUESTS / RPS =================
-    total_requests = int(max(timeline_requests.values())) if timeline_requests else 0
-
-    if first_ts and last_ts and last_ts > first_ts:
-        duration_seconds = (last_ts - first_ts).total_seconds()
-        rps = total_requests / duration_seconds if duration_seconds > 0 else 0
-    else:
-        duration_seconds = 1
-        rps = 0
-
+    reqs = metrics.get("http_reqs") or {}
     summary["http_reqs"] = {
-        "count": total_requests,
-        "rate": round(rps, 2)
+        "count": int(reqs.get("count", 0)),
+        "rate": round(float(reqs.get("rate", 0)), 2),
     }
 
-    return {
-        "metrics": summary,
-        "timeline": {
-            "latency": dict(timeline_latency),
-            "requests": dict(timeline_requests),
-            "checks": dict(timeline_checks),
-        }
-    }
+    dropped = metrics.get("dropped_iterations")
+    if dropped:
+        summary["dropped_iterations"] = {"count": int(dropped.get("count", 0))}
+    return summary
+
+
+def has_latency_stats(export: dict | None) -> bool:
+    duration = ((export or {}).get("metrics") or {}).get("http_req_duration") or {}
+    return all(stat in duration for stat in SUMMARY_LATENCY_STATS)
+
+
+def merge_summary(metrics: dict, export: dict) -> dict:
+    """``metrics`` from the samples, overridden stat by stat by the summary export."""
+    merged = dict(metrics)
+    for name, stats in summary_metrics(export).items():
+        merged[name] = {**(metrics.get(name) or {}), **stats}
+    return merged
+
+
+def parse_run_output(output_path: str | None, summary_path: str | None) -> dict:
+    """Metrics, timeline and sketch of a finished run.
+
+    k6's own end-of-test aggregates are authoritative where the summary export
+    has them; the sample output fills in the rest and feeds the timeline.
+    Latency percentiles are only computed from the samples when the summary
+    lacks them.
+    """
+    export = load_summary_export(summary_path) if summary_path else None
+    if output_path and os.path.exists(output_path):
+        parsed = parse_k6_output(output_path, latency_stats=not has_latency_stats(export))
+    else:
+        parsed = parse_k6_ndjson("")
+    if export:
+        parsed["metrics"] = merge_summary(parsed["metrics"], export)
+    return parsed
@@ -1,11 +1,29 @@
-import asyncio
 import json
+import math
 import os
-import tempfile
+import re
+import shlex
 import uuid
+from contextlib import aclosing
+
+from .abort_policy import AbortWatcher, free_address
+from .run_supervisor import K6Process, make_workspace, remove_workspace, run_deadline
+from .saturation import SaturationSampler
 
 
 USER_AGENT = os.getenv("USER_AGENT", "k6-ai-powerd-agent")
+# Command that runs k6; may carry arguments, e.g. "python -m app.fake_k6"
+# to replay synthetic output offline (see fake_k6.py).
+K6_BINARY = os.getenv("K6_BINARY", "k6")
+K6_COMMAND = shlex.split(K6_BINARY)
+# "json" (NDJSON, one object per sample) or "csv" (gzipped CSV: a fraction of
+# the bytes and much cheaper to parse).
+K6_OUTPUT_FORMAT = os.getenv("K6_OUTPUT_FORMAT", "json").lower()
+# Trend stats k6 computes for the end-of-test summary (--summary-export),
+# which is the authoritative source of final metrics.
+K6_SUMMARY_TREND_STATS = [
+    s.strip() for s in os.getenv("K6_SUMMARY_TREND_STATS", "avg,min,med,max,p(90),p(95),p(99)").split(",") if s.strip()
+]
 
 K6_TEMPLATE = """
 import http from 'k6/http';
@@ -16,19 +34,15 @@ export const URL = %s;
 export const USER_AGENT = %s;
 
 export const options = {
+  hosts: %s,
+  summaryTrendStats: %s,
   thresholds: {
     success: ["rate>0.95"],
     errors: ["rate<0.1"],
     http_req_duration: ["p(90)<15000"]
   },
   scenarios: {
-    Scenario_1: {
-      executor: "ramping-vus",
-      gracefulStop: "30s",
-      stages: %s,
-      gracefulRampDown: "30s",
-      exec: "scenario_1"
-    }
+    Scenario_1: %s
   }
 };
 
@@ -47,47 +61,262 @@ export function scenario_1() {
 }
 """
 
-async def run_k6_stream(url, stages):
-    timeout_s = int(os.getenv("K6_TIMEOUT_SECONDS", "180"))
+EXECUTORS = ("ramping-vus", "constant-arrival-rate", "ramping-arrival-rate")
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def duration_seconds(value: str) -> float:
+    """Seconds in a k6 duration string such as ``"500ms"``, ``"1m30s"``."""
+    text = str(value).strip()
+    parts = _DURATION_PART.findall(text)
+    if not parts or "".join(n + u for n, u in parts) != text:
+        raise ValueError(f"invalid duration: {value!r}")
+    return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+
+
+def build_scenario(
+    stages,
+    executor="ramping-vus",
+    rate=None,
+    duration=None,
+    time_unit="1s",
+    start_rate=0,
+    pre_allocated_vus=None,
+    max_vus=None,
+) -> dict:
+    """k6 scenario config for the builder script; raises ValueError on bad input.
+
+    Arrival-rate executors start iterations at a fixed rate regardless of
+    response time (``rate``/``stages[].target`` are iterations per
+    ``time_unit``), so they answer "can it sustain N RPS". When the VU pool
+    is too small to keep up, k6 drops iterations (``dropped_iterations``).
+    Unset ``pre_allocated_vus``/``max_vus`` are sized for the peak rate at
+    0.5 s / 2 s per iteration; the ``pre_allocated_vus`` default is capped at
+    an explicit ``max_vus``.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"unsupported executor: {executor}")
+
+    if executor == "ramping-vus":
+        if not stages:
+            raise ValueError("ramping-vus needs stages")
+        return {
+            "executor": "ramping-vus",
+            "gracefulStop": "30s",
+            "stages": stages,
+            "gracefulRampDown": "30s",
+            "exec": "scenario_1",
+        }
+
+    unit_s = duration_seconds(time_unit)
+    if unit_s <= 0:
+        raise ValueError("time_unit must be positive")
+
+    if executor == "constant-arrival-rate":
+        if not rate or rate <= 0:
+            raise ValueError("constant-arrival-rate needs a positive rate")
+        if not duration:
+            raise ValueError("constant-arrival-rate needs a duration")
+        duration_seconds(duration)
+        peak = rate
+        scenario = {"executor": executor, "rate": rate, "timeUnit": time_unit, "duration": duration}
+    else:
+        if not stages:
+            raise ValueError("ramping-arrival-rate needs stages")
+        peak = max([start_rate or 0] + [stage["target"] for stage in stages])
+        if peak <= 0:
+            raise ValueError("ramping-arrival-rate needs a positive target")
+        scenario = {"executor": executor, "startRate": start_rate or 0, "timeUnit": time_unit, "stages": stages}
+
+    peak_per_s = peak / unit_s
+    if not pre_allocated_vus:
+        pre_allocated_vus = max(1, math.ceil(peak_per_s * 0.5))
+        if max_vus:
+            pre_allocated_vus = min(pre_allocated_vus, max_vus)
+    max_vus = max_vus or max(pre_allocated_vus, math.ceil(peak_per_s * 2))
+    if max_vus < pre_allocated_vus:
+        raise ValueError("max_vus must be >= pre_allocated_vus")
+
+    scenario.update({
+        "preAllocatedVUs": pre_allocated_vus,
+        "maxVUs": max_vus,
+        "gracefulStop": "30s",
+        "exec": "scenario_1",
+    })
+    return scenario
+
+
+def planned_seconds(scenario: dict) -> float:
+    """Length of ``scenario``'s load profile including its graceful stop/ramp-down."""
+    if "stages" in scenario:
+        total = sum(duration_seconds(stage["duration"]) for stage in scenario["stages"])
+    else:
+        total = duration_seconds(scenario.get("duration", "0s"))
+    for key in ("gracefulStop", "gracefulRampDown"):
+        if key in scenario:
+            total += duration_seconds(scenario[key])
+    return total
+
 
-    # IMPORTANT: do not use TemporaryDirectory here.
-    # The caller reads the NDJSON file *after* this generator finishes,
-    # so we need the output file to persist until the caller cleans it up.
-    tmpdir = tempfile.mkdtemp(prefix="k6-ai-")
-    run_id = str(uuid.uuid4())
-    script_path = os.path.join(tmpdir, f"{run_id}.js")
-    json_output = os.path.join(tmpdir, f"{run_id}.json")
+def write_script(tmpdir, url, stages, pinned_ips=None, scenario=None):
+    """Render the k6 script into ``tmpdir``; returns its path.
+
+    ``scenario`` comes from ``build_scenario``; default is ramping-vus over ``stages``.
+    """
+    script_path = os.path.join(tmpdir, f"{uuid.uuid4()}.js")
 
     # Use JSON encoding to avoid quote-breaking in JS.
     url_js = json.dumps(url)
     ua_js = json.dumps(USER_AGENT)
-    stages_js = json.dumps(stages)
+    hosts_js = json.dumps(pinned_ips or {})
+    trend_stats_js = json.dumps(K6_SUMMARY_TREND_STATS)
+    scenario_js = json.dumps(scenario or build_scenario(stages))
 
     with open(script_path, "w") as f:
-        f.write(K6_TEMPLATE % (url_js, ua_js, stages_js))
-
-    proc = await asyncio.create_subprocess_exec(
-        "k6",
-        "run",
-        "--out",
-        f"json={json_output}",
-        script_path,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.STDOUT,
-    )
-
-    assert proc.stdout is not None
-    while True:
-        line = await proc.stdout.readline()
-        if not line:
-            break
-        yield line.decode(errors="ignore")
+        f.write(K6_TEMPLATE % (url_js, ua_js, hosts_js, trend_stats_js, scenario_js))
+    return script_path
+
+
+def output_target(tmpdir, output_format=None):
+    """Output file path and ``--out`` argument for ``output_format``."""
+    if (output_format or K6_OUTPUT_FORMAT) == "csv":
+        path = os.path.join(tmpdir, f"{uuid.uuid4()}.csv.gz")
+        return path, f"csv={path}"
+    path = os.path.join(tmpdir, f"{uuid.uuid4()}.json")
+    return path, f"json={path}"
+
+
+def k6_env() -> dict:
+    """Environment for k6 subprocesses: millisecond CSV timestamps unless the
+    operator picked a format (whole seconds skew RPS on short runs)."""
+    env = dict(os.environ)
+    env.setdefault("K6_CSV_TIME_FORMAT", "unix_milli")
+    return env
+
+
+def configured_agents() -> list[str]:
+    """Base URLs of the generator nodes in ``K6_AGENTS`` (empty: run locally)."""
+    return [a.strip().rstrip("/") for a in os.getenv("K6_AGENTS", "").split(",") if a.strip()]
+
 
+async def run_k6_local(
+    url,
+    stages,
+    pinned_ips=None,
+    segment=None,
+    segment_sequence=None,
+    output_format=None,
+    include_timeline=True,
+    export_summary=True,
+    scenario=None,
+    abort_policy=None,
+    handle=None,
+):
+    """Run k6 on this host and stream its console output.
+
+    ``segment``/``segment_sequence`` are k6 execution-segment strings
+    (``"1/3:2/3"``, ``"0,1/3,2/3,1"``); k6 then runs only that share of the VUs.
+    ``output_format`` overrides ``K6_OUTPUT_FORMAT``. Without
+    ``include_timeline`` k6 writes no per-sample output at all; with
+    ``export_summary`` it writes its end-of-test summary JSON. With an
+    ``abort_policy`` (see ``abort_policy.abort_policy``) k6 is stopped early
+    on a breach and ``__ABORT__:<json>`` is yielded after the run.
+    ``handle`` (``run_supervisor.RunHandle``) lets the run be cancelled.
+    """
+    # IMPORTANT: the caller reads the output file *after* this generator
+    # finishes, so the directory is handed over with ``__TMP_DIR__`` and
+    # removed here only if that never happens.
+    tmpdir = make_workspace()
+    handed_over = False
     try:
-        await asyncio.wait_for(proc.wait(), timeout=timeout_s)
-    except asyncio.TimeoutError:
-        proc.kill()
-        yield f"K6_TIMEOUT after {timeout_s}s\n"
+        scenario = scenario or build_scenario(stages)
+        script_path = write_script(tmpdir, url, stages, pinned_ips, scenario)
+        output_path = summary_path = None
+
+        args = [*K6_COMMAND, "run"]
+        if include_timeline:
+            output_path, out_arg = output_target(tmpdir, output_format)
+            args += ["--out", out_arg]
+        if export_summary:
+            summary_path = os.path.join(tmpdir, f"{uuid.uuid4()}-summary.json")
+            args.append(f"--summary-export={summary_path}")
+        address = None
+        if abort_policy:
+            address = free_address()
+            args += ["--address", address]
+        if segment:
+            args += ["--execution-segment", segment]
+            if segment_sequence:
+                args += ["--execution-segment-sequence", segment_sequence]
+        args.append(script_path)
+
+        async with K6Process(args, env=k6_env(), max_seconds=run_deadline(planned_seconds(scenario))) as k6:
+            sampler = SaturationSampler(k6.pid)
+            sampler.start()
+            watcher = AbortWatcher(k6, address, abort_policy) if abort_policy else None
+            if watcher:
+                watcher.start()
+            forget = handle.on_cancel(lambda: k6.stop("cancelled")) if handle else None
+            try:
+                async for line in k6.lines():
+                    yield line
+            finally:
+                # Also runs when the consumer stops early (client disconnect,
+                # agent stream closed); leaving the block kills k6's group.
+                if forget:
+                    forget()
+                samples = await sampler.stop()
+                aborted = await watcher.stop() if watcher else None
+
+        if aborted:
+            yield f"K6_ABORTED {aborted['reason']} {aborted['value']} > {aborted['limit']} for {aborted['for_seconds']}s\n"
+            yield "__ABORT__:" + json.dumps(aborted)
+        yield "__SATURATION__:" + json.dumps(samples)
+        handed_over = True
+        yield "__TMP_DIR__:" + tmpdir
+        if summary_path:
+            yield "__SUMMARY_PATH__:" + summary_path
+        if output_path:
+            yield "__OUTPUT_PATH__:" + output_path
+    finally:
+        if not handed_over:
+            remove_workspace(tmpdir)
+
+
+async def run_k6_stream(
+    url, stages, pinned_ips=None, include_timeline=True, scenario=None, abort_policy=None, handle=None
+):
+    """Run the generated k6 script and stream its console output.
+
+    ``pinned_ips`` (``{host: ip}`` from url_safety) becomes the k6 ``hosts``
+    override so k6 connects to the IPs that were validated, not a fresh lookup.
+    Generator saturation samples (see ``saturation``) arrive in a
+    ``__SATURATION__:`` marker before the ``__TMP_DIR__:``,
+    ``__SUMMARY_PATH__:`` (k6 summary export, local runs only) and
+    ``__OUTPUT_PATH__:`` (per-sample output, when ``include_timeline``)
+    markers; see ``k6_parser.summary_metrics`` and ``parse_k6_output``.
+    With ``K6_AGENTS`` set the run is split across those generator nodes
+    instead (see ``k6_agent``); the trailing markers are the same either way,
+    plus one ``__AGENT_FAILED__:`` per generator node that did not finish.
+    """
+    agents = configured_agents()
+    if agents:
+        from .k6_agent import run_distributed
 
-    yield "__TMP_DIR__:" + tmpdir
-    yield "__JSON_PATH__:" + json_output
+        lines = run_distributed(agents, url, stages, pinned_ips, scenario, abort_policy, handle)
+    else:
+        lines = run_k6_local(
+            url,
+            stages,
+            pinned_ips,
+            include_timeline=include_timeline,
+            scenario=scenario,
+            abort_policy=abort_policy,
+            handle=handle,
+        )
+    # aclosing: a consumer that stops early stops k6 now, not at garbage collection.
+    async with aclosing(lines):
+        async for line in lines:
+            yield line
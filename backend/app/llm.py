@@ -1,10 +1,16 @@
+import logging
 import os
 import random
 import asyncio
+import time
 from typing import Optional
 from google import genai
 from google.genai.errors import APIError
 
+from .metrics import LLM_DURATION, LLM_ERRORS
+
+logger = logging.getLogger(__name__)
+
 # LLM Provider Configuration (Global/Fallback)
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
 
@@ -91,7 +97,7 @@ async def _analyze_with_openai_compatible(
     # Use the key as-is, don't set to empty if None
     key = api_key if api_key else ""
     
-    print(f"[DEBUG] _analyze_with_openai_compatible: model={model}, base_url={url}, has_key={'yes' if key else 'no'}")
+    logger.debug("openai-compatible request: model=%s base_url=%s has_key=%s", model, url, bool(key))
     
     prompt = PROMPT_TEMPLATE.format(payload=payload)
     
@@ -113,26 +119,41 @@ async def _analyze_with_openai_compatible(
     }
     
     try:
-        print(f"[DEBUG] _analyze_with_openai_compatible: Calling chat/completions...")
         async with httpx.AsyncClient(timeout=120.0) as client:
             response = await client.post(
                 f"{url.rstrip('/')}/chat/completions",
                 headers=headers,
                 json=payload_data
             )
-            print(f"[DEBUG] _analyze_with_openai_compatible: Response status: {response.status_code}")
+            logger.debug("openai-compatible response: status=%s", response.status_code)
             if response.status_code != 200:
-                print(f"[DEBUG] _analyze_with_openai_compatible: Error: {response.text[:300]}")
+                logger.warning("openai-compatible error: status=%s body=%s", response.status_code, response.text[:300])
                 raise RuntimeError(f"API returned {response.status_code}: {response.text[:200]}")
             
             data = response.json()
             return data["choices"][0]["message"]["content"] or ""
     except Exception as e:
-        print(f"[DEBUG] _analyze_with_openai_compatible: Error: {e}")
+        logger.debug("openai-compatible request failed: %s", e)
         raise
 
 
 async def analyze_with_settings(payload: str, user_settings: Optional[dict] = None) -> str:
+    """Analyze with user settings or the global config (see ``_analyze_with_settings``),
+    recording latency and errors per provider."""
+    provider = (user_settings or {}).get("provider") or LLM_PROVIDER
+    if provider not in ("openai", "local"):
+        provider = "gemini"
+    start = time.perf_counter()
+    try:
+        return await _analyze_with_settings(payload, user_settings)
+    except Exception:
+        LLM_ERRORS.labels(provider).inc()
+        raise
+    finally:
+        LLM_DURATION.labels(provider).observe(time.perf_counter() - start)
+
+
+async def _analyze_with_settings(payload: str, user_settings: Optional[dict] = None) -> str:
     """
     Analyze payload using user settings if provided, otherwise fall back to global config.
     
@@ -152,12 +173,9 @@ async def analyze_with_settings(payload: str, user_settings: Optional[dict] = No
     provider = None
     if user_settings and user_settings.get("provider"):
         provider = user_settings["provider"]
-        print(f"[DEBUG] Using provider from user_settings: {provider}")
     else:
         provider = LLM_PROVIDER
-        print(f"[DEBUG] Using default LLM_PROVIDER: {LLM_PROVIDER}")
-    
-    print(f"[DEBUG] Final provider: {provider}, user_settings: {user_settings}")
+    logger.debug("llm provider: %s (user settings: %s)", provider, user_settings is not None)
     
     # Get common settings
     if user_settings:
@@ -204,7 +222,7 @@ async def analyze_with_settings(payload: str, user_settings: Optional[dict] = No
         if not base_url and OPENAI_BASE_URL:
             base_url = OPENAI_BASE_URL
         
-        print(f"[DEBUG] local: api_key={'***' if api_key and api_key != 'no-key-required' else 'None'}, model={model}, base_url={base_url}")
+        logger.debug("local llm: model=%s base_url=%s", model, base_url)
         
         if not base_url:
             raise RuntimeError("OpenAI base URL not configured for local LLM")
@@ -213,20 +231,14 @@ async def analyze_with_settings(payload: str, user_settings: Optional[dict] = No
         if user_settings and user_settings.get("openai_api_key"):
             api_key = user_settings["openai_api_key"]
         
-        try:
-            result = await _analyze_with_openai_compatible(
-                payload=payload,
-                api_key=api_key,
-                model=model,
-                base_url=base_url,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
-            print(f"[DEBUG] local: Success!")
-            return result
-        except Exception as e:
-            print(f"[DEBUG] local: Error - {e}")
-            raise
+        return await _analyze_with_openai_compatible(
+            payload=payload,
+            api_key=api_key,
+            model=model,
+            base_url=base_url,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
     
     else:
         # Default to Gemini
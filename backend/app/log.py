@@ -0,0 +1,201 @@
+"""Structured, non-blocking logging for the ``app.*`` loggers.
+
+- Callers only put records on a bounded queue (``QueueHandler``); a listener
+  thread formats and writes them, so a slow stdout (Docker's json-file
+  driver) never blocks the event loop. A full queue drops records and counts
+  them instead of waiting.
+- Records carry the ``run_id``/``user_id`` bound for the current task
+  (``bind``/``log_context``) plus any ``extra`` fields, rendered as one JSON
+  object per line (``LOG_FORMAT=json``) or plain text.
+- Sampling: below WARNING, each message template passes at most
+  ``LOG_SAMPLE_BURST`` times per ``LOG_SAMPLE_WINDOW_SECONDS``; the next record
+  that passes reports how many were dropped (``sampled_out``).
+- Values of secret-looking fields (keys, tokens, passwords) are redacted,
+  in ``extra`` fields and in ``key=value`` pairs inside messages.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "20"))
+LOG_SAMPLE_WINDOW_SECONDS = float(os.getenv("LOG_SAMPLE_WINDOW_SECONDS", "10"))
+
+_context: ContextVar[dict] = ContextVar("log_context", default={})
+
+_SECRET_KEY = re.compile(r"(api[_-]?key|token|secret|password|authorization|credential)", re.I)
+# The value includes an auth scheme, so "Authorization: Bearer <token>" loses the token too.
+_SECRET_PAIR = re.compile(
+    r"((?:api[_-]?key|token|secret|password|authorization)\w*['\"]?\s*[=:]\s*['\"]?)((?:bearer|basic)\s+)?[^\s,'\"}]+",
+    re.I,
+)
+REDACTED = "***"
+
+# LogRecord attributes that are not user ``extra`` fields.
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_listener = None
+_handler = None
+
+
+def bind(**fields) -> None:
+    """Add fields to every record of the current task (and tasks it creates).
+
+    For tasks that end with the request or stream; use ``log_context`` in
+    long-lived tasks.
+    """
+    _context.set({**_context.get(), **fields})
+
+
+@contextmanager
+def log_context(**fields):
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {k: (REDACTED if _SECRET_KEY.search(str(k)) and v else redact(v)) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    if isinstance(value, str):
+        return _SECRET_PAIR.sub(lambda m: m.group(1) + REDACTED, value)
+    return value
+
+
+class _ContextFilter(logging.Filter):
+    def filter(self, record):
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class _SamplingFilter(logging.Filter):
+    """Per message template: ``burst`` records per ``window`` seconds below WARNING."""
+
+    def __init__(self, burst: int = LOG_SAMPLE_BURST, window: float = LOG_SAMPLE_WINDOW_SECONDS):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._lock = threading.Lock()
+        self._seen: dict[tuple, list] = {}
+
+    def filter(self, record):
+        if self.burst <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            state = self._seen.get(key)
+            if state is None or now - state[0] >= self.window:
+                dropped = state[2] if state else 0
+                state = self._seen[key] = [now, 0, 0]
+                if dropped:
+                    record.sampled_out = dropped
+            if state[1] >= self.burst:
+                state[2] += 1
+                return False
+            state[1] += 1
+            if len(self._seen) > 10000:
+                self._seen.clear()
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message and traceback here, in the caller's thread; the
+        # listener only serializes.
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _extra(record) -> dict:
+    fields = {key: value for key, value in record.__dict__.items() if key not in _RESERVED and not key.startswith("_")}
+    return redact(fields)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": redact(record.getMessage()),
+        }
+        entry.update(_extra(record))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        fields = " ".join(f"{key}={value}" for key, value in _extra(record).items())
+        line = f"{self.formatTime(record)} {record.levelname} {record.name}: {redact(record.getMessage())}"
+        if fields:
+            line += f" [{fields}]"
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+def setup_logging() -> None:
+    """Route ``app.*`` loggers through the queue; idempotent."""
+    global _listener, _handler
+    if _listener is not None:
+        return
+    q = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _handler = _QueueHandler(q)
+    _handler.addFilter(_SamplingFilter())
+    _handler.addFilter(_ContextFilter())
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    _listener = logging.handlers.QueueListener(q, stream, respect_handler_level=False)
+    _listener.start()
+
+    logger = logging.getLogger("app")
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(_handler)
+    logger.propagate = False
+
+
+def stop_logging() -> None:
+    """Flush queued records (shutdown)."""
+    global _listener
+    if _listener is None:
+        return
+    if _handler is not None and _handler.dropped:
+        logging.getLogger("app.log").warning("log queue full, %d records dropped", _handler.dropped)
+    _listener.stop()
+    _listener = None
@@ -1,17 +1,21 @@
 import asyncio
+import base64
 import copy
 import json
 import subprocess
 import os
 import random
 import hashlib
+import hmac
+import logging
 import tempfile
 import uuid
 import re
 import ssl
 import socket
 import time
-from datetime import datetime, timezone, timedelta
+from contextlib import aclosing
+from datetime import date, datetime, timezone, timedelta
 from typing import Optional
 
 import httpx
@@ -26,15 +30,64 @@ from openai import AsyncOpenAI
 from sqlalchemy import delete, func, or_, select
 from sqlalchemy.exc import IntegrityError, OperationalError
 
-from .database import SessionLocal, engine, Base
-from .llm import GEMINI_KEYS_LIST, OPENAI_API_KEY, OPENAI_BASE_URL, analyze_with_settings
-from .k6_parser import parse_k6_ndjson
-from .k6_runner import run_k6_stream
-from .models import LoadTest, User, UserLLMSettings
+from . import tracing
+from .log import bind as bind_log, log_context, setup_logging, stop_logging
+from .abort_policy import abort_policy
+from .cache import TTLCache
+from .capacity import CAPACITY_STEP_DURATION, search_capacity
+from .database import SessionLocal, engine
+from .llm import GEMINI_KEYS_LIST, LLM_PROVIDER, OPENAI_API_KEY, OPENAI_BASE_URL, analyze_with_settings
+from .k6_parser import parse_run_output
+from .k6_runner import K6_COMMAND, K6_SUMMARY_TREND_STATS, build_scenario, k6_env, output_target, run_k6_stream
+from .metrics import (
+    METRICS_ENABLED,
+    METRICS_PUBLIC,
+    METRICS_TOKEN,
+    LoopLagMonitor,
+    bind as bind_metrics,
+    observe_stage,
+    render as render_metrics,
+)
+from .migrations import backfill_summary, upgrade_schema
+from .models import LoadTest, LoadTestBaseline, LoadTestRollup, LoadTestSchedule, User, UserLLMSettings
+from .password_pool import HashingOverloaded, HashingPool
 from .pdf_generator import generate
-from .schemas import RunRequest, LoginPayload, UserCreate, PasswordUpdate, UserLLMSettingsUpdate, UserLLMSettingsOut
+from .profiler import RunProfiler, stage as profile_stage
+from .regression import check_regression, record_baseline
+from .result_summary import summary_columns
+from .rollups import PERIODS, TRENDS_DEFAULT_DAYS, TRENDS_MAX_BUCKETS, backfill_rollups, load_trend, record_run
+from .run_compare import COMPARE_CACHE_SECONDS, COMPARE_MAX_RUNS, COMPARE_POINTS, build_comparison, load_runs
+from .run_queue import RunQueue, target_key
+from .run_supervisor import (
+    WORKSPACE_PREFIX,
+    K6Process,
+    active_run,
+    cancel_all_runs,
+    register_run,
+    remove_workspace,
+    run_deadline,
+    sweep_stale_workspaces,
+    unregister_run,
+)
+from .saturation import SaturationSampler, assess, timeline_series
+from .scheduler import SCHEDULER_ENABLED, SCHEDULER_JITTER_SECONDS, Scheduler, next_fire, utcnow, validate_cron
+from .schemas import (
+    CapacityRequest,
+    RunRequest,
+    LoginPayload,
+    ScheduleCreate,
+    ScheduleUpdate,
+    UserCreate,
+    PasswordUpdate,
+    UserLLMSettingsUpdate,
+    UserLLMSettingsOut,
+)
 from .scoring import calculate_score
-from .url_safety import UnsafeUrlError, validate_target_url
+from .timeline_store import add_timeline, delete_timeline, filter_timeline, load_timeline, parse_time_bound
+from .url_safety import PinnedTransport, UnsafeUrlError, chromium_resolver_flag, resolve_target
+
+setup_logging()
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
@@ -48,15 +101,26 @@ os.makedirs(RESULT_DIR, exist_ok=True)
 
 ENABLE_SCRIPT_UPLOAD = os.getenv("ENABLE_SCRIPT_UPLOAD", "false").lower() in {"1", "true", "yes"}
 MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", "200000"))
+RESULT_COUNT_CACHE_SECONDS = float(os.getenv("RESULT_COUNT_CACHE_SECONDS", "30"))
 
 AUTH_SECRET = os.getenv("AUTH_SECRET", "k6-ai-powered-default-secret")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
 JWT_ALGORITHM = "HS256"
+# Authenticated users are cached per worker for AUTH_CACHE_SECONDS. With
+# AUTH_STATELESS the signed token claims are trusted and no DB lookup happens
+# at all (role/username changes then apply only to newly issued tokens).
+AUTH_CACHE_SECONDS = float(os.getenv("AUTH_CACHE_SECONDS", "30"))
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "false").lower() in {"1", "true", "yes"}
 INITIAL_ADMIN_USERNAME = os.getenv("INITIAL_ADMIN_USERNAME")
 INITIAL_ADMIN_EMAIL = os.getenv("INITIAL_ADMIN_EMAIL")
 INITIAL_ADMIN_PASSWORD = os.getenv("INITIAL_ADMIN_PASSWORD")
 # Prefer Argon2 (Argon2id) for new password hashes, while still verifying legacy bcrypt.
 pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
+user_cache = TTLCache(ttl=AUTH_CACHE_SECONDS, maxsize=4096)
+hashing_pool = HashingPool()
+# Runs without a client connection (scheduled runs) share the generator through this queue.
+run_queue = RunQueue()
+loop_lag_monitor = LoopLagMonitor()
 
 
 async def get_user_llm_settings(user_id: str) -> Optional[dict]:
@@ -71,9 +135,9 @@ async def get_user_llm_settings(user_id: str) -> Optional[dict]:
         settings = result.scalar_one_or_none()
         
         if not settings:
-            print(f"[DEBUG] No LLM settings found for user_id: {user_id}")
+            logger.debug("no llm settings for user")
             return None
-        print(f"[DEBUG] Found LLM settings for user_id {user_id}: provider={settings.provider}, openai_base_url={settings.openai_base_url}")
+        logger.debug("llm settings found: provider=%s", settings.provider)
         return {
             "provider": settings.provider,
             "gemini_api_key": settings.gemini_api_key,
@@ -97,21 +161,17 @@ async def analyze_with_retry(
     user_settings = None
     if user_id:
         user_settings = await get_user_llm_settings(user_id)
-        print(f"[DEBUG] analyze_with_retry: user_id={user_id}, user_settings={user_settings}")
-    
-    print(f"[DEBUG] analyze_with_retry: Calling analyze_with_settings with user_settings={user_settings is not None}")
     
     last_error = None
     for attempt in range(1, retries + 1):
-        print(f"[DEBUG] Attempt {attempt}...")
         try:
-            result = await analyze_with_settings(payload, user_settings)
-            print(f"[DEBUG] Success on attempt {attempt}")
+            with tracing.span("llm.attempt", attempt=attempt, provider=(user_settings or {}).get("provider") or LLM_PROVIDER):
+                result = await analyze_with_settings(payload, user_settings)
             return result
         except Exception as exc:  # noqa: BLE001
             last_error = exc
             msg = str(exc).lower()
-            print(f"[DEBUG] Attempt {attempt} failed: {exc}")
+            logger.warning("llm attempt %d/%d failed: %s", attempt, retries, exc)
             # Retry on network errors
             if ("503" in msg or "unavailable" in msg or "overloaded" in msg or "timeout" in msg or "connection" in msg) and attempt < retries:
                 await asyncio.sleep(delay * attempt)
@@ -120,14 +180,19 @@ async def analyze_with_retry(
     
     # Don't fallback to global - just fail with user's configured provider
     # This prevents using wrong API keys
-    print(f"[DEBUG] All attempts failed, returning fallback")
+    logger.error("llm analysis unavailable: %s", last_error)
     return f"Analysis unavailable: {last_error}" if last_error else "Analysis unavailable"
 
 
-async def run_lighthouse_with_retry(target_url: str, retries: int = 2, delay: float = 2.0):
+async def run_lighthouse_with_retry(
+    target_url: str,
+    retries: int = 2,
+    delay: float = 2.0,
+    pinned_ips: dict[str, str] | None = None,
+):
     last_error = None
     for attempt in range(1, retries + 1):
-        result = await run_lighthouse(target_url)
+        result = await run_lighthouse(target_url, pinned_ips)
         if result.get("status") == "OK":
             return result
         msg = (result.get("error") or "").lower()
@@ -172,6 +237,8 @@ def _trim_metrics_for_llm(data: dict, max_timeline_buckets: int = 30) -> dict:
     Reduce payload size by trimming timeline data while keeping key statistics.
     """
     trimmed = copy.deepcopy(data)
+    # Bucket counts mean nothing to the model; `regression` carries the verdicts.
+    trimmed.pop("latency_sketch", None)
 
     timeline = trimmed.get("timeline", {})
     if not isinstance(timeline, dict):
@@ -195,16 +262,90 @@ def _trim_metrics_for_llm(data: dict, max_timeline_buckets: int = 30) -> dict:
     timeline["latency"] = _sample_buckets(timeline.get("latency", {}))
     timeline["requests"] = _sample_buckets(timeline.get("requests", {}))
     timeline["checks"] = _sample_buckets(timeline.get("checks", {}))
+    # Raw generator samples stay out of the prompt; the `generator` summary is enough.
+    timeline.pop("generator", None)
 
     return trimmed
 
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+def _attach_generator_samples(parsed_metrics: dict, samples: list[dict]) -> None:
+    """Store saturation samples in the timeline and flag the scorecard."""
+    generator = assess(samples)
+    parsed_metrics["generator"] = generator
+    parsed_metrics.setdefault("scorecard", {})["generator_saturated"] = generator["saturated"]
+    if samples:
+        parsed_metrics.setdefault("timeline", {})["generator"] = timeline_series(samples)
 
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+def _attach_agent_failures(parsed_metrics: dict, failures: list[dict], partial: bool = True) -> None:
+    """Record the generator nodes that failed; ``partial``: the metrics miss their share of the load."""
+    if not failures:
+        return
+    parsed_metrics["agents"] = {"failed": failures}
+    if partial:
+        parsed_metrics.setdefault("scorecard", {})["partial"] = True
+
+
+def _skip_probes(parsed_metrics: dict, reason: str):
+    """Mark every probe as not run; yields the SSE skip events."""
+    parsed_metrics["security_status"] = "error"
+    parsed_metrics["security_headers"] = {"error": reason.lower()}
+    parsed_metrics["ssl"] = {"status": "ERROR", "score": 0, "findings": [{"id": "no_target", "severity": "high", "message": reason}]}
+    parsed_metrics["webpagetest"] = {"status": "ERROR", "error": reason}
+    parsed_metrics["lighthouse"] = {"status": "ERROR", "error": reason}
+    for probe in ("security_headers", "ssl", "wpt", "lighthouse"):
+        yield f"data: PROGRESS:{probe}:skip\n\n"
+
+
+async def _probe_target(parsed_metrics: dict, safe_url: str, pinned_ips: dict, run_span=None):
+    """Security headers, SSL, WebPageTest and Lighthouse; yields SSE progress events."""
+    # Security headers
+    yield "data: PROGRESS:security_headers:start\n\n"
+    with observe_stage("security_headers"), tracing.span("probe.security_headers", run_span):
+        security_headers = await fetch_security_headers(safe_url, pinned_ips)
+    parsed_metrics["security_headers"] = security_headers
+    parsed_metrics["security_status"] = "ready" if "error" not in security_headers else "error"
+    yield "data: PROGRESS:security_headers:done\n\n"
+
+    # SSL scan
+    yield "data: PROGRESS:ssl:start\n\n"
+    with observe_stage("ssl"), tracing.span("probe.ssl", run_span):
+        parsed_metrics["ssl"] = await ssl_scan(safe_url, pinned_ips)
+    yield "data: PROGRESS:ssl:done\n\n"
+
+    # WebPageTest (Playwright)
+    yield "data: PROGRESS:wpt:start\n\n"
+    with observe_stage("wpt"), tracing.span("probe.wpt", run_span):
+        parsed_metrics["webpagetest"] = await run_webpagetest(safe_url, pinned_ips)
+    yield "data: PROGRESS:wpt:done\n\n"
+
+    # Lighthouse
+    yield "data: PROGRESS:lighthouse:start\n\n"
+    with observe_stage("lighthouse"), tracing.span("probe.lighthouse", run_span):
+        parsed_metrics["lighthouse"] = await run_lighthouse_with_retry(safe_url, pinned_ips=pinned_ips)
+    yield "data: PROGRESS:lighthouse:done\n\n"
+
+
+def _hashing_overloaded() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many concurrent password operations, retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def hash_password(password: str) -> str:
+    try:
+        return await hashing_pool.run(pwd_context.hash, password)
+    except HashingOverloaded:
+        raise _hashing_overloaded()
+
+
+async def verify_password(plain: str, hashed: str) -> bool:
+    try:
+        return await hashing_pool.run(pwd_context.verify, plain, hashed)
+    except HashingOverloaded:
+        raise _hashing_overloaded()
 
 
 def create_access_token(user: User, expires_delta: timedelta | None = None) -> str:
@@ -245,12 +386,22 @@ async def get_current_user(
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
+    bind_log(user_id=user_id)
+
+    if AUTH_STATELESS:
+        # Transient (never added to a session); carries only the token claims.
+        return User(id=user_id, username=payload.get("username"), role=payload.get("role") or "user")
+
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
 
     async with SessionLocal() as session:
         user = await session.get(User, user_id)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
-        return user
+    user_cache.set(user_id, user)
+    return user
 
 
 def require_admin(user: User = Depends(get_current_user)) -> User:
@@ -300,7 +451,7 @@ def map_grade(score: float | None) -> str:
     return "F"
 
 
-async def fetch_security_headers(target_url: str):
+async def fetch_security_headers(target_url: str, pinned_ips: dict[str, str] | None = None):
     url = target_url if target_url.startswith("http") else f"https://{target_url}"
 
     try:
@@ -308,6 +459,7 @@ async def fetch_security_headers(target_url: str):
             follow_redirects=True,
             timeout=10,
             headers={"User-Agent": USER_AGENT},
+            transport=PinnedTransport(pinned_ips),
         ) as client:
             resp = await client.get(url)
 
@@ -350,11 +502,13 @@ def _normalize_version(label: str | None) -> str | None:
     return label
 
 
-async def ssl_scan(target_url: str):
+async def ssl_scan(target_url: str, pinned_ips: dict[str, str] | None = None):
     async def _run():
         parsed = httpx.URL(target_url if target_url.startswith("http") else f"https://{target_url}")
         host = parsed.host
         port = parsed.port or 443
+        # Connect to the validated IP; SNI still uses the hostname.
+        connect_host = (pinned_ips or {}).get(host, host)
 
         supported_versions: list[str] = []
         weak_versions: list[str] = []
@@ -369,7 +523,7 @@ async def ssl_scan(target_url: str):
             ctx.check_hostname = False
             ctx.verify_mode = ssl.CERT_NONE
             try:
-                with socket.create_connection((host, port), timeout=10) as sock:
+                with socket.create_connection((connect_host, port), timeout=10) as sock:
                     with ctx.wrap_socket(sock, server_hostname=host) as ssock:
                         negotiated_ciphers.append(ssock.cipher()[0])
                         return True
@@ -381,7 +535,7 @@ async def ssl_scan(target_url: str):
             ctx.minimum_version = ssl.TLSVersion.TLSv1_2
             ctx.check_hostname = False
             ctx.verify_mode = ssl.CERT_NONE
-            with socket.create_connection((host, port), timeout=10) as sock:
+            with socket.create_connection((connect_host, port), timeout=10) as sock:
                 with ctx.wrap_socket(sock, server_hostname=host) as ssock:
                     ver = ssock.version()
                     cipher = ssock.cipher()[0]
@@ -512,7 +666,7 @@ async def ssl_scan(target_url: str):
         return {"status": "ERROR", "score": 0, "findings": [{"id": "ssl_error", "severity": "high", "message": str(exc)}]}
 
 
-async def run_webpagetest(target_url: str):
+async def run_webpagetest(target_url: str, pinned_ips: dict[str, str] | None = None):
     try:
         from playwright.async_api import async_playwright
     except Exception as exc:  # noqa: BLE001
@@ -580,7 +734,11 @@ async def run_webpagetest(target_url: str):
 
     try:
         async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True, args=["--disable-dev-shm-usage"])
+            launch_args = ["--disable-dev-shm-usage"]
+            resolver_flag = chromium_resolver_flag(pinned_ips)
+            if resolver_flag:
+                launch_args.append(resolver_flag)
+            browser = await p.chromium.launch(headless=True, args=launch_args)
             context = await browser.new_context(user_agent=USER_AGENT, viewport={"width": 1280, "height": 720})
             first = await capture(context, normalized_url)
             repeat = await capture(context, normalized_url)
@@ -723,7 +881,7 @@ async def run_webpagetest(target_url: str):
     }
 
 
-async def run_lighthouse(target_url: str):
+async def run_lighthouse(target_url: str, pinned_ips: dict[str, str] | None = None):
     url = target_url if target_url.startswith("http") else f"https://{target_url}"
 
     try:
@@ -739,6 +897,11 @@ async def run_lighthouse(target_url: str):
         return {"status": "ERROR", "error": f"chromium path error: {exc}"}
 
     chrome_flags = "--headless=new --no-sandbox --disable-dev-shm-usage --disable-gpu"
+    resolver_flag = chromium_resolver_flag(pinned_ips)
+    if resolver_flag:
+        # The rules contain spaces; quote the value for Lighthouse's flag parser.
+        name, value = resolver_flag.split("=", 1)
+        chrome_flags += f' {name}="{value}"'
 
     cmd = [
         "lighthouse",
@@ -858,7 +1021,7 @@ async def ensure_initial_admin():
                 id=str(uuid.uuid4()),
                 username=INITIAL_ADMIN_USERNAME,
                 email=INITIAL_ADMIN_EMAIL,
-                hashed_password=hash_password(INITIAL_ADMIN_PASSWORD),
+                hashed_password=await hash_password(INITIAL_ADMIN_PASSWORD),
                 role="admin",
             )
             session.add(user)
@@ -879,15 +1042,17 @@ async def ensure_initial_admin():
             changed = True
 
         # Rotate password if env password doesn't match.
-        if not verify_password(INITIAL_ADMIN_PASSWORD, user.hashed_password):
-            user.hashed_password = hash_password(INITIAL_ADMIN_PASSWORD)
+        if not await verify_password(INITIAL_ADMIN_PASSWORD, user.hashed_password):
+            user.hashed_password = await hash_password(INITIAL_ADMIN_PASSWORD)
             changed = True
 
         if changed:
+            user_id = user.id
             try:
                 await session.commit()
             except IntegrityError:
                 await session.rollback()
+            user_cache.invalidate(user_id)
 
 
 SUSPICIOUS_PATTERNS = [
@@ -912,16 +1077,102 @@ def extract_first_url(content: str):
     return match.group(0) if match else None
 
 
+async def save_load_test(
+    run_id: str,
+    project_name: str,
+    url: str,
+    parsed_metrics: dict,
+    analysis: str,
+    pdf_path: str,
+    user: User,
+):
+    """Persist a finished run.
+
+    The per-second timeline goes to ``load_test_timelines``; ``result_json``
+    keeps only the summary so result reads stay small. A partial run (a
+    generator node failed) is kept out of the trend rollups.
+    """
+    summary = dict(parsed_metrics)
+    timeline = summary.pop("timeline", None) or {}
+    partial = bool((summary.get("scorecard") or {}).get("partial"))
+
+    async with SessionLocal() as session:
+        session.add(
+            LoadTest(
+                id=run_id,
+                project_name=project_name,
+                url=url,
+                status="finished",
+                result_json=summary,
+                analysis=analysis,
+                pdf_path=pdf_path,
+                user_id=user.id,
+                username=user.username,
+                # False (not NULL): neither the save path nor the backfill rolls it up.
+                rolled_up=False if partial else None,
+                **summary_columns(summary),
+            )
+        )
+        timeline_rows = add_timeline(session, run_id, timeline)
+        with tracing.span("db.commit", timeline_rows=timeline_rows):
+            await session.commit()
+    result_count_cache.clear()
+    if partial:
+        return
+    try:
+        await record_run(run_id)
+    except Exception as exc:
+        # The run stays unflagged and the next rollup backfill picks it up.
+        logger.warning("run not rolled up: %s", exc)
+
+
+async def _backfill() -> None:
+    await backfill_summary()
+    # Rollups read the summary columns, so they go second.
+    await backfill_rollups()
+
+
 @app.on_event("startup")
 async def startup():
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
     await ensure_initial_admin()
+    tracing.setup()
+    sweep_stale_workspaces()
+    # Idempotent; only touches rows whose list columns or rollups are not filled yet.
+    app.state.summary_backfill = asyncio.create_task(_backfill())
+    run_queue.start()
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+    if METRICS_ENABLED:
+        bind_metrics(run_queue, engine)
+        loop_lag_monitor.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    # Stop k6 gracefully; each run's stream then reaps its process group.
+    cancel_all_runs("shutdown")
+    await scheduler.stop()
+    await run_queue.stop()
+    await loop_lag_monitor.stop()
+    tracing.shutdown()
+    hashing_pool.shutdown()
     await engine.dispose()
+    stop_logging()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(authorization: str | None = Header(None)):
+    """Prometheus exposition; needs ``Bearer $METRICS_TOKEN`` unless METRICS_PUBLIC is set."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404)
+    if not METRICS_PUBLIC:
+        token = (authorization or "").removeprefix("Bearer ").strip()
+        if not METRICS_TOKEN or not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+            raise HTTPException(status_code=401, detail="Unauthorized")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 
 @app.post("/api/auth/login")
@@ -932,7 +1183,7 @@ async def login(payload: LoginPayload):
         )
         result = await session.execute(stmt)
         user = result.scalar_one_or_none()
-        if not user or not verify_password(payload.password, user.hashed_password):
+        if not user or not await verify_password(payload.password, user.hashed_password):
             raise HTTPException(status_code=401, detail="Invalid credentials")
 
         token = create_access_token(user)
@@ -973,7 +1224,7 @@ async def create_user(payload: UserCreate, admin: User = Depends(require_admin))
         id=str(uuid.uuid4()),
         username=payload.username,
         email=payload.email,
-        hashed_password=hash_password(payload.password),
+        hashed_password=await hash_password(payload.password),
         role=payload.role,
     )
     async with SessionLocal() as session:
@@ -995,15 +1246,17 @@ async def create_user(payload: UserCreate, admin: User = Depends(require_admin))
 
 @app.put("/api/profile/password")
 async def update_password(payload: PasswordUpdate, current_user: User = Depends(get_current_user)):
-    if not verify_password(payload.current_password, current_user.hashed_password):
-        raise HTTPException(status_code=400, detail="Current password incorrect")
-
     async with SessionLocal() as session:
+        # Verify against the stored hash, not the (possibly cached or
+        # stateless) current_user.
         user = await session.get(User, current_user.id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
-        user.hashed_password = hash_password(payload.new_password)
+        if not await verify_password(payload.current_password, user.hashed_password):
+            raise HTTPException(status_code=400, detail="Current password incorrect")
+        user.hashed_password = await hash_password(payload.new_password)
         await session.commit()
+    user_cache.invalidate(current_user.id)
 
     return {"status": "ok"}
 
@@ -1139,7 +1392,7 @@ async def test_llm_connection(
                 raise HTTPException(status_code=400, detail="Base URL is required for local provider")
 
             api_key = payload.openai_api_key or "EMPTY"
-            print(f"[DEBUG] local test: Testing with api_key={'***' if api_key != 'EMPTY' else 'EMPTY'}, base_url={base_url}")
+            logger.debug("local provider test: base_url=%s", base_url)
             
             # Try direct HTTP request like curl
             headers = {
@@ -1153,8 +1406,7 @@ async def test_llm_connection(
                         f"{base_url.rstrip('/')}/models",
                         headers=headers
                     )
-                    print(f"[DEBUG] local test: Response status: {response.status_code}")
-                    print(f"[DEBUG] local test: Response body: {response.text[:500]}")
+                    logger.debug("local provider test: status=%s", response.status_code)
                     
                     if response.status_code != 200:
                         raise HTTPException(status_code=400, detail=f"API returned {response.status_code}: {response.text[:200]}")
@@ -1167,7 +1419,7 @@ async def test_llm_connection(
                         message = f"Local provider connection successful (sample model: {model_name})"
                     return {"status": "ok", "provider": provider, "message": message}
                 except httpx.RequestError as e:
-                    print(f"[DEBUG] local test: Request error: {e}")
+                    logger.debug("local provider test failed: %s", e)
                     raise HTTPException(status_code=400, detail=f"Connection error: {str(e)}")
 
         raise HTTPException(status_code=400, detail=f"Unsupported provider: {provider}")
@@ -1178,6 +1430,150 @@ async def test_llm_connection(
         raise HTTPException(status_code=400, detail=f"Connection test failed: {exc}") from exc
 
 
+async def _prepare_run(req: RunRequest):
+    """Validate a builder run; returns ``(safe_url, pinned_ips, stages, scenario, policy)``."""
+    try:
+        target = await resolve_target(str(req.url))
+    except UnsafeUrlError as exc:
+        raise HTTPException(status_code=400, detail=f"Unsafe target url: {exc}") from exc
+    # Every stage reuses the validated IPs instead of resolving the host again.
+    pinned_ips = target.pinned_ips
+
+    stages = [s.dict() for s in req.stages]
+    try:
+        scenario = build_scenario(
+            stages,
+            executor=req.executor,
+            rate=req.rate,
+            duration=req.duration,
+            time_unit=req.time_unit,
+            start_rate=req.start_rate,
+            pre_allocated_vus=req.pre_allocated_vus,
+            max_vus=req.max_vus,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid load profile: {exc}") from exc
+    policy = abort_policy(**(req.abort.dict() if req.abort else {}))
+    return target.url, pinned_ips, stages, scenario, policy
+
+
+async def _run_pipeline(run_id: str, req: RunRequest, prepared, user: User, schedule=None):
+    """One builder run as SSE events: k6, probes, analysis, PDF and save."""
+    safe_url, pinned_ips, stages, scenario, policy = prepared
+    output_path = None
+    summary_path = None
+    tmp_dir = None
+    generator_samples = []
+    agent_failures = []
+    aborted = None
+    profiler = RunProfiler(run_id) if req.profile and user.role == "admin" else None
+
+    bind_log(run_id=run_id)
+    with tracing.span(
+        "run",
+        run_id=run_id,
+        mode="builder",
+        project=req.project_name,
+        url=safe_url,
+        schedule_id=schedule.id if schedule else None,
+    ) as run_span:
+        handle = register_run(run_id, user.id, target_key(safe_url))
+        try:
+            yield f"data: RUN_STARTED:{run_id}\n\n"
+            with observe_stage("k6"), tracing.span("k6", run_span):
+                lines = run_k6_stream(
+                    safe_url,
+                    stages,
+                    pinned_ips,
+                    include_timeline=req.include_timeline,
+                    scenario=scenario,
+                    abort_policy=policy,
+                    handle=handle,
+                )
+                async with aclosing(lines):
+                    async for line in lines:
+                        if line.startswith("__ABORT__:"):
+                            aborted = json.loads(line.replace("__ABORT__:", "", 1))
+                            continue
+                        if line.startswith("__AGENT_FAILED__:"):
+                            agent_failures.append(json.loads(line.replace("__AGENT_FAILED__:", "", 1)))
+                            continue
+                        if line.startswith("__SATURATION__:"):
+                            generator_samples = json.loads(line.replace("__SATURATION__:", "", 1))
+                            continue
+                        if line.startswith("__TMP_DIR__:"):
+                            tmp_dir = line.replace("__TMP_DIR__:", "").strip()
+                            continue
+                        if line.startswith("__SUMMARY_PATH__:"):
+                            summary_path = line.replace("__SUMMARY_PATH__:", "").strip()
+                            continue
+                        if line.startswith("__OUTPUT_PATH__:"):
+                            output_path = line.replace("__OUTPUT_PATH__:", "").strip()
+                        else:
+                            yield f"data: {line}\n\n"
+
+            with profile_stage(profiler, "parse"):
+                parsed_metrics = parse_run_output(output_path, summary_path)
+        finally:
+            unregister_run(run_id)
+            remove_workspace(tmp_dir)
+        aborted = aborted or handle.cancelled
+
+        with profile_stage(profiler, "scoring"):
+            parsed_metrics["scorecard"] = calculate_score(parsed_metrics.get("metrics", {}))
+        _attach_generator_samples(parsed_metrics, generator_samples)
+        _attach_agent_failures(parsed_metrics, agent_failures)
+        if aborted:
+            parsed_metrics["abort"] = aborted
+            parsed_metrics["scorecard"]["aborted"] = True
+        parsed_metrics["run_by"] = {
+            "id": user.id,
+            "username": user.username,
+            "role": user.role,
+        }
+        if schedule is not None:
+            parsed_metrics["schedule"] = {"id": schedule.id, "name": schedule.name, "cron": schedule.cron}
+        # Before analysis and PDF so both can report it; the run joins the
+        # baseline only once it is saved.
+        try:
+            parsed_metrics["regression"] = await check_regression(
+                req.project_name, safe_url, scenario, run_id, parsed_metrics
+            )
+        except Exception as exc:
+            logger.warning("regression check failed: %s", exc)
+            parsed_metrics["regression"] = None
+
+        if handle.cancelled:
+            for event in _skip_probes(parsed_metrics, "Run cancelled"):
+                yield event
+        else:
+            async for event in _probe_target(parsed_metrics, safe_url, pinned_ips, run_span):
+                yield event
+
+        with tracing.current(run_span):
+            with profile_stage(profiler, "trim"):
+                trimmed_metrics = _trim_metrics_for_llm(parsed_metrics, max_timeline_buckets=30)
+            with observe_stage("llm"), profile_stage(profiler, "llm"):
+                analysis = await analyze_with_retry(json.dumps(trimmed_metrics), user.id)
+
+            pdf_path = os.path.join(RESULT_DIR, f"{run_id}-load.pdf")
+            with observe_stage("pdf"), tracing.span("pdf.generate"), profile_stage(profiler, "pdf"):
+                generate(pdf_path, req.project_name, safe_url, json.dumps(parsed_metrics), analysis)
+
+            parsed_metrics["security_pdf_path"] = pdf_path
+            if profiler is not None:
+                parsed_metrics["profile_path"] = profiler.save(os.path.join(RESULT_DIR, f"{run_id}-profile.speedscope.json"))
+
+            await save_load_test(run_id, req.project_name, safe_url, parsed_metrics, analysis, pdf_path, user)
+            try:
+                await record_baseline(req.project_name, safe_url, scenario, run_id, parsed_metrics)
+            except Exception as exc:
+                logger.warning("run not added to regression baseline: %s", exc)
+
+        yield "data: __FINISHED__\n\n"
+        yield f"data: RUN_ID:{run_id}\n\n"
+
+
 @app.post("/api/run")
 async def run_test(
     req: RunRequest,
@@ -1185,114 +1581,348 @@ async def run_test(
     current_user: User = Depends(get_current_user),
 ):
     verify_key(x_api_key)
+    if req.profile and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Profiling is limited to admins")
+    prepared = await _prepare_run(req)
+    run_id = str(uuid.uuid4())
+    return StreamingResponse(_run_pipeline(run_id, req, prepared, current_user), media_type="text/event-stream")
+
+
+async def run_scheduled(schedule: LoadTestSchedule, run_id: str) -> None:
+    """Headless builder run for the scheduler (no client connection)."""
+    async with SessionLocal() as session:
+        user = await session.get(User, schedule.user_id)
+    if user is None:
+        raise RuntimeError("schedule owner no longer exists")
+    req = RunRequest(**schedule.request)
+    prepared = await _prepare_run(req)
+    # The queue worker task is reused across jobs, so the context is scoped.
+    with log_context(user_id=user.id, schedule_id=schedule.id):
+        events = _run_pipeline(run_id, req, prepared, user, schedule)
+        async with aclosing(events):
+            async for _ in events:
+                pass
+
+
+scheduler = Scheduler(run_queue, run_scheduled)
+
+
+@app.post("/api/run/capacity")
+async def run_capacity(
+    req: CapacityRequest,
+    x_api_key: str | None = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    verify_key(x_api_key)
 
+    if req.start_rate < 1 or req.max_rate < req.start_rate:
+        raise HTTPException(status_code=400, detail="Invalid capacity search: need 1 <= start_rate <= max_rate")
+    if req.growth <= 1:
+        raise HTTPException(status_code=400, detail="Invalid capacity search: growth must be > 1")
     try:
-        safe_url = validate_target_url(str(req.url))
+        build_scenario(
+            [],
+            "constant-arrival-rate",
+            rate=req.max_rate,
+            duration=req.step_duration or CAPACITY_STEP_DURATION,
+            pre_allocated_vus=req.pre_allocated_vus,
+            max_vus=req.max_vus,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid capacity search: {exc}") from exc
+
+    try:
+        target = await resolve_target(str(req.url))
     except UnsafeUrlError as exc:
         raise HTTPException(status_code=400, detail=f"Unsafe target url: {exc}") from exc
+    safe_url = target.url
+    pinned_ips = target.pinned_ips
 
     user_id = current_user.id
 
     async def event_stream():
-        nonlocal user_id
         run_id = str(uuid.uuid4())
-        json_path = None
-        tmp_dir = None
+        capacity = {}
+
+        bind_log(run_id=run_id)
+        with tracing.span(
+            "run",
+            run_id=run_id,
+            mode="capacity",
+            project=req.project_name,
+            url=safe_url,
+        ) as run_span:
+            handle = register_run(run_id, user_id, target_key(safe_url))
+            try:
+                yield f"data: RUN_STARTED:{run_id}\n\n"
+                with observe_stage("capacity"), tracing.span("capacity", run_span):
+                    lines = search_capacity(
+                        safe_url,
+                        pinned_ips,
+                        start_rate=req.start_rate,
+                        max_rate=req.max_rate,
+                        growth=req.growth,
+                        step_duration=req.step_duration,
+                        max_steps=req.max_steps,
+                        p95_ms=req.p95_ms,
+                        error_rate=req.error_rate,
+                        pre_allocated_vus=req.pre_allocated_vus,
+                        max_vus=req.max_vus,
+                        handle=handle,
+                    )
+                    async with aclosing(lines):
+                        async for line in lines:
+                            if line.startswith("__CAPACITY_STEP__:"):
+                                yield f"data: CAPACITY_STEP:{line.replace('__CAPACITY_STEP__:', '', 1)}\n\n"
+                            elif line.startswith("__CAPACITY__:"):
+                                capacity = json.loads(line.replace("__CAPACITY__:", "", 1))
+                            else:
+                                yield f"data: {line}\n\n"
+            finally:
+                unregister_run(run_id)
+
+            parsed_metrics = {
+                "metrics": capacity.pop("metrics", {}),
+                "timeline": capacity.pop("timeline", {}),
+            }
+            generator_samples = capacity.pop("samples", [])
+            parsed_metrics["capacity"] = capacity
+            parsed_metrics["scorecard"] = calculate_score(parsed_metrics["metrics"])
+            parsed_metrics["scorecard"]["max_rps"] = capacity.get("max_rps")
+            _attach_generator_samples(parsed_metrics, generator_samples)
+            # The step that lost an agent was dropped; the reported steps ran in full.
+            _attach_agent_failures(parsed_metrics, capacity.pop("agent_failures", []), partial=False)
+            if handle.cancelled:
+                parsed_metrics["abort"] = handle.cancelled
+                parsed_metrics["scorecard"]["aborted"] = True
+            parsed_metrics["run_by"] = {
+                "id": current_user.id,
+                "username": current_user.username,
+                "role": current_user.role,
+            }
 
-        async for line in run_k6_stream(safe_url, [s.dict() for s in req.stages]):
-            if line.startswith("__TMP_DIR__:"):
-                tmp_dir = line.replace("__TMP_DIR__:", "").strip()
-                continue
-            if line.startswith("__JSON_PATH__:"):
-                json_path = line.replace("__JSON_PATH__:", "").strip()
+            if handle.cancelled:
+                for event in _skip_probes(parsed_metrics, "Run cancelled"):
+                    yield event
             else:
-                yield f"data: {line}\n\n"
+                async for event in _probe_target(parsed_metrics, safe_url, pinned_ips, run_span):
+                    yield event
 
-        raw_ndjson = ""
-        if json_path and os.path.exists(json_path):
-            with open(json_path) as f:
-                raw_ndjson = f.read()
+            with tracing.current(run_span):
+                trimmed_metrics = _trim_metrics_for_llm(parsed_metrics, max_timeline_buckets=30)
+                with observe_stage("llm"):
+                    analysis = await analyze_with_retry(json.dumps(trimmed_metrics), user_id)
 
-        # Best-effort cleanup of temp artifacts.
-        try:
-            if json_path and os.path.exists(json_path):
-                os.remove(json_path)
-        except Exception:
-            pass
+                pdf_path = os.path.join(RESULT_DIR, f"{run_id}-load.pdf")
+                with observe_stage("pdf"), tracing.span("pdf.generate"):
+                    generate(pdf_path, req.project_name, safe_url, json.dumps(parsed_metrics), analysis)
+                parsed_metrics["security_pdf_path"] = pdf_path
 
-        try:
-            if tmp_dir and os.path.isdir(tmp_dir):
-                for name in os.listdir(tmp_dir):
-                    path = os.path.join(tmp_dir, name)
-                    try:
-                        os.remove(path)
-                    except Exception:
-                        pass
-                os.rmdir(tmp_dir)
-        except Exception:
-            pass
+                await save_load_test(run_id, req.project_name, safe_url, parsed_metrics, analysis, pdf_path, current_user)
 
-        parsed_metrics = parse_k6_ndjson(raw_ndjson)
-        parsed_metrics["scorecard"] = calculate_score(parsed_metrics.get("metrics", {}))
-        parsed_metrics["run_by"] = {
-            "id": current_user.id,
-            "username": current_user.username,
-            "role": current_user.role,
-        }
+            yield "data: __FINISHED__\n\n"
+            yield f"data: RUN_ID:{run_id}\n\n"
 
-        # Security headers
-        yield "data: PROGRESS:security_headers:start\n\n"
-        security_headers = await fetch_security_headers(safe_url)
-        parsed_metrics["security_headers"] = security_headers
-        parsed_metrics["security_status"] = "ready" if "error" not in security_headers else "error"
-        yield "data: PROGRESS:security_headers:done\n\n"
-
-        # SSL scan
-        yield "data: PROGRESS:ssl:start\n\n"
-        ssl_result = await ssl_scan(safe_url)
-        parsed_metrics["ssl"] = ssl_result
-        yield "data: PROGRESS:ssl:done\n\n"
-
-        # WebPageTest (Playwright)
-        yield "data: PROGRESS:wpt:start\n\n"
-        wpt_result = await run_webpagetest(safe_url)
-        parsed_metrics["webpagetest"] = wpt_result
-        yield "data: PROGRESS:wpt:done\n\n"
-
-        # Lighthouse
-        yield "data: PROGRESS:lighthouse:start\n\n"
-        lighthouse_result = await run_lighthouse_with_retry(safe_url)
-        parsed_metrics["lighthouse"] = lighthouse_result
-        yield "data: PROGRESS:lighthouse:done\n\n"
-
-        trimmed_metrics = _trim_metrics_for_llm(parsed_metrics, max_timeline_buckets=30)
-        analysis = await analyze_with_retry(json.dumps(trimmed_metrics), user_id)
-
-        pdf_path = os.path.join(RESULT_DIR, f"{run_id}-load.pdf")
-        generate(pdf_path, req.project_name, safe_url, json.dumps(parsed_metrics), analysis)
-
-        parsed_metrics["security_pdf_path"] = pdf_path
-
-        async with SessionLocal() as session:
-            session.add(
-                LoadTest(
-                    id=run_id,
-                    project_name=req.project_name,
-                    url=safe_url,
-                    status="finished",
-                    result_json=parsed_metrics,
-                    analysis=analysis,
-                    pdf_path=pdf_path,
-                    user_id=current_user.id,
-                    username=current_user.username,
-                )
-            )
-            await session.commit()
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
-        yield "data: __FINISHED__\n\n"
-        yield f"data: RUN_ID:{run_id}\n\n"
 
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+@app.post("/api/run/{run_id}/cancel")
+async def cancel_run(
+    run_id: str,
+    x_api_key: str | None = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    """Stop a running k6 run (builder, upload or capacity) started on this worker."""
+    verify_key(x_api_key)
+
+    handle = active_run(run_id)
+    if handle is None:
+        raise HTTPException(status_code=404, detail="Run not active")
+    if current_user.role != "admin" and handle.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not allowed to cancel this run")
+
+    handle.cancel(by=current_user.username)
+    return {"run_id": run_id, "status": "cancelling", "cancelled": handle.cancelled}
+
+
+@app.get("/api/run/queue")
+async def get_run_queue(
+    x_api_key: str | None = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    """Scheduled runs waiting for or holding the load generator on this worker.
+
+    Admins see every job, other users only the runs of their own schedules.
+    """
+    verify_key(x_api_key)
+    return {"jobs": run_queue.snapshot(None if current_user.role == "admin" else current_user.id)}
+
+
+def _utc_iso(value: datetime | None) -> str | None:
+    # Schedule timestamps are stored as naive UTC.
+    return value.replace(tzinfo=timezone.utc).isoformat() if value else None
+
+
+def _schedule_out(schedule: LoadTestSchedule) -> dict:
+    return {
+        "id": schedule.id,
+        "name": schedule.name,
+        "cron": schedule.cron,
+        "run": schedule.request,
+        "target": schedule.target,
+        "enabled": schedule.enabled,
+        "jitter_seconds": schedule.jitter_seconds,
+        "catch_up": schedule.catch_up,
+        "user_id": schedule.user_id,
+        "next_run_at": _utc_iso(schedule.next_run_at),
+        "last_run_at": _utc_iso(schedule.last_run_at),
+        "last_run_id": schedule.last_run_id,
+        "last_status": schedule.last_status,
+        "last_error": schedule.last_error,
+    }
+
+
+async def _get_schedule(session, schedule_id: str, user: User, for_update: bool = False) -> LoadTestSchedule:
+    schedule = await session.get(LoadTestSchedule, schedule_id, with_for_update=for_update)
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    if user.role != "admin" and schedule.user_id != user.id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return schedule
+
+
+def _checked_cron(cron: str) -> str:
+    try:
+        validate_cron(cron)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid schedule: {exc}") from exc
+    return cron
+
+
+def _checked_jitter(jitter_seconds: int | None) -> int:
+    jitter = SCHEDULER_JITTER_SECONDS if jitter_seconds is None else jitter_seconds
+    if jitter < 0:
+        raise HTTPException(status_code=400, detail="Invalid schedule: jitter_seconds must be >= 0")
+    return jitter
+
+
+@app.get("/api/schedules")
+async def list_schedules(
+    x_api_key: str | None = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    verify_key(x_api_key)
+    async with SessionLocal() as session:
+        stmt = select(LoadTestSchedule).order_by(LoadTestSchedule.created_at.desc())
+        if current_user.role != "admin":
+            stmt = stmt.where(LoadTestSchedule.user_id == current_user.id)
+        result = await session.execute(stmt)
+        return [_schedule_out(schedule) for schedule in result.scalars().all()]
+
+
+@app.post("/api/schedules")
+async def create_schedule(
+    payload: ScheduleCreate,
+    x_api_key: str | None = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    verify_key(x_api_key)
+    cron = _checked_cron(payload.cron)
+    jitter = _checked_jitter(payload.jitter_seconds)
+    # Same checks as an interactive run; repeated when the schedule fires.
+    safe_url = (await _prepare_run(payload.run))[0]
+
+    schedule_id = str(uuid.uuid4())
+    schedule = LoadTestSchedule(
+        id=schedule_id,
+        name=payload.name or payload.run.project_name,
+        cron=cron,
+        request=payload.run.model_dump(mode="json"),
+        target=target_key(safe_url),
+        enabled=payload.enabled,
+        jitter_seconds=jitter,
+        catch_up=payload.catch_up,
+        user_id=current_user.id,
+        next_run_at=next_fire(cron, utcnow(), schedule_id, jitter) if payload.enabled else None,
+    )
+    async with SessionLocal() as session:
+        session.add(schedule)
+        await session.commit()
+    return _schedule_out(schedule)
+
+
+@app.patch("/api/schedules/{schedule_id}")
+async def update_schedule(
+    schedule_id: str,
+    payload: ScheduleUpdate,
+    x_api_key: str | None = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    verify_key(x_api_key)
+    async with SessionLocal() as session:
+        schedule = await _get_schedule(session, schedule_id, current_user)
+        if payload.cron is not None:
+            schedule.cron = _checked_cron(payload.cron)
+        if payload.jitter_seconds is not None:
+            schedule.jitter_seconds = _checked_jitter(payload.jitter_seconds)
+        if payload.run is not None:
+            safe_url = (await _prepare_run(payload.run))[0]
+            schedule.request = payload.run.model_dump(mode="json")
+            schedule.target = target_key(safe_url)
+        if payload.name is not None:
+            schedule.name = payload.name
+        if payload.catch_up is not None:
+            schedule.catch_up = payload.catch_up
+        if payload.enabled is not None:
+            schedule.enabled = payload.enabled
+        # Re-enabling starts from now: slots missed while disabled never catch up.
+        schedule.next_run_at = (
+            next_fire(schedule.cron, utcnow(), schedule.id, schedule.jitter_seconds) if schedule.enabled else None
+        )
+        await session.commit()
+        return _schedule_out(schedule)
+
+
+@app.delete("/api/schedules/{schedule_id}")
+async def delete_schedule(
+    schedule_id: str,
+    x_api_key: str | None = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    verify_key(x_api_key)
+    async with SessionLocal() as session:
+        schedule = await _get_schedule(session, schedule_id, current_user)
+        await session.delete(schedule)
+        await session.commit()
+    return {"status": "deleted", "id": schedule_id}
+
+
+@app.post("/api/schedules/{schedule_id}/run")
+async def trigger_schedule(
+    schedule_id: str,
+    x_api_key: str | None = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    """Queue a run of the schedule now, outside its cron slots."""
+    verify_key(x_api_key)
+    async with SessionLocal() as session:
+        # Locked until commit: a concurrent trigger on another worker then sees "queued".
+        schedule = await _get_schedule(session, schedule_id, current_user, for_update=True)
+        now = utcnow()
+        if scheduler.still_active(schedule, now):
+            raise HTTPException(status_code=409, detail="A run of this schedule is already queued or running")
+        schedule.last_status = "queued"
+        schedule.last_run_at = now
+        schedule.last_error = None
+        # Holds the row until commit, so the run's own status updates land after this one.
+        await session.flush()
+        status = scheduler.submit(schedule)
+        if status == "skipped_overlap":
+            raise HTTPException(status_code=409, detail="A run against this target is already queued or running")
+        if status == "skipped_queue_full":
+            raise HTTPException(status_code=503, detail="Run queue is full")
+        await session.commit()
+    return {"id": schedule_id, "status": status}
 
 
 @app.post("/api/runjs")
@@ -1313,6 +1943,14 @@ async def run_js(
     if not validate_captcha(captcha_answer, captcha_token, captcha_timestamp):
         raise HTTPException(status_code=400, detail="Invalid captcha")
 
+    content = await file.read(MAX_UPLOAD_BYTES + 1)
+    if len(content) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Script too large")
+    try:
+        decoded = content.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        raise HTTPException(status_code=400, detail="Script must be UTF-8 text") from exc
+
     user_id = current_user.id
 
     async def event_stream():
@@ -1320,203 +1958,387 @@ async def run_js(
         run_id = str(uuid.uuid4())
         target_url = extract_first_url(decoded)
         safe_target_url = None
+        pinned_ips = {}
         if target_url:
             try:
-                safe_target_url = validate_target_url(target_url)
+                target = await resolve_target(target_url)
+                safe_target_url = target.url
+                pinned_ips = target.pinned_ips
             except UnsafeUrlError:
                 safe_target_url = None
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            script_path = os.path.join(tmpdir, "script.js")
-            result_json_path = os.path.join(tmpdir, "result.json")
-
-            with open(script_path, "w") as f:
-                f.write(decoded)
-
-            proc = await asyncio.create_subprocess_exec(
-                "k6",
-                "run",
-                script_path,
-                "--out",
-                f"json={result_json_path}",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.STDOUT,
-            )
-
-            assert proc.stdout is not None
-            while True:
-                line = await proc.stdout.readline()
-                if not line:
-                    break
-                yield f"data: {line.decode(errors='ignore').strip()}\n\n"
+        bind_log(run_id=run_id)
+        with tracing.span(
+            "run",
+            run_id=run_id,
+            mode="script",
+            project=project_name,
+            url=safe_target_url,
+        ) as run_span:
+            handle = register_run(run_id, user_id, target_key(safe_target_url) if safe_target_url else None)
+            try:
+                yield f"data: RUN_STARTED:{run_id}\n\n"
+                with tempfile.TemporaryDirectory(prefix=WORKSPACE_PREFIX) as tmpdir:
+                    script_path = os.path.join(tmpdir, "script.js")
+                    output_path, out_arg = output_target(tmpdir)
+                    summary_path = os.path.join(tmpdir, "summary.json")
+
+                    with open(script_path, "w") as f:
+                        f.write(decoded)
+
+                    args = [
+                        *K6_COMMAND, "run", script_path, "--out", out_arg, f"--summary-export={summary_path}",
+                        # Over the script's own options: scoring needs p(99).
+                        "--summary-trend-stats", ",".join(K6_SUMMARY_TREND_STATS),
+                    ]
+                    # The script's own length is unknown: only the K6_RUN_MAX_SECONDS cap applies.
+                    with observe_stage("k6"), tracing.span("k6", run_span):
+                        async with K6Process(args, env=k6_env(), max_seconds=run_deadline(None)) as k6:
+                            sampler = SaturationSampler(k6.pid)
+                            sampler.start()
+                            forget = handle.on_cancel(lambda: k6.stop("cancelled"))
+                            try:
+                                async for line in k6.lines():
+                                    yield f"data: {line.strip()}\n\n"
+                            finally:
+                                forget()
+                                generator_samples = await sampler.stop()
+
+                    parsed_metrics = parse_run_output(output_path, summary_path)
+            finally:
+                unregister_run(run_id)
+
+            parsed_metrics["scorecard"] = calculate_score(parsed_metrics.get("metrics", {}))
+            _attach_generator_samples(parsed_metrics, generator_samples)
+            if handle.cancelled:
+                parsed_metrics["abort"] = handle.cancelled
+                parsed_metrics["scorecard"]["aborted"] = True
+            parsed_metrics["run_by"] = {
+                "id": current_user.id,
+                "username": current_user.username,
+                "role": current_user.role,
+            }
 
-            await proc.wait()
+            if not safe_target_url or handle.cancelled:
+                reason = "Run cancelled" if handle.cancelled else "Target URL missing or unsafe"
+                for event in _skip_probes(parsed_metrics, reason):
+                    yield event
+            else:
+                async for event in _probe_target(parsed_metrics, safe_target_url, pinned_ips, run_span):
+                    yield event
 
-            raw_ndjson = ""
-            if os.path.exists(result_json_path):
-                with open(result_json_path) as f:
-                    raw_ndjson = f.read()
+            with tracing.current(run_span):
+                trimmed_metrics = _trim_metrics_for_llm(parsed_metrics, max_timeline_buckets=30)
+                with observe_stage("llm"):
+                    analysis = await analyze_with_retry(json.dumps(trimmed_metrics), user_id)
 
-        parsed_metrics = parse_k6_ndjson(raw_ndjson)
-        parsed_metrics["scorecard"] = calculate_score(parsed_metrics.get("metrics", {}))
-        parsed_metrics["run_by"] = {
-            "id": current_user.id,
-            "username": current_user.username,
-            "role": current_user.role,
-        }
+                pdf_path = os.path.join(RESULT_DIR, f"{run_id}-load.pdf")
+                with observe_stage("pdf"), tracing.span("pdf.generate"):
+                    generate(pdf_path, project_name, safe_target_url or "unknown", json.dumps(parsed_metrics), analysis)
+                parsed_metrics["security_pdf_path"] = pdf_path
 
-        if not safe_target_url:
-            parsed_metrics["security_status"] = "error"
-            parsed_metrics["security_headers"] = {"error": "target url missing or unsafe"}
-            parsed_metrics["ssl"] = {"status": "ERROR", "score": 0, "findings": [{"id": "no_target", "severity": "high", "message": "Target URL missing or unsafe"}]}
-            parsed_metrics["webpagetest"] = {"status": "ERROR", "error": "Target URL missing or unsafe"}
-            parsed_metrics["lighthouse"] = {"status": "ERROR", "error": "Target URL missing or unsafe"}
-            yield "data: PROGRESS:security_headers:skip\n\n"
-            yield "data: PROGRESS:ssl:skip\n\n"
-            yield "data: PROGRESS:wpt:skip\n\n"
-            yield "data: PROGRESS:lighthouse:skip\n\n"
-        else:
-            yield "data: PROGRESS:security_headers:start\n\n"
-            security_headers = await fetch_security_headers(safe_target_url)
-            parsed_metrics["security_headers"] = security_headers
-            parsed_metrics["security_status"] = "ready" if "error" not in security_headers else "error"
-            yield "data: PROGRESS:security_headers:done\n\n"
-
-            yield "data: PROGRESS:ssl:start\n\n"
-            ssl_result = await ssl_scan(safe_target_url)
-            parsed_metrics["ssl"] = ssl_result
-            yield "data: PROGRESS:ssl:done\n\n"
-
-            yield "data: PROGRESS:wpt:start\n\n"
-            wpt_result = await run_webpagetest(safe_target_url)
-            parsed_metrics["webpagetest"] = wpt_result
-            yield "data: PROGRESS:wpt:done\n\n"
-
-            yield "data: PROGRESS:lighthouse:start\n\n"
-            lighthouse_result = await run_lighthouse_with_retry(safe_target_url)
-            parsed_metrics["lighthouse"] = lighthouse_result
-            yield "data: PROGRESS:lighthouse:done\n\n"
-
-        analysis = await analyze_with_retry(json.dumps(parsed_metrics), user_id)
-
-        pdf_path = os.path.join(RESULT_DIR, f"{run_id}-load.pdf")
-        generate(pdf_path, project_name, safe_target_url or "unknown", json.dumps(parsed_metrics), analysis)
-        parsed_metrics["security_pdf_path"] = pdf_path
-
-        async with SessionLocal() as session:
-            session.add(
-                LoadTest(
-                    id=run_id,
-                    project_name=project_name,
-                    url=safe_target_url or "unknown",
-                    status="finished",
-                    result_json=parsed_metrics,
-                    analysis=analysis,
-                    pdf_path=pdf_path,
-                    user_id=current_user.id,
-                    username=current_user.username,
+                await save_load_test(
+                    run_id, project_name, safe_target_url or "unknown", parsed_metrics, analysis, pdf_path, current_user
                 )
-            )
-            await session.commit()
 
-        yield "data: __FINISHED__\n\n"
-        yield f"data: RUN_ID:{run_id}\n\n"
+            yield "data: __FINISHED__\n\n"
+            yield f"data: RUN_ID:{run_id}\n\n"
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 
+# Totals for the result list, keyed by (scope, search term). Cleared whenever
+# this worker saves or deletes runs; other workers catch up within the TTL.
+result_count_cache = TTLCache(ttl=RESULT_COUNT_CACHE_SECONDS, maxsize=512)
+
+
+def _encode_cursor(created_at: datetime | None, run_id: str) -> str:
+    raw = json.dumps([created_at.isoformat() if created_at else None, run_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime | None, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, run_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(created_at) if created_at else None), str(run_id)
+    except Exception as exc:  # noqa: BLE001
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
 @app.get("/api/result/list")
 async def list_results(
     limit: int = 50,
     offset: int = 0,
+    cursor: str | None = None,
     q: str | None = None,
     include_json: bool = False,
     x_api_key: str | None = Header(None),
     current_user: User = Depends(get_current_user),
 ):
+    """List runs newest first.
+
+    Pass the returned ``next_cursor`` as ``cursor`` for keyset pagination on
+    ``(created_at, id)``; ``offset`` is still accepted for shallow pages
+    (not together with ``cursor``).
+    ``q`` is a prefix match on run id or project name.
+    """
     verify_key(x_api_key)
+    if cursor and offset:
+        raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
 
     limit = max(1, min(limit, 100))
     offset = max(0, offset)
 
-    async with SessionLocal() as session:
-        base = select(LoadTest)
-        if current_user.role != "admin":
-            base = base.where(LoadTest.user_id == current_user.id)
-        if q:
-            term = q.strip()
-            if term:
-                base = base.where(or_(LoadTest.id.contains(term), LoadTest.project_name.contains(term)))
+    columns = [
+        LoadTest.id,
+        LoadTest.project_name,
+        LoadTest.url,
+        LoadTest.status,
+        LoadTest.created_at,
+        LoadTest.user_id,
+        LoadTest.username,
+        LoadTest.score,
+        LoadTest.grade,
+        LoadTest.error_rate,
+        LoadTest.security_grade,
+        LoadTest.ssl_grade,
+        LoadTest.ssl_versions,
+        LoadTest.wpt_grade,
+        LoadTest.lighthouse_score,
+    ]
+    if include_json:
+        columns += [LoadTest.result_payload, LoadTest.result_json_legacy]
+
+    term = (q or "").strip()
+    scope = None if current_user.role == "admin" else current_user.id
+
+    filters = []
+    if scope is not None:
+        filters.append(LoadTest.user_id == scope)
+    if term:
+        # Prefix match so MySQL can use the primary key / project_name index.
+        filters.append(or_(
+            LoadTest.id.startswith(term, autoescape=True),
+            LoadTest.project_name.startswith(term, autoescape=True),
+        ))
 
-        # Total count (for pagination)
-        total_stmt = select(func.count()).select_from(base.subquery())
-        total = int((await session.execute(total_stmt)).scalar() or 0)
+    async with SessionLocal() as session:
+        # Total count (for pagination), cached briefly per scope + search term.
+        count_key = (scope, term)
+        total = result_count_cache.get(count_key)
+        if total is None:
+            count_stmt = select(func.count()).select_from(LoadTest).where(*filters)
+            total = int((await session.execute(count_stmt)).scalar() or 0)
+            result_count_cache.set(count_key, total)
+
+        page = select(*columns).where(*filters)
+        if cursor:
+            cursor_created_at, cursor_id = _decode_cursor(cursor)
+            # NULL created_at (legacy rows) sorts last in MySQL's DESC order,
+            # after every dated row, ordered by id among themselves.
+            if cursor_created_at is None:
+                page = page.where(LoadTest.created_at.is_(None), LoadTest.id < cursor_id)
+            else:
+                page = page.where(or_(
+                    LoadTest.created_at < cursor_created_at,
+                    (LoadTest.created_at == cursor_created_at) & (LoadTest.id < cursor_id),
+                    LoadTest.created_at.is_(None),
+                ))
+        elif offset:
+            page = page.offset(offset)
+        page = page.order_by(LoadTest.created_at.desc(), LoadTest.id.desc())
 
         try:
-            stmt = base.order_by(LoadTest.created_at.desc()).limit(limit).offset(offset)
-            result = await session.execute(stmt)
-            slice_tests = result.scalars().all()
+            result = await session.execute(page.limit(limit))
+            slice_tests = result.all()
         except OperationalError:
-            fallback_limit = min(limit, 50)
-            stmt = base.order_by(LoadTest.created_at.desc()).limit(fallback_limit).offset(offset)
-            result = await session.execute(stmt)
-            slice_tests = result.scalars().all()
-
-        def summarize(t: LoadTest):
-            payload = t.result_json or {}
-            scorecard = payload.get("scorecard") or {}
-            metrics = payload.get("metrics") or {}
-            checks = metrics.get("checks") or {}
-
-            security = payload.get("security_headers") or {}
-            ssl_payload = payload.get("ssl") or {}
-            wpt = payload.get("webpagetest") or {}
-            lh = payload.get("lighthouse") or {}
+            limit = min(limit, 50)
+            result = await session.execute(page.limit(limit))
+            slice_tests = result.all()
 
+        def summarize(t):
             item = {
                 "id": t.id,
                 "project_name": t.project_name,
                 "url": t.url,
                 "status": t.status,
                 "created_at": t.created_at,
-                "run_by": payload.get("run_by") or {"id": t.user_id, "username": t.username},
-                "score": scorecard.get("score"),
-                "grade": scorecard.get("grade"),
-                "error_rate": (checks.get("error_rate") if isinstance(checks, dict) else None),
-                "security_grade": security.get("grade") or security.get("score"),
-                "ssl_grade": ssl_payload.get("rating") or ssl_payload.get("ssllabs_grade"),
-                "ssl_versions": ssl_payload.get("supported_versions") if isinstance(ssl_payload, dict) else None,
-                "wpt_grade": wpt.get("grade"),
-                "lighthouse_score": lh.get("score")
-                if isinstance(lh, dict)
-                else None,
+                "run_by": {"id": t.user_id, "username": t.username},
+                "score": t.score,
+                "grade": t.grade,
+                "error_rate": t.error_rate,
+                "security_grade": t.security_grade,
+                "ssl_grade": t.ssl_grade,
+                "ssl_versions": t.ssl_versions,
+                "wpt_grade": t.wpt_grade,
+                "lighthouse_score": t.lighthouse_score,
             }
 
-            # Support older lighthouse payload shape (categories.performance)
-            if item["lighthouse_score"] is None and isinstance(lh, dict):
-                cats = lh.get("categories") or {}
-                item["lighthouse_score"] = cats.get("performance")
-
             if include_json:
+                payload = t.result_payload or t.result_json_legacy or {}
+                item["run_by"] = payload.get("run_by") or item["run_by"]
                 item["result_json"] = payload
             return item
 
+        next_cursor = None
+        if len(slice_tests) == limit:
+            last = slice_tests[-1]
+            next_cursor = _encode_cursor(last.created_at, last.id)
+
         return {
             "items": [summarize(t) for t in slice_tests],
             "total": total,
             "limit": limit,
             "offset": offset,
+            "next_cursor": next_cursor,
             "q": q or "",
         }
 
 
+# Computed comparisons keyed by (run ids, points). Saved runs do not change, so
+# entries only go stale through /api/resetdata, which clears the cache.
+compare_cache = TTLCache(ttl=COMPARE_CACHE_SECONDS, maxsize=256)
+
+
+@app.get("/api/result/compare")
+async def compare_results(
+    ids: str,
+    points: int = COMPARE_POINTS,
+    x_api_key: str | None = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    """Aligned timelines, metric deltas and percentile differences of ``ids``
+    (comma-separated, the first is the reference)."""
+    verify_key(x_api_key)
+
+    run_ids = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if not 2 <= len(run_ids) <= COMPARE_MAX_RUNS:
+        raise HTTPException(status_code=400, detail=f"Pass 2 to {COMPARE_MAX_RUNS} run ids")
+    points = max(10, min(points, 1000))
+
+    def check_access(owners):
+        if current_user.role != "admin" and any(owner != current_user.id for owner in owners):
+            raise HTTPException(status_code=403, detail="Forbidden")
+
+    cache_key = (tuple(run_ids), points)
+    cached = compare_cache.get(cache_key)
+    if cached is not None:
+        check_access(run["run_by"]["id"] for run in cached["runs"])
+        return cached
+
+    async with SessionLocal() as session:
+        runs = await load_runs(session, run_ids)
+        missing = [run_id for run_id in run_ids if run_id not in runs]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Run not found: {', '.join(missing)}")
+        check_access(run.user_id for run in runs.values())
+        comparison = await build_comparison(session, run_ids, runs, points)
+
+    compare_cache.set(cache_key, comparison)
+    return comparison
+
+
+@app.get("/api/trends")
+async def get_trends(
+    project_name: str,
+    url: str | None = None,
+    period: str = "day",
+    start: str | None = None,
+    end: str | None = None,
+    x_api_key: str | None = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    """Daily or weekly aggregates of a project's runs (optionally one URL),
+    from the rollup tables. ``start``/``end`` are ISO dates (UTC)."""
+    verify_key(x_api_key)
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of: {', '.join(PERIODS)}")
+    try:
+        range_end = date.fromisoformat(end) if end else datetime.now(timezone.utc).date()
+        range_start = date.fromisoformat(start) if start else range_end - timedelta(days=TRENDS_DEFAULT_DAYS)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {exc}") from exc
+    days = (range_end - range_start).days
+    if days < 0:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if days // (7 if period == "week" else 1) > TRENDS_MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Range exceeds {TRENDS_MAX_BUCKETS} buckets")
+
+    async with SessionLocal() as session:
+        buckets = await load_trend(
+            session,
+            project_name,
+            url,
+            period,
+            range_start,
+            range_end,
+            user_id=None if current_user.role == "admin" else current_user.id,
+        )
+    return {
+        "project_name": project_name,
+        "url": url,
+        "period": period,
+        "start": range_start.isoformat(),
+        "end": range_end.isoformat(),
+        "buckets": buckets,
+    }
+
+
+def _time_range(start: str | None, end: str | None) -> tuple[int | None, int | None]:
+    try:
+        return parse_time_bound(start), parse_time_bound(end)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+async def _run_timeline(session, result: LoadTest, start: int | None, end: int | None) -> dict:
+    timeline = await load_timeline(session, result.id, start, end)
+    if timeline is None:
+        # Runs saved before load_test_timelines existed keep it in the blob.
+        legacy = (result.result_json or {}).get("timeline", {})
+        timeline = filter_timeline(legacy, start, end)
+    return timeline
+
+
+@app.get("/api/result/{run_id}/timeline")
+async def get_result_timeline(
+    run_id: str,
+    start: str | None = None,
+    end: str | None = None,
+    x_api_key: str | None = Header(None),
+    current_user: User = Depends(get_current_user),
+):
+    verify_key(x_api_key)
+    range_start, range_end = _time_range(start, end)
+
+    async with SessionLocal() as session:
+        result = await session.get(LoadTest, run_id)
+        if not result:
+            raise HTTPException(status_code=404)
+
+        if current_user.role != "admin" and result.user_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Forbidden")
+
+        return {
+            "id": result.id,
+            "start": range_start,
+            "end": range_end,
+            "timeline": await _run_timeline(session, result, range_start, range_end),
+        }
+
+
 @app.get("/api/result/{run_id}")
 async def get_result(
     run_id: str,
+    include_timeline: bool = True,
+    start: str | None = None,
+    end: str | None = None,
     x_api_key: str | None = Header(None),
     current_user: User = Depends(get_current_user),
 ):
     verify_key(x_api_key)
+    range_start, range_end = _time_range(start, end)
 
     async with SessionLocal() as session:
         result = await session.get(LoadTest, run_id)
@@ -1527,6 +2349,7 @@ async def get_result(
             raise HTTPException(status_code=403, detail="Forbidden")
 
         payload = result.result_json or {}
+        timeline = await _run_timeline(session, result, range_start, range_end) if include_timeline else {}
         return {
             "id": result.id,
             "project_name": result.project_name,
@@ -1534,9 +2357,16 @@ async def get_result(
             "analysis": result.analysis,
             "pdf": f"/api/download/{run_id}",
             "security_pdf": f"/api/download/{run_id}/security" if payload.get("security_pdf_path") else None,
+            "profile": f"/api/download/{run_id}/profile" if payload.get("profile_path") else None,
             "metrics": payload.get("metrics", {}),
-            "timeline": payload.get("timeline", {}),
+            "timeline": timeline,
             "scorecard": payload.get("scorecard", {}),
+            "generator": payload.get("generator"),
+            "capacity": payload.get("capacity"),
+            "abort": payload.get("abort"),
+            "agents": payload.get("agents"),
+            "schedule": payload.get("schedule"),
+            "regression": payload.get("regression"),
             "security_headers": payload.get("security_headers", {}),
             "security_status": payload.get("security_status", "pending"),
             "ssl": payload.get("ssl", {}),
@@ -1603,6 +2433,31 @@ async def download_security(
         )
 
 
+@app.get("/api/download/{run_id}/profile")
+async def download_profile(
+    run_id: str,
+    x_api_key: str | None = Header(None),
+    admin: User = Depends(require_admin),
+):
+    """Speedscope profile of a run started with ``profile: true``."""
+    verify_key(x_api_key)
+
+    async with SessionLocal() as session:
+        result = await session.get(LoadTest, run_id)
+        if not result:
+            raise HTTPException(status_code=404)
+
+        profile_path = (result.result_json or {}).get("profile_path")
+        if not profile_path or not os.path.exists(profile_path):
+            raise HTTPException(status_code=404, detail="No profile for this run")
+
+        return FileResponse(
+            path=profile_path,
+            media_type="application/json",
+            filename=f"{run_id}.speedscope.json",
+        )
+
+
 @app.get("/api/captcha")
 async def generate_captcha():
     a = random.randint(1, 20)
@@ -1625,6 +2480,11 @@ async def reset_data(x_admin_key: str | None = Header(None)):
 
     async with SessionLocal() as session:
         await session.execute(delete(LoadTest))
+        await session.execute(delete(LoadTestBaseline))
+        await session.execute(delete(LoadTestRollup))
+        await delete_timeline(session)
         await session.commit()
+    result_count_cache.clear()
+    compare_cache.clear()
 
     return {"status": "ok"}
@@ -0,0 +1,135 @@
+"""Prometheus metrics for backend internals, served on ``/metrics``.
+
+Histograms and counters are updated where the work happens; gauges for the
+current state (run queue, k6 processes, DB pool) are only read when scraped,
+so an idle backend does no metrics work. Values are per worker process.
+"""
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, ProcessCollector, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+from .run_supervisor import active_run_count, live_process_count
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in {"1", "true", "yes"}
+# Bearer token for scrapers; without it /metrics only answers when METRICS_PUBLIC is set.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "false").lower() in {"1", "true", "yes"}
+METRICS_LOOP_LAG_INTERVAL = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", "1"))
+
+registry = CollectorRegistry()
+ProcessCollector(registry=registry)
+
+STAGE_DURATION = Histogram(
+    "k6ai_stage_duration_seconds",
+    "Duration of one run pipeline stage",
+    ["stage"],
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600),
+    registry=registry,
+)
+LLM_DURATION = Histogram(
+    "k6ai_llm_request_duration_seconds",
+    "Latency of one LLM analysis call",
+    ["provider"],
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120),
+    registry=registry,
+)
+LLM_ERRORS = Counter(
+    "k6ai_llm_errors_total",
+    "Failed LLM analysis calls",
+    ["provider"],
+    registry=registry,
+)
+LOOP_LAG = Histogram(
+    "k6ai_event_loop_lag_seconds",
+    "How late the event loop ran a timer",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    registry=registry,
+)
+
+
+@contextmanager
+def observe_stage(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_DURATION.labels(stage).observe(time.perf_counter() - start)
+
+
+class _StateCollector:
+    """Gauges read at scrape time from the objects passed to ``bind``."""
+
+    def __init__(self):
+        self.run_queue = None
+        self.engine = None
+
+    def collect(self):
+        runs = GaugeMetricFamily("k6ai_active_runs", "Runs in progress (interactive and queued)")
+        runs.add_metric([], active_run_count())
+        yield runs
+        processes = GaugeMetricFamily("k6ai_k6_processes", "Running k6 child processes")
+        processes.add_metric([], live_process_count())
+        yield processes
+
+        if self.run_queue is not None:
+            jobs = self.run_queue.snapshot()
+            queue = GaugeMetricFamily("k6ai_run_queue_jobs", "Background run queue jobs", labels=["state"])
+            queue.add_metric(["pending"], sum(1 for job in jobs if job["started_at"] is None))
+            queue.add_metric(["running"], sum(1 for job in jobs if job["started_at"] is not None))
+            yield queue
+
+        pool = self.engine.sync_engine.pool if self.engine is not None else None
+        # NullPool/StaticPool (e.g. SQLite) do not count connections.
+        if pool is not None and hasattr(pool, "checkedout"):
+            connections = GaugeMetricFamily("k6ai_db_pool_connections", "Database pool connections", labels=["state"])
+            connections.add_metric(["checked_out"], pool.checkedout())
+            connections.add_metric(["idle"], pool.checkedin())
+            connections.add_metric(["overflow"], max(0, pool.overflow()))
+            yield connections
+            size = GaugeMetricFamily("k6ai_db_pool_size", "Configured database pool size")
+            size.add_metric([], pool.size())
+            yield size
+
+
+_state = _StateCollector()
+registry.register(_state)
+
+
+def bind(run_queue, engine) -> None:
+    _state.run_queue = run_queue
+    _state.engine = engine
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class LoopLagMonitor:
+    """Samples event-loop lag into ``LOOP_LAG`` every ``interval`` seconds."""
+
+    def __init__(self, interval: float = METRICS_LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self._task = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            LOOP_LAG.observe(max(0.0, loop.time() - expected))
@@ -0,0 +1,196 @@
+"""Schema upgrades and offline data migrations.
+
+Run from the backend root (same env as the API), e.g.::
+
+    python -m app.migrations split-timelines
+    python -m app.migrations backfill-summary
+    python -m app.migrations compress-results
+    python -m app.migrations backfill-rollups
+"""
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import inspect, or_, select, text
+
+from .database import Base, SessionLocal, engine
+from .log import setup_logging, stop_logging
+from .models import LoadTest
+from .result_summary import SUMMARY_VERSION, summary_columns
+from .rollups import backfill_rollups
+from .timeline_store import add_timeline, delete_timeline
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA_LOCK_NAME = "k6ai_schema_upgrade"
+SCHEMA_LOCK_TIMEOUT_SECONDS = 60
+
+
+def upgrade_schema(sync_conn) -> None:
+    """``create_all`` plus ``add_missing_columns`` under a DB advisory lock.
+
+    Every uvicorn worker runs this on startup; without the lock two workers
+    can both see a column or index as missing and one fails on the duplicate.
+    """
+    dialect = sync_conn.dialect.name
+    if dialect == "mysql":
+        got = sync_conn.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"),
+            {"name": SCHEMA_LOCK_NAME, "timeout": SCHEMA_LOCK_TIMEOUT_SECONDS},
+        ).scalar()
+        if got != 1:
+            raise RuntimeError(f"schema upgrade lock {SCHEMA_LOCK_NAME!r} not acquired")
+    elif dialect == "postgresql":
+        # Transaction-scoped: released with the startup transaction.
+        sync_conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": SCHEMA_LOCK_NAME})
+    try:
+        Base.metadata.create_all(sync_conn)
+        add_missing_columns(sync_conn)
+    finally:
+        if dialect == "mysql":
+            sync_conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": SCHEMA_LOCK_NAME})
+
+
+def add_missing_columns(sync_conn) -> None:
+    """Bring existing tables up to the current models.
+
+    ``create_all`` only creates missing tables, so columns and indexes added
+    to an existing model are applied here. New columns must be nullable.
+    """
+    inspector = inspect(sync_conn)
+    existing_tables = set(inspector.get_table_names())
+    preparer = sync_conn.dialect.identifier_preparer
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            col_type = column.type.compile(dialect=sync_conn.dialect)
+            sync_conn.execute(text(
+                f"ALTER TABLE {preparer.format_table(table)} "
+                f"ADD COLUMN {preparer.format_column(column)} {col_type} NULL"
+            ))
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
+async def backfill_summary(batch_size: int = 200) -> int:
+    """Fill the denormalized ``LoadTest`` list columns from ``result_json``."""
+    updated = 0
+    while True:
+        async with SessionLocal() as session:
+            result = await session.execute(
+                select(LoadTest)
+                .where(or_(LoadTest.summary_version.is_(None), LoadTest.summary_version < SUMMARY_VERSION))
+                .limit(batch_size)
+            )
+            tests = result.scalars().all()
+            if not tests:
+                break
+
+            for t in tests:
+                for key, value in summary_columns(t.result_json).items():
+                    setattr(t, key, value)
+            await session.commit()
+            updated += len(tests)
+            logger.info("backfill-summary: %d rows updated", updated)
+    return updated
+
+
+async def compress_results(batch_size: int = 100) -> int:
+    """Re-encode plain ``result_json`` rows into the compressed ``result_payload``."""
+    converted = 0
+    while True:
+        async with SessionLocal() as session:
+            result = await session.execute(
+                select(LoadTest).where(LoadTest.result_json_legacy.is_not(None)).limit(batch_size)
+            )
+            tests = result.scalars().all()
+            if not tests:
+                break
+
+            for t in tests:
+                t.result_json = t.result_json_legacy
+            await session.commit()
+            converted += len(tests)
+            logger.info("compress-results: %d rows converted", converted)
+    return converted
+
+
+async def split_timelines(batch_size: int = 100) -> int:
+    """Move legacy ``result_json["timeline"]`` blobs into ``load_test_timelines``."""
+    moved = 0
+    last_id = ""
+    while True:
+        async with SessionLocal() as session:
+            result = await session.execute(
+                select(LoadTest).where(LoadTest.id > last_id).order_by(LoadTest.id).limit(batch_size)
+            )
+            tests = result.scalars().all()
+            if not tests:
+                break
+
+            for t in tests:
+                payload = t.result_json or {}
+                if "timeline" not in payload:
+                    continue
+                summary = dict(payload)
+                timeline = summary.pop("timeline") or {}
+                # Re-runnable: replace whatever a previous partial run wrote.
+                await delete_timeline(session, t.id)
+                add_timeline(session, t.id, timeline)
+                t.result_json = summary
+                moved += 1
+
+            await session.commit()
+            last_id = tests[-1].id
+            logger.info("split-timelines: processed up to %s (%d moved)", last_id, moved)
+    return moved
+
+
+async def _run(args) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(upgrade_schema)
+    try:
+        if args.command == "split-timelines":
+            await split_timelines(args.batch_size)
+        elif args.command == "backfill-summary":
+            await backfill_summary(args.batch_size)
+        elif args.command == "compress-results":
+            await compress_results(args.batch_size)
+        elif args.command == "backfill-rollups":
+            await backfill_summary(args.batch_size)
+            await backfill_rollups(args.batch_size)
+    finally:
+        await engine.dispose()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.migrations")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    split = sub.add_parser("split-timelines", help="move timelines out of result_json")
+    split.add_argument("--batch-size", type=int, default=100)
+
+    backfill = sub.add_parser("backfill-summary", help="fill denormalized list columns")
+    backfill.add_argument("--batch-size", type=int, default=200)
+
+    compress = sub.add_parser("compress-results", help="compress legacy result_json rows")
+    compress.add_argument("--batch-size", type=int, default=100)
+
+    rollups = sub.add_parser("backfill-rollups", help="add runs missing from the trend rollups")
+    rollups.add_argument("--batch-size", type=int, default=200)
+
+    setup_logging()
+    try:
+        asyncio.run(_run(parser.parse_args(argv)))
+    finally:
+        stop_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,28 @@
 from sqlalchemy.orm import mapped_column
-from sqlalchemy import String, Text, DateTime
+from sqlalchemy import BigInteger, Boolean, Date, DateTime, Float, Index, Integer, SmallInteger, String, Text
 from sqlalchemy.dialects.mysql import JSON
 from sqlalchemy.sql import func
 from .database import Base
+from .payload_codec import CompressedJSON
 
 
 class LoadTest(Base):
     __tablename__ = "load_tests"
+    __table_args__ = (
+        # Keyset pagination for the result list: (created_at, id) newest first,
+        # globally for admins and per user otherwise.
+        Index("ix_load_tests_created_id", "created_at", "id"),
+        Index("ix_load_tests_user_created_id", "user_id", "created_at", "id"),
+    )
     id = mapped_column(String(36), primary_key=True)
     project_name = mapped_column(String(255), index=True, nullable=False)
     url = mapped_column(Text, nullable=False)
     status = mapped_column(String(20), nullable=False)
-    result_json = mapped_column(JSON, nullable=True)
+    # Result summary, msgpack+zstd compressed (see payload_codec.py). Rows
+    # written before compression keep the plain JSON column until
+    # ``python -m app.migrations compress-results`` converts them.
+    result_payload = mapped_column(CompressedJSON, nullable=True)
+    result_json_legacy = mapped_column("result_json", JSON(none_as_null=True), nullable=True)
     analysis = mapped_column(Text, nullable=True)
     pdf_path = mapped_column(Text, nullable=True)
     user_id = mapped_column(String(36), nullable=True, index=True)
@@ -21,6 +32,123 @@ class LoadTest(Base):
         server_default=func.now(),
         index=True,
     )
+    # Denormalized from result_json at save time (see result_summary.py) so
+    # the result list never has to load the blob.
+    score = mapped_column(Float, nullable=True, index=True)
+    grade = mapped_column(String(8), nullable=True, index=True)
+    error_rate = mapped_column(Float, nullable=True, index=True)
+    security_grade = mapped_column(String(8), nullable=True, index=True)
+    ssl_grade = mapped_column(String(8), nullable=True, index=True)
+    ssl_versions = mapped_column(JSON, nullable=True)
+    wpt_grade = mapped_column(String(8), nullable=True, index=True)
+    lighthouse_score = mapped_column(Integer, nullable=True, index=True)
+    requests = mapped_column(Integer, nullable=True)
+    rps = mapped_column(Float, nullable=True)
+    avg_ms = mapped_column(Float, nullable=True)
+    p95_ms = mapped_column(Float, nullable=True)
+    p99_ms = mapped_column(Float, nullable=True)
+    latency_sketch = mapped_column(CompressedJSON, nullable=True)  # sketch.LatencySketch.to_dict()
+    summary_version = mapped_column(SmallInteger, nullable=True, index=True)
+    # Set once the run is counted in load_test_rollups (see app.rollups).
+    rolled_up = mapped_column(Boolean, nullable=True, index=True)
+
+    @property
+    def result_json(self):
+        if self.result_payload is not None:
+            return self.result_payload
+        return self.result_json_legacy
+
+    @result_json.setter
+    def result_json(self, value):
+        self.result_payload = value
+        self.result_json_legacy = None
+
+
+class LoadTestTimeline(Base):
+    # One row per second bucket of a run. Kept out of ``LoadTest.result_json``
+    # so result/list reads only deserialize the summary blob.
+    __tablename__ = "load_test_timelines"
+    run_id = mapped_column(String(36), primary_key=True)
+    ts = mapped_column(BigInteger, primary_key=True)  # bucket start, unix seconds (UTC)
+    bucket = mapped_column(String(40), nullable=False)  # original bucket label
+    latency = mapped_column(JSON, nullable=True)
+    requests = mapped_column(Float, nullable=True)
+    checks_pass = mapped_column(Integer, nullable=True)
+    checks_fail = mapped_column(Integer, nullable=True)
+    generator = mapped_column(JSON, nullable=True)  # saturation samples, one per generator node
+
+
+class LoadTestSchedule(Base):
+    # A recurring builder run, fired by app.scheduler through the run queue.
+    __tablename__ = "load_test_schedules"
+    __table_args__ = (Index("ix_load_test_schedules_due", "enabled", "next_run_at"),)
+    id = mapped_column(String(36), primary_key=True)
+    name = mapped_column(String(255), nullable=False)
+    cron = mapped_column(String(120), nullable=False)
+    request = mapped_column(JSON, nullable=False)  # RunRequest body
+    target = mapped_column(String(255), nullable=False, index=True)  # run_queue.target_key
+    enabled = mapped_column(Boolean, nullable=False, server_default="1")
+    jitter_seconds = mapped_column(Integer, nullable=False, server_default="0")
+    catch_up = mapped_column(Boolean, nullable=False, server_default="1")
+    user_id = mapped_column(String(36), nullable=False, index=True)
+    # Naive UTC. The claimed slot is moved forward before a run is queued.
+    next_run_at = mapped_column(DateTime, nullable=True)
+    last_run_at = mapped_column(DateTime, nullable=True)
+    last_run_id = mapped_column(String(36), nullable=True)
+    last_status = mapped_column(String(32), nullable=True)
+    last_error = mapped_column(Text, nullable=True)
+    created_at = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+    )
+    updated_at = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+
+class LoadTestBaseline(Base):
+    # Rolling window of per-run statistics for one project + target URL + load profile
+    # (see app.regression); newest run last.
+    __tablename__ = "load_test_baselines"
+    key = mapped_column(String(64), primary_key=True)  # sha256 of project_name + url + load profile
+    project_name = mapped_column(String(255), index=True, nullable=False)
+    url = mapped_column(Text, nullable=False)
+    runs = mapped_column(CompressedJSON, nullable=False)
+    updated_at = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+
+class LoadTestRollup(Base):
+    # Per-day and per-week aggregates of the summary columns for one project +
+    # URL + user (see app.rollups). Sums so buckets merge by addition.
+    __tablename__ = "load_test_rollups"
+    __table_args__ = (Index("ix_load_test_rollups_project", "period", "project_name", "bucket_start"),)
+    period = mapped_column(String(8), primary_key=True)  # "day" or "week"
+    key = mapped_column(String(64), primary_key=True)  # sha256 of project_name + url + load profile
+    user_id = mapped_column(String(36), primary_key=True)  # "" for runs without a user
+    bucket_start = mapped_column(Date, primary_key=True)  # UTC day / Monday of the ISO week
+    project_name = mapped_column(String(255), nullable=False)
+    url = mapped_column(Text, nullable=False)
+    runs = mapped_column(Integer, nullable=False, server_default="0")
+    requests = mapped_column(BigInteger, nullable=False, server_default="0")
+    rps_sum = mapped_column(Float, nullable=False, server_default="0")
+    rps_max = mapped_column(Float, nullable=True)
+    latency_sum_ms = mapped_column(Float, nullable=False, server_default="0")  # avg_ms x requests
+    p95_ms_sum = mapped_column(Float, nullable=False, server_default="0")
+    p95_ms_max = mapped_column(Float, nullable=True)
+    error_rate_sum = mapped_column(Float, nullable=False, server_default="0")
+    score_sum = mapped_column(Float, nullable=False, server_default="0")
+    latency_sketch = mapped_column(CompressedJSON, nullable=True)  # merged run sketches
+    updated_at = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
 
 
 class User(Base):
@@ -0,0 +1,47 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Argon2/bcrypt are CPU- and memory-heavy by design. Running them on the event
+# loop stalls every other request (including SSE run streams) on the worker,
+# so they go through a small dedicated executor with a bounded backlog.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+
+
+class HashingOverloaded(RuntimeError):
+    pass
+
+
+class HashingPool:
+    """Run password hash/verify calls off the event loop.
+
+    ``max_pending`` caps running + queued calls; beyond that ``run`` fails
+    fast with ``HashingOverloaded`` instead of growing an unbounded queue.
+    ``workers=0`` runs calls inline on the loop (the pre-pool behaviour).
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max(1, max_pending)
+        self.pending = 0
+        self._executor = (
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash") if workers > 0 else None
+        )
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            raise HashingOverloaded("password hashing pool is saturated")
+
+        self.pending += 1
+        try:
+            if self._executor is None:
+                return fn(*args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
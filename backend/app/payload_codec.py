@@ -0,0 +1,64 @@
+import json
+import os
+import zlib
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.dialects.mysql import LONGBLOB
+from sqlalchemy.types import TypeDecorator
+
+try:
+    import msgpack
+    import zstandard
+except ImportError:  # pragma: no cover - optional, falls back to json+zlib
+    msgpack = None
+    zstandard = None
+
+
+# First byte of every stored payload identifies the codec, so rows written
+# with different codecs (or before a codec change) stay readable.
+CODEC_MSGPACK_ZSTD = 0x01
+CODEC_JSON_ZLIB = 0x02
+
+ZSTD_LEVEL = int(os.getenv("RESULT_ZSTD_LEVEL", "6"))
+
+_zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if zstandard else None
+_zstd_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+
+def encode_payload(value) -> bytes:
+    if _zstd_compressor is not None:
+        packed = msgpack.packb(value, use_bin_type=True)
+        return bytes([CODEC_MSGPACK_ZSTD]) + _zstd_compressor.compress(packed)
+
+    packed = json.dumps(value, separators=(",", ":")).encode()
+    return bytes([CODEC_JSON_ZLIB]) + zlib.compress(packed, 6)
+
+
+def decode_payload(data: bytes):
+    if not data:
+        return None
+    codec, body = data[0], data[1:]
+    if codec == CODEC_MSGPACK_ZSTD:
+        if _zstd_decompressor is None:
+            raise RuntimeError("payload is msgpack+zstd encoded but msgpack/zstandard are not installed")
+        return msgpack.unpackb(_zstd_decompressor.decompress(body), raw=False, strict_map_key=False)
+    if codec == CODEC_JSON_ZLIB:
+        return json.loads(zlib.decompress(body))
+    raise ValueError(f"unknown payload codec: {codec:#x}")
+
+
+class CompressedJSON(TypeDecorator):
+    """JSON-compatible value stored as a compressed binary blob."""
+
+    impl = LargeBinary().with_variant(LONGBLOB(), "mysql")
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return encode_payload(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decode_payload(value)
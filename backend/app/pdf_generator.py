@@ -156,6 +156,27 @@ def histogram_chart(timeline):
     plt.tight_layout()
     return save_chart(fig)
 
+def capacity_chart(capacity):
+    curve = capacity.get("curve") or []
+    points = [p for p in curve if p.get("p95") is not None]
+    if not points:
+        return None
+    rates = [p["achieved_rps"] or p["rate"] for p in points]
+
+    fig = plt.figure(figsize=(6, 3))
+    plt.plot(rates, [p["p95"] for p in points], marker="o")
+    for rate, point in zip(rates, points):
+        if not point["passed"]:
+            plt.plot(rate, point["p95"], "rx")
+    slo = (capacity.get("slo") or {}).get("p95_ms")
+    if slo:
+        plt.axhline(y=slo, linestyle="--")
+    plt.title("Latency vs Load (p95)")
+    plt.xlabel("Requests/sec")
+    plt.ylabel("ms")
+    plt.tight_layout()
+    return save_chart(fig)
+
 # ================= SECURITY ONLY PDF =================
 def generate_security_pdf(path, project_name, url, security):
     doc = BaseDocTemplate(path, pagesize=A4)
@@ -380,11 +401,26 @@ def generate(path, project_name, url, structured_json, analysis):
     elements.append(SectionHeader("Executive Scorecard"))
     elements.append(Spacer(1, 0.4 * inch))
 
-    score_table = Table([
+    generator = data.get("generator") or {}
+    saturated = scorecard.get("generator_saturated")
+    score_rows = [
         ["Performance Score", scorecard.get("score", "N/A")],
         ["SLA Grade", scorecard.get("grade", "N/A")],
         ["Risk Level", scorecard.get("risk", "N/A")]
-    ], colWidths=[3 * inch, 2 * inch])
+    ]
+    if saturated is not None:
+        score_rows.append(["Load Generator", "SATURATED" if saturated else "OK"])
+    if scorecard.get("aborted"):
+        score_rows.append(["Run", "ABORTED"])
+    elif scorecard.get("partial"):
+        score_rows.append(["Run", "PARTIAL"])
+    if scorecard.get("dropped_iterations"):
+        score_rows.append([
+            "Dropped Iterations",
+            f"{scorecard['dropped_iterations']} ({scorecard.get('dropped_rate', 0) * 100:.2f}%)",
+        ])
+
+    score_table = Table(score_rows, colWidths=[3 * inch, 2 * inch])
 
     score_table.setStyle(TableStyle([
         ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#7C3AED")),
@@ -395,6 +431,40 @@ def generate(path, project_name, url, structured_json, analysis):
 
     elements.append(score_table)
     elements.append(Spacer(1, 0.4 * inch))
+
+    abort = data.get("abort")
+    if abort:
+        elements.append(Paragraph(
+            f"<font color='#DC2626'><b>Run aborted early</b></font> at {abort.get('at', 'N/A')} "
+            f"({abort.get('elapsed_s', 'N/A')}s in): {str(abort.get('reason', '')).replace('_', ' ')} "
+            f"{abort.get('value')} exceeded {abort.get('limit')} for {abort.get('for_seconds')}s. "
+            "Metrics cover the run up to the abort.",
+            body_style
+        ))
+        elements.append(Spacer(1, 0.2 * inch))
+
+    failed_agents = (data.get("agents") or {}).get("failed") or []
+    if failed_agents:
+        nodes = ", ".join(str(a.get("node")) for a in failed_agents)
+        what = (
+            "Metrics miss their share of the load." if scorecard.get("partial")
+            else "The step running at the time was dropped."
+        )
+        elements.append(Paragraph(
+            f"<font color='#DC2626'><b>Load generator node(s) {nodes} failed</b></font> during the run. {what}",
+            body_style
+        ))
+        elements.append(Spacer(1, 0.2 * inch))
+
+    if saturated:
+        reasons = ", ".join(r.replace("_", " ") for r in generator.get("reasons", [])) or "resource limits"
+        elements.append(Paragraph(
+            f"<font color='#DC2626'><b>Load generator saturated</b> ({reasons}).</font> "
+            "The k6 host hit its own limits during this run, so latency and error figures "
+            "may reflect the generator rather than the target.",
+            body_style
+        ))
+
     elements.append(Spacer(1, 0.4 * inch))
 
     # PERFORMANCE METRICS
@@ -421,6 +491,103 @@ def generate(path, project_name, url, structured_json, analysis):
 
     elements.append(metrics_table)
 
+    # REGRESSION VS BASELINE
+    regression = data.get("regression")
+    if regression:
+        elements.append(Spacer(1, 0.4 * inch))
+        elements.append(SectionHeader("Regression vs Baseline"))
+        elements.append(Spacer(1, 0.3 * inch))
+
+        status = regression.get("status")
+        if status == "insufficient_baseline":
+            elements.append(Paragraph(
+                f"Not enough earlier runs of this project and URL to compare against "
+                f"({regression.get('baseline_runs', 0)} of {regression.get('min_runs')} needed).",
+                body_style
+            ))
+        else:
+            if status == "regression":
+                headline = ("<font color='#DC2626'><b>Regression detected</b></font> in "
+                            + ", ".join(regression.get("regressions", [])))
+            elif status == "improvement":
+                headline = "<font color='#16A34A'><b>Improvement</b></font> over the baseline"
+            else:
+                headline = "<b>No significant change</b> against the baseline"
+            elements.append(Paragraph(
+                f"{headline} (median of the last {regression.get('baseline_runs')} runs since "
+                f"{str(regression.get('baseline_since', 'N/A'))[:10]}).",
+                body_style
+            ))
+            elements.append(Spacer(1, 0.2 * inch))
+
+            rows = [["Metric", "Baseline", "This Run", "Change", "Confidence", "Verdict"]]
+            for check in regression.get("checks", []):
+                if check.get("verdict") == "unknown":
+                    continue
+                change = check.get("change", 0)
+                if check.get("metric") == "error_rate":
+                    change_text = f"{change * 100:+.2f} pp"
+                else:
+                    change_text = f"{change * 100:+.1f}%"
+                confidence = check.get("confidence")
+                rows.append([
+                    check.get("metric"),
+                    check.get("baseline"),
+                    check.get("current"),
+                    change_text,
+                    f"{confidence * 100:.0f}%" if confidence is not None else "-",
+                    str(check.get("verdict", "")).upper(),
+                ])
+            regression_table = Table(rows, colWidths=[1 * inch, 1.1 * inch, 1.1 * inch, 1 * inch, 1 * inch, 1.2 * inch])
+            style = [
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#7C3AED")),
+                ("FONTNAME", (0, 0), (-1, -1), "Montserrat"),
+                ("FONTSIZE", (0, 0), (-1, -1), 9),
+            ]
+            for i, row in enumerate(rows[1:], start=1):
+                if row[-1] == "REGRESSION":
+                    style.append(("TEXTCOLOR", (-1, i), (-1, i), colors.HexColor("#DC2626")))
+            regression_table.setStyle(TableStyle(style))
+            elements.append(regression_table)
+
+    # CAPACITY SEARCH
+    capacity = data.get("capacity")
+    if capacity:
+        elements.append(PageBreak())
+        elements.append(SectionHeader("Capacity Search"))
+        elements.append(Spacer(1, 0.4 * inch))
+
+        max_rps = capacity.get("max_rps")
+        elements.append(Paragraph(
+            f"<b>Max sustainable throughput:</b> {max_rps if max_rps is not None else 'N/A'} req/s "
+            f"(step rate {capacity.get('max_rate') or 'N/A'}/s, knee at {capacity.get('knee_rate') or 'not reached'}, "
+            f"stopped: {str(capacity.get('stopped', '')).replace('_', ' ')})",
+            body_style
+        ))
+        elements.append(Spacer(1, 0.3 * inch))
+
+        chart = capacity_chart(capacity)
+        if chart:
+            elements.append(Image(chart, width=6*inch, height=3*inch))
+            elements.append(Spacer(1, 0.3 * inch))
+
+        curve_rows = [["Rate/s", "Achieved RPS", "P95 (ms)", "Error Rate", "Result"]]
+        for point in capacity.get("curve", []):
+            curve_rows.append([
+                point.get("rate"),
+                point.get("achieved_rps", "N/A"),
+                point.get("p95", "N/A"),
+                point.get("error_rate", "N/A"),
+                "PASS" if point.get("passed") else "FAIL: " + ", ".join(point.get("violations", [])),
+            ])
+        curve_table = Table(curve_rows, colWidths=[0.9 * inch, 1.2 * inch, 1 * inch, 1 * inch, 2.2 * inch])
+        curve_table.setStyle(TableStyle([
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#7C3AED")),
+            ("FONTNAME", (0, 0), (-1, -1), "Montserrat"),
+            ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ]))
+        elements.append(curve_table)
+
     # FINAL SECURITY RECAP (placed at end for clarity)
     if security:
         elements.append(PageBreak())
@@ -0,0 +1,155 @@
+"""Per-stage profiles of one run (admin-only ``profile`` runs).
+
+A ``RunProfiler`` measures every ``stage`` block in two ways, written to one
+speedscope file (https://www.speedscope.app) by ``save``:
+
+- Spans (``stages`` in the file): wall time, the event-loop thread's CPU time
+  and process CPU time of the block. ``waiting_s`` (wall minus loop CPU) is
+  time spent awaiting I/O such as the LLM response. Loop CPU includes other
+  requests served meanwhile, and process CPU includes every thread
+  (``to_thread`` work, the password pool), so both are upper bounds during
+  stages that await.
+- Samples: the event-loop thread's stack every ``PROFILE_INTERVAL_MS``, one
+  profile per stage labelled "event loop (shared)". Stages that run
+  synchronously on the loop (parse, scoring, trim, PDF) own it while they
+  run, so their samples are their own work; during awaiting stages the
+  samples show the selector and whatever other requests ran.
+
+The ``pdf`` stage is split by stack: samples inside matplotlib or a
+``*_chart`` function count as ``pdf.charts``, the rest as ``pdf.layout``.
+
+Runs without the flag get ``None`` instead of a profiler and ``stage`` is a
+no-op for them, so normal runs do no profiling work. A sampler thread only
+exists while a profiled run is inside a stage.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# Per run, across stages; sampling stops when reached.
+PROFILE_MAX_SAMPLES = int(os.getenv("PROFILE_MAX_SAMPLES", "200000"))
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+def _is_chart_frame(name: str, file: str) -> bool:
+    return name.endswith("_chart") or name == "save_chart" or f"{os.sep}matplotlib{os.sep}" in file
+
+
+class RunProfiler:
+    def __init__(self, run_id: str, interval_ms: float = PROFILE_INTERVAL_MS, max_samples: int = PROFILE_MAX_SAMPLES):
+        self.run_id = run_id
+        self.interval = interval_ms / 1000
+        self.max_samples = max_samples
+        self._frames: dict[tuple, int] = {}
+        self._frame_list: list[dict] = []
+        # stage -> (stacks, weights)
+        self._samples: dict[str, tuple[list, list]] = {}
+        self._count = 0
+        # stage -> [wall_s, loop_cpu_s, process_cpu_s, blocks]
+        self._spans: dict[str, list] = {}
+
+    @contextmanager
+    def _stage_block(self, name: str):
+        # A sampler thread per block: nothing keeps running if the stream is
+        # abandoned between stages.
+        done = threading.Event()
+        sampler = threading.Thread(
+            target=self._run, args=(name, threading.get_ident(), done), name=f"profiler-{name}", daemon=True
+        )
+        sampler.start()
+        wall, loop_cpu, process_cpu = time.perf_counter(), time.thread_time(), time.process_time()
+        try:
+            yield
+        finally:
+            span = self._spans.setdefault(name, [0.0, 0.0, 0.0, 0])
+            span[0] += time.perf_counter() - wall
+            span[1] += time.thread_time() - loop_cpu
+            span[2] += time.process_time() - process_cpu
+            span[3] += 1
+            done.set()
+            sampler.join()
+
+    def _frame_index(self, code, file: str) -> int:
+        key = (code.co_name, file, code.co_firstlineno)
+        index = self._frames.get(key)
+        if index is None:
+            index = self._frames[key] = len(self._frame_list)
+            self._frame_list.append({"name": code.co_name, "file": file, "line": code.co_firstlineno})
+        return index
+
+    def _sample(self, stage: str, target: int, weight: float) -> None:
+        frame = sys._current_frames().get(target)
+        stack = []
+        charts = False
+        while frame is not None:
+            code = frame.f_code
+            file = code.co_filename
+            charts = charts or _is_chart_frame(code.co_name, file)
+            stack.append(self._frame_index(code, file))
+            frame = frame.f_back
+        stack.reverse()  # speedscope: root first
+        if stage == "pdf":
+            stage = "pdf.charts" if charts else "pdf.layout"
+        stacks, weights = self._samples.setdefault(stage, ([], []))
+        stacks.append(stack)
+        weights.append(weight)
+        self._count += 1
+
+    def _run(self, stage: str, target: int, done: threading.Event) -> None:
+        last = time.perf_counter()
+        while not done.wait(self.interval) and self._count < self.max_samples:
+            now = time.perf_counter()
+            self._sample(stage, target, now - last)
+            last = now
+
+    def stages(self) -> dict:
+        """Wall-clock, CPU and waiting time per stage, in seconds."""
+        return {
+            stage: {
+                "wall_s": round(wall, 4),
+                "loop_cpu_s": round(loop_cpu, 4),
+                "process_cpu_s": round(process_cpu, 4),
+                "waiting_s": round(max(0.0, wall - loop_cpu), 4),
+                "blocks": blocks,
+            }
+            for stage, (wall, loop_cpu, process_cpu, blocks) in self._spans.items()
+        }
+
+    def speedscope(self) -> dict:
+        profiles = []
+        for stage, (stacks, weights) in self._samples.items():
+            total = sum(weights)
+            profiles.append({
+                "type": "sampled",
+                "name": f"{stage} - event loop (shared) ({len(stacks)} samples, {total:.3f}s)",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": total,
+                "samples": stacks,
+                "weights": weights,
+            })
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": f"run {self.run_id}",
+            "exporter": "k6-ai-backend",
+            "activeProfileIndex": 0,
+            "shared": {"frames": self._frame_list},
+            "profiles": profiles,
+            # Not part of the speedscope format; ignored by the viewer.
+            "stages": self.stages(),
+        }
+
+    def save(self, path: str) -> str:
+        with open(path, "w") as f:
+            json.dump(self.speedscope(), f)
+        return path
+
+
+def stage(profiler: "RunProfiler | None", name: str):
+    """Time and sample the block as stage ``name``; a no-op without a profiler."""
+    return profiler._stage_block(name) if profiler is not None else nullcontext()
@@ -0,0 +1,310 @@
+"""Regression detection against a rolling baseline per project, URL and load.
+
+Every finished builder run is compared with the last ``REGRESSION_WINDOW``
+runs of the same ``project_name`` + URL + load profile (executor and its
+stages/rate/duration; ``load_test_baselines``) and, once the run is saved,
+added to that window (aborted and partial runs are compared but not added).
+
+A metric regresses when the change is larger than run-to-run noise and not
+explained by sampling error:
+
+- latency p50/p95/p99: the change against the median of the baseline runs
+  must exceed ``max(REGRESSION_MIN_CHANGE, 2 x`` the relative MAD of the
+  baseline runs``)``, and a bootstrap of this run's latency sketch against
+  the merged baseline sketch must put it higher with ``REGRESSION_CONFIDENCE``
+- error rate: failed checks must rise by ``REGRESSION_MIN_ERROR_DELTA`` and a
+  one-sided two-proportion z-test against the pooled baseline must pass
+- throughput (RPS): same noise band as latency, downwards
+
+Verdicts need ``REGRESSION_MIN_RUNS`` baseline runs.
+"""
+import hashlib
+import json
+import math
+import os
+import statistics
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from .database import SessionLocal
+from .k6_runner import duration_seconds
+from .models import LoadTestBaseline
+from .sketch import LatencySketch
+
+REGRESSION_WINDOW = int(os.getenv("REGRESSION_WINDOW", "10"))
+REGRESSION_MIN_RUNS = int(os.getenv("REGRESSION_MIN_RUNS", "3"))
+REGRESSION_MIN_CHANGE = float(os.getenv("REGRESSION_MIN_CHANGE", "0.1"))
+REGRESSION_MIN_ERROR_DELTA = float(os.getenv("REGRESSION_MIN_ERROR_DELTA", "0.01"))
+REGRESSION_CONFIDENCE = float(os.getenv("REGRESSION_CONFIDENCE", "0.95"))
+REGRESSION_BOOTSTRAP_ROUNDS = int(os.getenv("REGRESSION_BOOTSTRAP_ROUNDS", "400"))
+
+LATENCY_QUANTILES = (("p50", 0.5, "med"), ("p95", 0.95, "p(95)"), ("p99", 0.99, "p(99)"))
+
+
+def load_profile(scenario: dict) -> dict:
+    """The load-shaping part of a k6 scenario, in seconds and per-second rates.
+
+    VU pool sizing and graceful stop settings are left out: they do not change
+    the load a run puts on the target.
+    """
+    profile = {"executor": scenario.get("executor")}
+    unit = duration_seconds(scenario.get("timeUnit", "1s")) or 1
+    per_unit = 1 if profile["executor"] == "ramping-vus" else unit
+    if scenario.get("stages"):
+        profile["stages"] = [
+            [duration_seconds(stage["duration"]), round(stage["target"] / per_unit, 6)] for stage in scenario["stages"]
+        ]
+    if scenario.get("rate") is not None:
+        profile["rate"] = round(scenario["rate"] / unit, 6)
+    if scenario.get("startRate"):
+        profile["start_rate"] = round(scenario["startRate"] / unit, 6)
+    if scenario.get("duration"):
+        profile["duration"] = duration_seconds(scenario["duration"])
+    return profile
+
+
+def baseline_key(project_name: str, url: str, profile: dict) -> str:
+    shape = json.dumps(profile, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{project_name}\n{url}\n{shape}".encode()).hexdigest()
+
+
+def run_entry(run_id: str, parsed_metrics: dict) -> dict | None:
+    """Statistics of one run as stored in a baseline window; None without requests."""
+    metrics = parsed_metrics.get("metrics") or {}
+    requests = (metrics.get("http_reqs") or {}).get("count") or 0
+    if not requests:
+        return None
+    duration = metrics.get("http_req_duration") or {}
+    checks = metrics.get("checks") or {}
+    sketch_data = parsed_metrics.get("latency_sketch")
+    sketch = LatencySketch.from_dict(sketch_data) if sketch_data else None
+
+    entry = {
+        "run_id": run_id,
+        "at": datetime.now(timezone.utc).isoformat(),
+        "requests": requests,
+        "rps": (metrics.get("http_reqs") or {}).get("rate"),
+        "checks": (checks.get("passes") or 0) + (checks.get("fails") or 0),
+        "errors": checks.get("fails") or 0,
+        "error_rate": checks.get("error_rate"),
+        "sketch": sketch_data,
+    }
+    for name, q, stat in LATENCY_QUANTILES:
+        # k6's summary is authoritative; the sketch fills in what it lacks (e.g. p50).
+        value = duration.get(stat)
+        if value is None and sketch is not None:
+            value = round(sketch.quantile(q), 2)
+        entry[name] = value
+    return entry
+
+
+def _normal_cdf(z: float) -> float:
+    return 0.5 * (1 + math.erf(z / math.sqrt(2)))
+
+
+def _noise_band(values: list[float], base: float) -> float:
+    """Relative change treated as run-to-run noise."""
+    mad = statistics.median(abs(v - base) for v in values)
+    return max(REGRESSION_MIN_CHANGE, 2 * 1.4826 * mad / base)
+
+
+def _verdict(change: float, band: float, confidence: float | None, higher_is_worse: bool = True) -> str:
+    worse = change > band if higher_is_worse else change < -band
+    better = change < -band if higher_is_worse else change > band
+    if confidence is None:
+        sure_worse = sure_better = True
+    else:
+        sure_worse = (confidence if higher_is_worse else 1 - confidence) >= REGRESSION_CONFIDENCE
+        sure_better = (1 - confidence if higher_is_worse else confidence) >= REGRESSION_CONFIDENCE
+    if worse and sure_worse:
+        return "regression"
+    if better and sure_better:
+        return "improvement"
+    return "ok"
+
+
+def _latency_check(name, q, entry, window, baseline_sketch, rng) -> dict:
+    values = [run[name] for run in window if run.get(name)]
+    current = entry.get(name)
+    if not values or current is None:
+        return {"metric": name, "verdict": "unknown"}
+    base = statistics.median(values)
+    change = current / base - 1
+    band = _noise_band(values, base)
+
+    confidence = None
+    method = "run_spread"
+    note = None
+    if not entry.get("sketch"):
+        # Runs with include_timeline=false write no samples, so no sketch.
+        note = "no latency sketch for this run; bootstrap skipped"
+    elif baseline_sketch is None:
+        note = "no latency sketches in the baseline; bootstrap skipped"
+    else:
+        current_boot = LatencySketch.from_dict(entry["sketch"]).bootstrap(q, REGRESSION_BOOTSTRAP_ROUNDS, rng)
+        base_boot = baseline_sketch.bootstrap(q, REGRESSION_BOOTSTRAP_ROUNDS, rng)
+        # Share of resamples in which this run's quantile is above the baseline's.
+        confidence = float(np.mean(current_boot > base_boot))
+        method = "bootstrap"
+
+    return {
+        "metric": name,
+        "unit": "ms",
+        "baseline": round(base, 2),
+        "current": current,
+        "change": round(change, 4),
+        "threshold": round(band, 4),
+        "confidence": None if confidence is None else round(confidence, 4),
+        "method": method,
+        "note": note,
+        "verdict": _verdict(change, band, confidence),
+    }
+
+
+def _error_check(entry, window) -> dict:
+    base_checks = sum(run.get("checks") or 0 for run in window)
+    base_errors = sum(run.get("errors") or 0 for run in window)
+    checks = entry.get("checks") or 0
+    if not base_checks or not checks:
+        return {"metric": "error_rate", "verdict": "unknown"}
+    base_rate = base_errors / base_checks
+    rate = entry["errors"] / checks
+    pooled = (base_errors + entry["errors"]) / (base_checks + checks)
+    se = math.sqrt(pooled * (1 - pooled) * (1 / checks + 1 / base_checks))
+    if se:
+        confidence = _normal_cdf((rate - base_rate) / se)
+    else:
+        confidence = 0.5
+    delta = rate - base_rate
+    if delta >= REGRESSION_MIN_ERROR_DELTA and confidence >= REGRESSION_CONFIDENCE:
+        verdict = "regression"
+    elif -delta >= REGRESSION_MIN_ERROR_DELTA and 1 - confidence >= REGRESSION_CONFIDENCE:
+        verdict = "improvement"
+    else:
+        verdict = "ok"
+    return {
+        "metric": "error_rate",
+        "unit": "ratio",
+        "baseline": round(base_rate, 4),
+        "current": round(rate, 4),
+        "change": round(delta, 4),
+        "threshold": REGRESSION_MIN_ERROR_DELTA,
+        "confidence": round(confidence, 4),
+        "method": "z_test",
+        "verdict": verdict,
+    }
+
+
+def _throughput_check(entry, window) -> dict:
+    values = [run["rps"] for run in window if run.get("rps")]
+    current = entry.get("rps")
+    if not values or not current:
+        return {"metric": "rps", "verdict": "unknown"}
+    base = statistics.median(values)
+    change = current / base - 1
+    band = _noise_band(values, base)
+    return {
+        "metric": "rps",
+        "unit": "req/s",
+        "baseline": round(base, 2),
+        "current": current,
+        "change": round(change, 4),
+        "threshold": round(band, 4),
+        "confidence": None,
+        "method": "run_spread",
+        "verdict": _verdict(change, band, None, higher_is_worse=False),
+    }
+
+
+def evaluate(entry: dict, window: list[dict], seed: int | None = None) -> dict:
+    """Compare ``entry`` with the baseline ``window`` (see the module docstring)."""
+    if len(window) < REGRESSION_MIN_RUNS:
+        return {
+            "status": "insufficient_baseline",
+            "baseline_runs": len(window),
+            "min_runs": REGRESSION_MIN_RUNS,
+            "checks": [],
+            "regressions": [],
+        }
+
+    sketches = [LatencySketch.from_dict(run["sketch"]) for run in window if run.get("sketch")]
+    baseline_sketch = None
+    if sketches:
+        baseline_sketch = sketches[0]
+        for sketch in sketches[1:]:
+            baseline_sketch.merge(sketch)
+
+    rng = np.random.default_rng(seed)
+    checks = [_latency_check(name, q, entry, window, baseline_sketch, rng) for name, q, _ in LATENCY_QUANTILES]
+    checks.append(_error_check(entry, window))
+    checks.append(_throughput_check(entry, window))
+
+    regressions = [c["metric"] for c in checks if c["verdict"] == "regression"]
+    if regressions:
+        status = "regression"
+    elif any(c["verdict"] == "improvement" for c in checks):
+        status = "improvement"
+    else:
+        status = "ok"
+    return {
+        "status": status,
+        "baseline_runs": len(window),
+        "baseline_since": window[0].get("at"),
+        "baseline_run_ids": [run["run_id"] for run in window],
+        "checks": checks,
+        "regressions": regressions,
+    }
+
+
+def _incomplete(parsed_metrics: dict) -> bool:
+    return bool(parsed_metrics.get("abort") or (parsed_metrics.get("scorecard") or {}).get("partial"))
+
+
+async def check_regression(project_name: str, url: str, scenario: dict, run_id: str, parsed_metrics: dict) -> dict | None:
+    """Verdict for a finished run; reads the baseline only (see ``record_baseline``)."""
+    entry = run_entry(run_id, parsed_metrics)
+    if entry is None:
+        return None
+    profile = load_profile(scenario)
+
+    async with SessionLocal() as session:
+        baseline = await session.get(LoadTestBaseline, baseline_key(project_name, url, profile))
+        window = list(baseline.runs) if baseline else []
+
+    verdict = evaluate(entry, window)
+    verdict["load_profile"] = profile
+    # A run cut short, or missing a failed agent's load, is not representative of the target.
+    verdict["baseline_updated"] = not _incomplete(parsed_metrics)
+    return verdict
+
+
+async def record_baseline(project_name: str, url: str, scenario: dict, run_id: str, parsed_metrics: dict) -> bool:
+    """Add a saved run to its baseline window; aborted and partial runs are not added."""
+    if _incomplete(parsed_metrics):
+        return False
+    entry = run_entry(run_id, parsed_metrics)
+    if entry is None:
+        return False
+    key = baseline_key(project_name, url, load_profile(scenario))
+
+    for attempt in range(2):
+        try:
+            async with SessionLocal() as session:
+                result = await session.execute(
+                    select(LoadTestBaseline).where(LoadTestBaseline.key == key).with_for_update()
+                )
+                baseline = result.scalar_one_or_none()
+                if baseline is None:
+                    session.add(LoadTestBaseline(key=key, project_name=project_name, url=url, runs=[entry]))
+                else:
+                    baseline.runs = (list(baseline.runs) + [entry])[-REGRESSION_WINDOW:]
+                await session.commit()
+            return True
+        except IntegrityError:
+            # A concurrent first run created the row; the retry locks and appends to it.
+            if attempt:
+                raise
+    return False
@@ -0,0 +1,45 @@
+# Bump when summary_columns() starts extracting new/different fields so the
+# backfill re-processes rows written by an older version.
+SUMMARY_VERSION = 2
+
+
+def summary_columns(payload: dict | None) -> dict:
+    """Extract the denormalized ``LoadTest`` list columns from a result payload."""
+    payload = payload or {}
+    scorecard = payload.get("scorecard") or {}
+    metrics = payload.get("metrics") or {}
+    checks = metrics.get("checks") or {}
+    duration = metrics.get("http_req_duration") or {}
+    reqs = metrics.get("http_reqs") or {}
+
+    security = payload.get("security_headers") or {}
+    ssl_payload = payload.get("ssl") or {}
+    wpt = payload.get("webpagetest") or {}
+    lh = payload.get("lighthouse") or {}
+
+    lighthouse_score = lh.get("score") if isinstance(lh, dict) else None
+    # Support older lighthouse payload shape (categories.performance)
+    if lighthouse_score is None and isinstance(lh, dict):
+        cats = lh.get("categories") or {}
+        lighthouse_score = cats.get("performance")
+
+    security_grade = security.get("grade") or security.get("score")
+    ssl_grade = ssl_payload.get("rating") or ssl_payload.get("ssllabs_grade")
+
+    return {
+        "score": scorecard.get("score"),
+        "grade": scorecard.get("grade"),
+        "error_rate": checks.get("error_rate") if isinstance(checks, dict) else None,
+        "security_grade": str(security_grade) if security_grade is not None else None,
+        "ssl_grade": ssl_grade,
+        "ssl_versions": ssl_payload.get("supported_versions") if isinstance(ssl_payload, dict) else None,
+        "wpt_grade": wpt.get("grade"),
+        "lighthouse_score": lighthouse_score,
+        "requests": reqs.get("count"),
+        "rps": reqs.get("rate"),
+        "avg_ms": duration.get("avg"),
+        "p95_ms": duration.get("p(95)"),
+        "p99_ms": duration.get("p(99)"),
+        "latency_sketch": payload.get("latency_sketch"),
+        "summary_version": SUMMARY_VERSION,
+    }
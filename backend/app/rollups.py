@@ -0,0 +1,208 @@
+"""Daily and weekly rollups of run summaries for ``/api/trends``.
+
+Each saved run is added to one ``load_test_rollups`` row per period (UTC day
+and ISO week) for its project, URL and user, and flagged ``rolled_up`` in the
+same transaction, so a run is counted once whether the save path or the
+backfill gets to it first. Rollups hold sums and merged latency sketches, so
+a trend query reads one row per bucket (per user and URL) however many runs
+it covers.
+"""
+import hashlib
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from .database import SessionLocal
+from .models import LoadTest, LoadTestRollup
+from .result_summary import SUMMARY_VERSION
+from .sketch import LatencySketch
+
+logger = logging.getLogger(__name__)
+
+TRENDS_DEFAULT_DAYS = int(os.getenv("TRENDS_DEFAULT_DAYS", "90"))
+TRENDS_MAX_BUCKETS = int(os.getenv("TRENDS_MAX_BUCKETS", "730"))
+
+PERIODS = ("day", "week")
+
+ROLLUP_COLUMNS = (
+    LoadTest.id,
+    LoadTest.project_name,
+    LoadTest.url,
+    LoadTest.user_id,
+    LoadTest.created_at,
+    LoadTest.score,
+    LoadTest.error_rate,
+    LoadTest.requests,
+    LoadTest.rps,
+    LoadTest.avg_ms,
+    LoadTest.p95_ms,
+    LoadTest.latency_sketch,
+)
+
+
+def rollup_key(project_name: str, url: str) -> str:
+    return hashlib.sha256(f"{project_name}\n{url}".encode()).hexdigest()
+
+
+def bucket_start(period: str, at: date) -> date:
+    return at - timedelta(days=at.weekday()) if period == "week" else at
+
+
+def _run_day(created_at: datetime | None) -> date:
+    if created_at is None:
+        return datetime.now(timezone.utc).date()
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+
+async def _apply(session, run) -> None:
+    """Add one run (``ROLLUP_COLUMNS`` row) to its day and week rollups."""
+    if not run.requests or run.p95_ms is None:
+        return  # nothing measured
+    day = _run_day(run.created_at)
+    key = rollup_key(run.project_name, run.url)
+    for period in PERIODS:
+        pk = {"period": period, "key": key, "user_id": run.user_id or "", "bucket_start": bucket_start(period, day)}
+        rollup = (await session.execute(select(LoadTestRollup).filter_by(**pk).with_for_update())).scalar_one_or_none()
+        if rollup is None:
+            rollup = LoadTestRollup(
+                **pk, project_name=run.project_name, url=run.url, runs=0, requests=0, rps_sum=0.0,
+                latency_sum_ms=0.0, p95_ms_sum=0.0, error_rate_sum=0.0, score_sum=0.0,
+            )
+            session.add(rollup)
+
+        rollup.runs += 1
+        rollup.requests += run.requests
+        rollup.rps_sum += run.rps or 0.0
+        rollup.rps_max = max(rollup.rps_max or 0.0, run.rps or 0.0)
+        rollup.latency_sum_ms += (run.avg_ms or 0.0) * run.requests
+        rollup.p95_ms_sum += run.p95_ms
+        rollup.p95_ms_max = max(rollup.p95_ms_max or 0.0, run.p95_ms)
+        rollup.error_rate_sum += run.error_rate or 0.0
+        rollup.score_sum += run.score or 0.0
+        if run.latency_sketch:
+            sketch = LatencySketch.from_dict(run.latency_sketch)
+            if rollup.latency_sketch:
+                sketch.merge(LatencySketch.from_dict(rollup.latency_sketch))
+            rollup.latency_sketch = sketch.to_dict()
+
+
+async def _roll_up(where) -> int:
+    """Roll up the not yet counted runs matching ``where``; returns how many were found."""
+    # Two runs opening the same new bucket race on the insert; the retry
+    # finds the row the other one committed.
+    for attempt in range(3):
+        try:
+            async with SessionLocal() as session:
+                result = await session.execute(
+                    select(*ROLLUP_COLUMNS).where(LoadTest.rolled_up.is_(None), *where).with_for_update()
+                )
+                runs = result.all()
+                for run in runs:
+                    await _apply(session, run)
+                if runs:
+                    await session.execute(
+                        update(LoadTest)
+                        .where(LoadTest.id.in_([run.id for run in runs]))
+                        .values(rolled_up=True)
+                        .execution_options(synchronize_session=False)
+                    )
+                await session.commit()
+                return len(runs)
+        except IntegrityError:
+            if attempt == 2:
+                raise
+    return 0
+
+
+async def record_run(run_id: str) -> None:
+    """Add a saved run to its rollups (the backfill retries it if this fails)."""
+    await _roll_up([LoadTest.id == run_id])
+
+
+async def backfill_rollups(batch_size: int = 200) -> int:
+    """Roll up runs saved before the rollup tables existed (or missed by the save path)."""
+    rolled = 0
+    while True:
+        async with SessionLocal() as session:
+            result = await session.execute(
+                select(LoadTest.id)
+                .where(LoadTest.rolled_up.is_(None), LoadTest.summary_version >= SUMMARY_VERSION)
+                .order_by(LoadTest.id)
+                .limit(batch_size)
+            )
+            ids = result.scalars().all()
+        if not ids:
+            break
+        await _roll_up([LoadTest.id.in_(ids)])
+        rolled += len(ids)
+        logger.info("backfill-rollups: %d runs rolled up", rolled)
+    return rolled
+
+
+def _merge(rows) -> dict:
+    runs = sum(r.runs for r in rows)
+    requests = sum(r.requests for r in rows)
+    sketch = None
+    for r in rows:
+        if r.latency_sketch:
+            part = LatencySketch.from_dict(r.latency_sketch)
+            sketch = part if sketch is None else sketch.merge(part)
+
+    def quantile(q):
+        return round(sketch.quantile(q), 2) if sketch is not None and sketch.count else None
+
+    return {
+        "start": rows[0].bucket_start.isoformat(),
+        "runs": runs,
+        "requests": requests,
+        "rps": round(sum(r.rps_sum for r in rows) / runs, 2),
+        "rps_max": max(r.rps_max or 0.0 for r in rows),
+        "avg_ms": round(sum(r.latency_sum_ms for r in rows) / requests, 2) if requests else None,
+        # Over all requests of the bucket, from the merged sketches.
+        "p50_ms": quantile(0.5),
+        "p95_ms": quantile(0.95),
+        "p99_ms": quantile(0.99),
+        # Spread of the per-run p95s.
+        "p95_ms_mean": round(sum(r.p95_ms_sum for r in rows) / runs, 2),
+        "p95_ms_max": max(r.p95_ms_max or 0.0 for r in rows),
+        "error_rate": round(sum(r.error_rate_sum for r in rows) / runs, 4),
+        "score": round(sum(r.score_sum for r in rows) / runs, 2),
+    }
+
+
+async def load_trend(
+    session,
+    project_name: str,
+    url: str | None,
+    period: str,
+    start: date,
+    end: date,
+    user_id: str | None = None,
+) -> list[dict]:
+    """Buckets from ``start`` to ``end`` (inclusive) that have runs, oldest first.
+
+    Rows of several URLs (``url`` None) or users (``user_id`` None) are merged
+    per bucket.
+    """
+    stmt = select(LoadTestRollup).where(
+        LoadTestRollup.period == period,
+        LoadTestRollup.bucket_start >= bucket_start(period, start),
+        LoadTestRollup.bucket_start <= end,
+    )
+    if url is not None:
+        stmt = stmt.where(LoadTestRollup.key == rollup_key(project_name, url))
+    else:
+        stmt = stmt.where(LoadTestRollup.project_name == project_name)
+    if user_id is not None:
+        stmt = stmt.where(LoadTestRollup.user_id == user_id)
+    result = await session.execute(stmt.order_by(LoadTestRollup.bucket_start))
+
+    buckets: dict[date, list] = {}
+    for row in result.scalars().all():
+        buckets.setdefault(row.bucket_start, []).append(row)
+    return [_merge(rows) for rows in buckets.values()]
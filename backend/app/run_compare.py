@@ -0,0 +1,192 @@
+"""Side-by-side comparison of finished runs (``/api/result/compare``).
+
+Reads only the ``load_tests`` summary columns and the ``load_test_timelines``
+rows, never the result blobs:
+
+- timelines are aligned on the offset from each run's first second and
+  resampled onto one grid of at most ``points`` buckets
+- metric deltas and latency percentile differences are relative to the
+  first run (the reference); percentiles come from the stored latency
+  sketches, merged from the timeline samples for runs saved without one
+
+Runs whose timeline still lives in the blob (``split-timelines`` not run)
+come back without a timeline series.
+"""
+import math
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import select
+
+from .models import LoadTest, LoadTestTimeline
+from .sketch import LatencySketch
+
+COMPARE_MAX_RUNS = int(os.getenv("COMPARE_MAX_RUNS", "5"))
+COMPARE_POINTS = int(os.getenv("COMPARE_POINTS", "120"))
+COMPARE_CACHE_SECONDS = float(os.getenv("COMPARE_CACHE_SECONDS", "300"))
+
+PERCENTILES = (("p50", 0.5), ("p75", 0.75), ("p90", 0.9), ("p95", 0.95), ("p99", 0.99), ("p99.9", 0.999))
+METRICS = ("score", "error_rate", "requests", "rps", "avg_ms", "p95_ms", "p99_ms")
+
+SUMMARY_COLUMNS = (
+    LoadTest.id,
+    LoadTest.project_name,
+    LoadTest.url,
+    LoadTest.status,
+    LoadTest.created_at,
+    LoadTest.user_id,
+    LoadTest.username,
+    LoadTest.score,
+    LoadTest.grade,
+    LoadTest.error_rate,
+    LoadTest.requests,
+    LoadTest.rps,
+    LoadTest.avg_ms,
+    LoadTest.p95_ms,
+    LoadTest.p99_ms,
+    LoadTest.latency_sketch,
+)
+
+
+async def load_runs(session, ids: list[str]) -> dict:
+    """Summary rows of ``ids`` keyed by run id (missing runs are absent)."""
+    result = await session.execute(select(*SUMMARY_COLUMNS).where(LoadTest.id.in_(ids)))
+    return {row.id: row for row in result.all()}
+
+
+async def _load_timelines(session, ids: list[str]) -> dict:
+    result = await session.execute(
+        select(
+            LoadTestTimeline.run_id,
+            LoadTestTimeline.ts,
+            LoadTestTimeline.latency,
+            LoadTestTimeline.requests,
+            LoadTestTimeline.checks_pass,
+            LoadTestTimeline.checks_fail,
+        )
+        .where(LoadTestTimeline.run_id.in_(ids))
+        .order_by(LoadTestTimeline.run_id, LoadTestTimeline.ts)
+    )
+    rows = defaultdict(list)
+    for row in result.all():
+        rows[row.run_id].append(row)
+    return rows
+
+
+def _change(current, reference) -> dict:
+    if current is None or reference is None:
+        return {"change": None, "relative": None}
+    return {
+        "change": round(current - reference, 4),
+        "relative": round(current / reference - 1, 4) if reference else None,
+    }
+
+
+def _series(rows, step: int, buckets: int) -> dict:
+    """Resample one run's per-second rows onto ``buckets`` buckets of ``step`` seconds."""
+    series = {"rps": [None] * buckets, "latency_avg": [None] * buckets,
+              "latency_p95": [None] * buckets, "error_rate": [None] * buckets}
+    if not rows:
+        return series
+    start = rows[0].ts
+    duration = rows[-1].ts - start + 1
+    latency = [[] for _ in range(buckets)]
+    requests = [0.0] * buckets
+    passes = [0] * buckets
+    fails = [0] * buckets
+    seen = [False] * buckets
+    for row in rows:
+        i = (row.ts - start) // step
+        if i >= buckets:
+            break
+        seen[i] = True
+        if row.latency:
+            latency[i].extend(row.latency)
+        requests[i] += row.requests or 0
+        passes[i] += row.checks_pass or 0
+        fails[i] += row.checks_fail or 0
+
+    for i in range(buckets):
+        if not seen[i]:
+            continue
+        # Seconds without samples have no row but still count towards the rate.
+        seconds = min(step, duration - i * step)
+        series["rps"][i] = round(requests[i] / seconds, 2)
+        if latency[i]:
+            values = np.asarray(latency[i], dtype=float)
+            series["latency_avg"][i] = round(float(values.mean()), 2)
+            series["latency_p95"][i] = round(float(np.percentile(values, 95)), 2)
+        if passes[i] + fails[i]:
+            series["error_rate"][i] = round(fails[i] / (passes[i] + fails[i]), 4)
+    return series
+
+
+def _sketch(run, rows) -> LatencySketch | None:
+    if run.latency_sketch:
+        return LatencySketch.from_dict(run.latency_sketch)
+    # Older runs: merge the per-second samples of the timeline.
+    sketch = None
+    for row in rows:
+        if row.latency:
+            part = LatencySketch.from_values(row.latency)
+            sketch = part if sketch is None else sketch.merge(part)
+    return sketch
+
+
+async def build_comparison(session, ids: list[str], runs: dict, points: int = COMPARE_POINTS) -> dict:
+    """Comparison payload for ``ids`` (in order, first is the reference)."""
+    timelines = await _load_timelines(session, ids)
+
+    durations = {run_id: (rows[-1].ts - rows[0].ts + 1) if rows else 0 for run_id, rows in timelines.items()}
+    longest = max(durations.values(), default=0)
+    step = max(1, math.ceil(longest / max(1, points)))
+    buckets = math.ceil(longest / step) if longest else 0
+
+    items = []
+    series = {}
+    reference = None
+    for run_id in ids:
+        run = runs[run_id]
+        rows = timelines.get(run_id, [])
+        sketch = _sketch(run, rows)
+        metrics = {name: getattr(run, name) for name in METRICS}
+        percentiles = {
+            label: (round(sketch.quantile(q), 2) if sketch is not None and sketch.count else None)
+            for label, q in PERCENTILES
+        }
+        if reference is None:
+            reference = {"metrics": metrics, "percentiles": percentiles}
+        items.append({
+            "id": run_id,
+            "project_name": run.project_name,
+            "url": run.url,
+            "status": run.status,
+            "created_at": run.created_at,
+            "run_by": {"id": run.user_id, "username": run.username},
+            "grade": run.grade,
+            "duration": durations.get(run_id, 0),
+            "metrics": metrics,
+            "percentiles": percentiles,
+            # False for runs stored without samples (include_timeline=false):
+            # their percentiles are unknown rather than missing data.
+            "latency_sketch": sketch is not None and bool(sketch.count),
+            "deltas": {name: _change(metrics[name], reference["metrics"][name]) for name in METRICS},
+            "percentile_deltas": {
+                label: _change(percentiles[label], reference["percentiles"][label]) for label, _ in PERCENTILES
+            },
+        })
+        series[run_id] = _series(rows, step, buckets)
+
+    return {
+        "ids": ids,
+        "reference": ids[0],
+        "runs": items,
+        "timeline": {
+            "step": step,
+            "offsets": [i * step for i in range(buckets)],
+            "series": series,
+        },
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+    }
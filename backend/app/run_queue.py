@@ -0,0 +1,96 @@
+"""In-process queue for runs that have no client connection (scheduled runs).
+
+Workers take jobs in order, at most ``RUN_QUEUE_CONCURRENCY`` at a time, so
+background runs share the load generator instead of piling onto it. Jobs are
+keyed by target (``target_key``): a target that is queued, running from the
+queue or under an interactive run on this worker is refused, so two runs
+never load the same target at once.
+
+The queue lives in one worker's memory; with several uvicorn workers each has
+its own.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from .run_supervisor import target_active
+
+logger = logging.getLogger(__name__)
+
+RUN_QUEUE_CONCURRENCY = int(os.getenv("RUN_QUEUE_CONCURRENCY", "1"))
+RUN_QUEUE_MAX_PENDING = int(os.getenv("RUN_QUEUE_MAX_PENDING", "20"))
+
+
+class TargetBusy(Exception):
+    pass
+
+
+class RunQueueFull(Exception):
+    pass
+
+
+def target_key(url: str) -> str:
+    """``host:port`` of ``url``; runs with the same key overlap on one target."""
+    parts = urlsplit(str(url))
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return f"{(parts.hostname or '').lower()}:{port}"
+
+
+class RunQueue:
+    def __init__(self, concurrency: int = RUN_QUEUE_CONCURRENCY, max_pending: int = RUN_QUEUE_MAX_PENDING):
+        self.concurrency = max(1, concurrency)
+        self.max_pending = max_pending
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._jobs: dict[str, dict] = {}
+        self._workers: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def busy(self, key: str) -> bool:
+        return key in self._jobs or target_active(key)
+
+    def submit(self, key: str, label: str, job, user_id: str | None = None) -> dict:
+        """Queue ``job`` (an async callable) for target ``key``; returns its entry.
+
+        ``user_id`` is the owner the entry is shown to (see ``snapshot``).
+        Raises ``TargetBusy`` or ``RunQueueFull``.
+        """
+        if self.busy(key):
+            raise TargetBusy(key)
+        if self._queue.qsize() >= self.max_pending:
+            raise RunQueueFull(key)
+        entry = {
+            "key": key,
+            "label": label,
+            "user_id": user_id,
+            "queued_at": datetime.now(timezone.utc).isoformat(),
+            "started_at": None,
+        }
+        self._jobs[key] = entry
+        self._queue.put_nowait((entry, job))
+        return entry
+
+    def snapshot(self, user_id: str | None = None) -> list[dict]:
+        """Entries in the queue; only those owned by ``user_id`` when it is given."""
+        return [dict(entry) for entry in self._jobs.values() if user_id is None or entry["user_id"] == user_id]
+
+    async def _work(self) -> None:
+        while True:
+            entry, job = await self._queue.get()
+            entry["started_at"] = datetime.now(timezone.utc).isoformat()
+            try:
+                await job()
+            except Exception:
+                logger.exception("run-queue: %s failed", entry["label"])
+            finally:
+                self._jobs.pop(entry["key"], None)
+                self._queue.task_done()
@@ -0,0 +1,233 @@
+"""k6 process supervision: timeouts, process-group signals, cancellation, cleanup.
+
+``K6Process`` runs k6 in its own session (process group) so a stop reaches
+everything it spawned. It enforces a wall-clock limit and an idle limit (no
+console output), stops k6 with SIGINT first (k6 then flushes its output and
+writes the summary), escalates to SIGKILL after ``K6_KILL_GRACE_SECONDS``
+and always waits for the child, so no zombie is left behind.
+
+``RunHandle`` is the per-run cancel switch behind ``POST /api/run/{id}/cancel``.
+Handles live in this worker's memory only.
+"""
+import asyncio
+import os
+import shutil
+import signal
+import tempfile
+import time
+from datetime import datetime, timezone
+
+WORKSPACE_PREFIX = "k6-ai-"
+
+# Allowance on top of the planned load profile (startup, graceful stop, teardown).
+K6_TIMEOUT_SECONDS = float(os.getenv("K6_TIMEOUT_SECONDS", "180"))
+# Hard cap for any run; also the limit for uploaded scripts, whose length is unknown.
+K6_RUN_MAX_SECONDS = float(os.getenv("K6_RUN_MAX_SECONDS", "3600"))
+# k6 prints progress every second; a silent k6 is hung.
+K6_IDLE_TIMEOUT_SECONDS = float(os.getenv("K6_IDLE_TIMEOUT_SECONDS", "120"))
+K6_KILL_GRACE_SECONDS = float(os.getenv("K6_KILL_GRACE_SECONDS", "15"))
+# Leftover run directories older than this are removed at startup.
+K6_WORKSPACE_MAX_AGE_SECONDS = float(os.getenv("K6_WORKSPACE_MAX_AGE_SECONDS", "86400"))
+
+
+def run_deadline(planned_seconds: float | None) -> float:
+    """Wall-clock limit for a run whose load profile lasts ``planned_seconds``."""
+    if planned_seconds is None:
+        return K6_RUN_MAX_SECONDS
+    return min(planned_seconds + K6_TIMEOUT_SECONDS, K6_RUN_MAX_SECONDS)
+
+
+def make_workspace() -> str:
+    return tempfile.mkdtemp(prefix=WORKSPACE_PREFIX)
+
+
+def remove_workspace(path: str | None) -> None:
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def sweep_stale_workspaces(max_age: float = K6_WORKSPACE_MAX_AGE_SECONDS) -> int:
+    """Remove run directories left behind by crashed workers; returns the count."""
+    root = tempfile.gettempdir()
+    cutoff = time.time() - max_age
+    removed = 0
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if not name.startswith(WORKSPACE_PREFIX) or not os.path.isdir(path):
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+# Running k6 children of this worker (for /metrics).
+_live_processes: set = set()
+
+
+def live_process_count() -> int:
+    return len(_live_processes)
+
+
+class K6Process:
+    """One supervised k6 child; ``async with`` guarantees it is stopped and reaped."""
+
+    def __init__(
+        self,
+        args: list[str],
+        env=None,
+        max_seconds: float = K6_RUN_MAX_SECONDS,
+        idle_seconds: float = K6_IDLE_TIMEOUT_SECONDS,
+    ):
+        self.args = args
+        self.env = env
+        self.max_seconds = max_seconds
+        self.idle_seconds = idle_seconds
+        self.proc = None
+        self.stop_reason = None
+        self._kill_timer = None
+
+    @property
+    def pid(self):
+        return self.proc.pid if self.proc else None
+
+    @property
+    def returncode(self):
+        return self.proc.returncode if self.proc else None
+
+    async def __aenter__(self):
+        self.proc = await asyncio.create_subprocess_exec(
+            *self.args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            env=self.env,
+            start_new_session=True,
+        )
+        _live_processes.add(self)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def lines(self):
+        """k6 console lines; on a timeout yields ``K6_TIMEOUT ...`` and stops k6."""
+        assert self.proc is not None and self.proc.stdout is not None
+        deadline = time.monotonic() + self.max_seconds
+        while True:
+            now = time.monotonic()
+            wait = self.idle_seconds if self.stop_reason else min(self.idle_seconds, max(deadline - now, 0))
+            try:
+                line = await asyncio.wait_for(self.proc.stdout.readline(), timeout=wait)
+            except asyncio.TimeoutError:
+                if self.stop_reason:
+                    # Already stopping and still silent: do not wait for the grace timer.
+                    self._signal(signal.SIGKILL)
+                    break
+                reason = "wall_clock" if time.monotonic() >= deadline else "idle"
+                limit = self.max_seconds if reason == "wall_clock" else self.idle_seconds
+                yield f"K6_TIMEOUT {reason} limit of {int(limit)}s reached, stopping k6\n"
+                self.stop(reason)
+                continue
+            if not line:
+                break
+            yield line.decode(errors="ignore")
+        try:
+            # stdout closed; a k6 that does not exit now is stuck in shutdown.
+            await asyncio.wait_for(asyncio.shield(self.proc.wait()), timeout=K6_KILL_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            self._signal(signal.SIGKILL)
+        await self.wait()
+
+    def stop(self, reason: str) -> None:
+        """Graceful stop (SIGINT to the group), SIGKILL after the grace period."""
+        if self.stop_reason or self.returncode is not None:
+            return
+        self.stop_reason = reason
+        self._signal(signal.SIGINT)
+        self._kill_timer = asyncio.get_running_loop().call_later(
+            K6_KILL_GRACE_SECONDS, self._signal, signal.SIGKILL
+        )
+
+    async def wait(self):
+        returncode = await self.proc.wait()
+        if self._kill_timer:
+            self._kill_timer.cancel()
+        return returncode
+
+    async def close(self) -> None:
+        if self.proc is None:
+            return
+        # Also reaches anything k6 left running in its group after exiting.
+        self._signal(signal.SIGKILL)
+        try:
+            await self.wait()
+        finally:
+            _live_processes.discard(self)
+
+    def _signal(self, sig) -> None:
+        if self.proc is None:
+            return
+        try:
+            os.killpg(self.proc.pid, sig)
+        except OSError:  # group already gone
+            pass
+
+
+class RunHandle:
+    """Cancel switch for one run; k6 processes/agent fan-outs register a stop callback."""
+
+    def __init__(self, run_id: str, user_id: str | None = None, target: str | None = None):
+        self.run_id = run_id
+        self.user_id = user_id
+        self.target = target
+        self.cancelled = None
+        self._callbacks = set()
+
+    def on_cancel(self, callback):
+        """Register ``callback``; returns a function that unregisters it."""
+        self._callbacks.add(callback)
+        return lambda: self._callbacks.discard(callback)
+
+    def cancel(self, by: str | None = None) -> None:
+        if self.cancelled:
+            return
+        self.cancelled = {
+            "reason": "cancelled",
+            "by": by,
+            "at": datetime.now(timezone.utc).isoformat(),
+        }
+        for callback in list(self._callbacks):
+            callback()
+
+
+_active_runs: dict[str, RunHandle] = {}
+
+
+def register_run(run_id: str, user_id: str | None = None, target: str | None = None) -> RunHandle:
+    handle = _active_runs[run_id] = RunHandle(run_id, user_id, target)
+    return handle
+
+
+def unregister_run(run_id: str) -> None:
+    _active_runs.pop(run_id, None)
+
+
+def active_run_count() -> int:
+    return len(_active_runs)
+
+
+def active_run(run_id: str) -> RunHandle | None:
+    return _active_runs.get(run_id)
+
+
+def target_active(target: str) -> bool:
+    """Whether a run against ``target`` (``run_queue.target_key``) is executing here."""
+    return any(handle.target == target for handle in _active_runs.values())
+
+
+def cancel_all_runs(by: str) -> None:
+    for handle in list(_active_runs.values()):
+        handle.cancel(by)
@@ -0,0 +1,175 @@
+import asyncio
+import math
+import os
+import time
+from datetime import datetime, timezone
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - optional, only loop lag is sampled without it
+    psutil = None
+
+# A run whose generator is CPU-bound or out of descriptors measures the
+# generator, not the target. Samples are taken once per interval while k6
+# runs; a run is flagged when enough samples breach a limit.
+SATURATION_SAMPLE_SECONDS = float(os.getenv("SATURATION_SAMPLE_SECONDS", "1"))
+SATURATION_CPU_PERCENT = float(os.getenv("SATURATION_CPU_PERCENT", "90"))
+SATURATION_FD_RATIO = float(os.getenv("SATURATION_FD_RATIO", "0.9"))
+SATURATION_LOOP_LAG_MS = float(os.getenv("SATURATION_LOOP_LAG_MS", "200"))
+# Share of samples that must breach a limit before the run is flagged.
+SATURATION_MIN_SHARE = float(os.getenv("SATURATION_MIN_SHARE", "0.2"))
+
+
+def cpu_capacity() -> float:
+    """CPUs available to this container: cgroup v2 quota, else the affinity mask."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return max(float(quota) / float(period), 0.01)
+    except (OSError, ValueError):
+        pass
+    try:
+        return float(len(os.sched_getaffinity(0)))
+    except AttributeError:  # pragma: no cover - non-Linux
+        return float(os.cpu_count() or 1)
+
+
+def _process_stats(proc) -> dict:
+    """CPU (% of one CPU since last call), RSS, fds and sockets of ``proc``."""
+    stats = {"cpu": None, "rss_mb": None, "fds": None, "fd_limit": None, "sockets": None}
+    try:
+        with proc.oneshot():
+            stats["cpu"] = proc.cpu_percent(None)
+            stats["rss_mb"] = round(proc.memory_info().rss / (1024 * 1024), 1)
+            if hasattr(proc, "num_fds"):
+                stats["fds"] = proc.num_fds()
+            if hasattr(proc, "rlimit"):
+                stats["fd_limit"] = proc.rlimit(psutil.RLIMIT_NOFILE)[0]
+        connections = getattr(proc, "net_connections", None) or proc.connections
+        stats["sockets"] = len(connections(kind="inet"))
+    except (psutil.Error, OSError):
+        pass
+    return stats
+
+
+class SaturationSampler:
+    """Sample the k6 child process, the backend process and event-loop lag.
+
+    ``start()`` after k6 is spawned, ``await stop()`` once it exits; ``stop``
+    returns the samples (one dict per interval, ``ts`` in unix seconds).
+    """
+
+    def __init__(self, pid: int | None, interval: float = SATURATION_SAMPLE_SECONDS):
+        self.interval = interval
+        self.samples: list[dict] = []
+        self.capacity = cpu_capacity()
+        self._task = None
+        self._k6 = None
+        self._backend = None
+        if psutil is not None:
+            try:
+                self._backend = psutil.Process()
+                self._k6 = psutil.Process(pid) if pid else None
+            except psutil.Error:
+                self._k6 = None
+
+    def start(self) -> None:
+        if self.interval <= 0:
+            return
+        for proc in (self._k6, self._backend):
+            if proc is not None:
+                try:
+                    proc.cpu_percent(None)  # prime the CPU counters
+                except psutil.Error:
+                    pass
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> list[dict]:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        return self.samples
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (time.monotonic() - expected) * 1000)
+            self.samples.append(self._sample(lag_ms))
+
+    def _sample(self, lag_ms: float) -> dict:
+        sample = {"ts": int(time.time()), "loop_lag_ms": round(lag_ms, 1)}
+        if psutil is None:
+            return sample
+
+        for name, proc in (("k6", self._k6), ("backend", self._backend)):
+            if proc is None:
+                continue
+            stats = _process_stats(proc)
+            cpu = stats.pop("cpu")
+            # Percent of the container's CPU budget, not of a single core.
+            sample[f"{name}_cpu"] = round(cpu / self.capacity, 1) if cpu is not None else None
+            for key, value in stats.items():
+                sample[f"{name}_{key}"] = value
+        try:
+            sample["host_cpu"] = psutil.cpu_percent(None)
+        except OSError:
+            pass
+        return sample
+
+
+def _breaches(sample: dict) -> list[str]:
+    reasons = []
+    cpu = (sample.get("k6_cpu") or 0) + (sample.get("backend_cpu") or 0)
+    if cpu >= SATURATION_CPU_PERCENT:
+        reasons.append("cpu")
+    for name in ("k6", "backend"):
+        fds, limit = sample.get(f"{name}_fds"), sample.get(f"{name}_fd_limit")
+        if fds is not None and limit and limit > 0 and fds >= limit * SATURATION_FD_RATIO:
+            reasons.append("file_descriptors")
+            break
+    if (sample.get("loop_lag_ms") or 0) >= SATURATION_LOOP_LAG_MS:
+        reasons.append("event_loop_lag")
+    return reasons
+
+
+def _peak(samples: list[dict], key: str):
+    values = [s[key] for s in samples if s.get(key) is not None]
+    return max(values) if values else None
+
+
+def assess(samples: list[dict]) -> dict:
+    """Summarize samples into the ``generator`` block of a result."""
+    counts: dict[str, int] = {}
+    for sample in samples:
+        for reason in _breaches(sample):
+            counts[reason] = counts.get(reason, 0) + 1
+
+    needed = max(1, math.ceil(len(samples) * SATURATION_MIN_SHARE))
+    reasons = sorted(reason for reason, count in counts.items() if count >= needed)
+
+    return {
+        "saturated": bool(reasons),
+        "reasons": reasons,
+        "samples": len(samples),
+        "sampling": psutil is not None,
+        "peak": {
+            key: _peak(samples, key)
+            for key in ("k6_cpu", "backend_cpu", "host_cpu", "k6_rss_mb", "k6_fds", "k6_sockets", "loop_lag_ms")
+        },
+    }
+
+
+def timeline_series(samples: list[dict]) -> dict:
+    """Samples keyed by the parser's second-bucket labels (a list per bucket,
+    one entry per generator node)."""
+    series: dict[str, list[dict]] = {}
+    for sample in samples:
+        label = datetime.fromtimestamp(sample["ts"], tz=timezone.utc).isoformat()
+        series.setdefault(label, []).append(sample)
+    return series
@@ -0,0 +1,199 @@
+"""Recurring builder runs (``load_test_schedules``) fired in-process.
+
+Every ``SCHEDULER_POLL_SECONDS`` the scheduler loads the due schedules and
+claims each slot by moving ``next_run_at`` forward with a conditional UPDATE,
+so with several backend workers a slot still fires once. Claimed runs go
+through the run queue (``run_queue``) and need no client connection.
+
+- Cron expressions are evaluated in UTC.
+- Jitter: a schedule fires at a fixed offset of up to ``jitter_seconds`` after
+  its cron time, derived from its id, so schedules sharing an expression are
+  spread over the window instead of colliding on the load generator.
+- Overlap: a slot is skipped (``skipped_overlap``) while the schedule's
+  previous run is queued or running (its ``last_status``, so on any worker;
+  after ``SCHEDULER_ACTIVE_RUN_SECONDS`` the run counts as lost) or while a
+  run against the same target is queued or running on this worker.
+- Catch-up: slots missed while the backend was down collapse into one run on
+  the next tick when ``catch_up`` is set and the newest missed slot is within
+  ``SCHEDULER_CATCHUP_SECONDS``; otherwise they are recorded as ``missed``.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from functools import partial
+
+from croniter import croniter
+from sqlalchemy import select, update
+
+from .database import SessionLocal
+from .models import LoadTestSchedule
+from .run_queue import RunQueueFull, TargetBusy
+from .run_supervisor import K6_RUN_MAX_SECONDS
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in {"1", "true", "yes"}
+SCHEDULER_POLL_SECONDS = float(os.getenv("SCHEDULER_POLL_SECONDS", "30"))
+# Default spread window for new schedules.
+SCHEDULER_JITTER_SECONDS = int(os.getenv("SCHEDULER_JITTER_SECONDS", "300"))
+SCHEDULER_CATCHUP_SECONDS = float(os.getenv("SCHEDULER_CATCHUP_SECONDS", "3600"))
+# A queued/running status older than this is from a run whose worker died.
+SCHEDULER_ACTIVE_RUN_SECONDS = float(os.getenv("SCHEDULER_ACTIVE_RUN_SECONDS", str(K6_RUN_MAX_SECONDS + 1800)))
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def utcnow() -> datetime:
+    """Naive UTC, the form ``LoadTestSchedule`` timestamps are stored in."""
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def validate_cron(expr: str) -> None:
+    if not croniter.is_valid(expr):
+        raise ValueError(f"invalid cron expression: {expr!r}")
+
+
+def jitter_offset(schedule_id: str, jitter_seconds: int) -> timedelta:
+    """Stable per-schedule delay in ``[0, jitter_seconds]``."""
+    if not jitter_seconds:
+        return timedelta(0)
+    digest = hashlib.sha256(schedule_id.encode()).digest()
+    return timedelta(seconds=int.from_bytes(digest[:8], "big") % (jitter_seconds + 1))
+
+
+def next_fire(cron: str, after: datetime, schedule_id: str, jitter_seconds: int) -> datetime:
+    """First fire time (cron time + offset) strictly after ``after``."""
+    offset = jitter_offset(schedule_id, jitter_seconds)
+    return croniter(cron, after - offset).get_next(datetime) + offset
+
+
+def prev_fire(cron: str, before: datetime, schedule_id: str, jitter_seconds: int) -> datetime:
+    """Latest fire time strictly before ``before``."""
+    offset = jitter_offset(schedule_id, jitter_seconds)
+    return croniter(cron, before - offset).get_prev(datetime) + offset
+
+
+class Scheduler:
+    """Fires due schedules into ``queue``; ``run(schedule, run_id)`` executes one."""
+
+    def __init__(self, queue, run, poll_seconds: float = SCHEDULER_POLL_SECONDS):
+        self.queue = queue
+        self.run = run
+        self.poll_seconds = poll_seconds
+        # A slot this late was missed (backend down or blocked), not just polled late.
+        self.misfire_grace = max(60.0, 2 * poll_seconds)
+        self._task = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("scheduler: tick failed")
+            await asyncio.sleep(self.poll_seconds)
+
+    async def tick(self, now: datetime | None = None) -> list[str]:
+        """Claim and dispatch every due slot; returns the ids of queued schedules."""
+        now = now or utcnow()
+        queued = []
+        async with SessionLocal() as session:
+            result = await session.execute(
+                select(LoadTestSchedule)
+                .where(LoadTestSchedule.enabled.is_(True), LoadTestSchedule.next_run_at <= now)
+                .order_by(LoadTestSchedule.next_run_at)
+            )
+            for schedule in result.scalars().all():
+                slot = schedule.next_run_at
+                claim = await session.execute(
+                    update(LoadTestSchedule)
+                    .where(LoadTestSchedule.id == schedule.id, LoadTestSchedule.next_run_at == slot)
+                    .values(next_run_at=next_fire(schedule.cron, now, schedule.id, schedule.jitter_seconds))
+                    .execution_options(synchronize_session=False)
+                )
+                if claim.rowcount != 1:
+                    continue  # fired by another worker
+
+                # The claim holds the row until commit, so a queued run's own
+                # status updates land after the ones written here.
+                status = self._dispatch(schedule, slot, now)
+                values = {"last_status": status}
+                if status == "queued":
+                    values.update(last_run_at=now, last_error=None)
+                    queued.append(schedule.id)
+                await session.execute(
+                    update(LoadTestSchedule)
+                    .where(LoadTestSchedule.id == schedule.id)
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+        return queued
+
+    def _dispatch(self, schedule: LoadTestSchedule, slot: datetime, now: datetime) -> str:
+        latest = max(slot, prev_fire(schedule.cron, now, schedule.id, schedule.jitter_seconds))
+        late = (now - latest).total_seconds()
+        if late > self.misfire_grace and (not schedule.catch_up or late > SCHEDULER_CATCHUP_SECONDS):
+            return "missed"
+        if self.still_active(schedule, now):
+            return "skipped_overlap"
+        return self.submit(schedule)
+
+    @staticmethod
+    def still_active(schedule: LoadTestSchedule, now: datetime) -> bool:
+        """Whether the schedule's previous run is queued or running on any worker."""
+        # Status rows are shared by all workers, unlike the run queue.
+        if schedule.last_status not in ACTIVE_STATUSES or schedule.last_run_at is None:
+            return False
+        return (now - schedule.last_run_at).total_seconds() < SCHEDULER_ACTIVE_RUN_SECONDS
+
+    def submit(self, schedule: LoadTestSchedule) -> str:
+        """Queue a run of ``schedule`` now; returns the resulting ``last_status``."""
+        try:
+            self.queue.submit(
+                schedule.target, f"schedule {schedule.name}", partial(self._execute, schedule.id), user_id=schedule.user_id
+            )
+        except TargetBusy:
+            return "skipped_overlap"
+        except RunQueueFull:
+            return "skipped_queue_full"
+        return "queued"
+
+    async def _execute(self, schedule_id: str) -> None:
+        async with SessionLocal() as session:
+            schedule = await session.get(LoadTestSchedule, schedule_id)
+        if schedule is None:
+            return  # deleted while queued
+        run_id = str(uuid.uuid4())
+        await self._record(schedule_id, last_status="running", last_run_id=run_id)
+        try:
+            await self.run(schedule, run_id)
+        except Exception as exc:
+            detail = getattr(exc, "detail", None) or str(exc) or type(exc).__name__
+            await self._record(schedule_id, last_status="failed", last_error=str(detail)[:2000])
+            raise
+        await self._record(schedule_id, last_status="finished", last_error=None)
+
+    async def _record(self, schedule_id: str, **values) -> None:
+        async with SessionLocal() as session:
+            await session.execute(
+                update(LoadTestSchedule)
+                .where(LoadTestSchedule.id == schedule_id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
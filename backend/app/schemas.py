@@ -1,14 +1,88 @@
 from pydantic import AnyUrl, BaseModel, EmailStr
-from typing import List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 class Stage(BaseModel):
     target: int
     duration: str
 
+class AbortPolicy(BaseModel):
+    # Stop the run when a limit is exceeded on every poll for for_seconds;
+    # unset fields fall back to the K6_ABORT_* settings.
+    error_rate: Optional[float] = None
+    p95_ms: Optional[float] = None
+    for_seconds: Optional[float] = None
+    grace_seconds: Optional[float] = None
+
+
 class RunRequest(BaseModel):
     project_name: str
     url: AnyUrl
+    # ramping-vus: VU targets; ramping-arrival-rate: iterations per time_unit.
+    stages: List[Stage] = []
+    # False: final metrics come from k6's summary only (no per-second timeline),
+    # which skips writing and parsing every sample.
+    include_timeline: bool = True
+    executor: Literal["ramping-vus", "constant-arrival-rate", "ramping-arrival-rate"] = "ramping-vus"
+    # Arrival-rate executors only (see k6_runner.build_scenario).
+    rate: Optional[int] = None
+    duration: Optional[str] = None
+    time_unit: str = "1s"
+    start_rate: int = 0
+    pre_allocated_vus: Optional[int] = None
+    max_vus: Optional[int] = None
+    abort: Optional[AbortPolicy] = None
+    # Admins only: sample a per-stage profile of the report pipeline (see app.profiler).
+    profile: bool = False
+
+
+class CapacityRequest(BaseModel):
+    project_name: str
+    url: AnyUrl
+    # Iterations (requests) per second of the first step and the search ceiling.
+    start_rate: int = 10
+    max_rate: int = 1000
+    # Rate multiplier between passing steps until the first failure.
+    growth: float = 2.0
+    step_duration: Optional[str] = None
+    max_steps: Optional[int] = None
+    # SLO; unset limits fall back to the scoring thresholds.
+    p95_ms: Optional[float] = None
+    error_rate: Optional[float] = None
+    pre_allocated_vus: Optional[int] = None
+    max_vus: Optional[int] = None
+
+
+class ScheduleCreate(BaseModel):
+    # Cron expression in UTC, e.g. "0 2 * * *" (nightly at 02:00).
+    cron: str
+    run: RunRequest
+    name: Optional[str] = None  # defaults to run.project_name
+    enabled: bool = True
+    # Fixed per-schedule delay of up to this many seconds after the cron time;
+    # None uses SCHEDULER_JITTER_SECONDS.
+    jitter_seconds: Optional[int] = None
+    # Fire once after downtime for slots missed within SCHEDULER_CATCHUP_SECONDS.
+    catch_up: bool = True
+
+
+class ScheduleUpdate(BaseModel):
+    cron: Optional[str] = None
+    run: Optional[RunRequest] = None
+    name: Optional[str] = None
+    enabled: Optional[bool] = None
+    jitter_seconds: Optional[int] = None
+    catch_up: Optional[bool] = None
+
+
+class AgentRunRequest(BaseModel):
+    url: str
     stages: List[Stage]
+    pinned_ips: Dict[str, str] = {}
+    segment: Optional[str] = None
+    segment_sequence: Optional[str] = None
+    output_format: Optional[Literal["json", "csv"]] = None
+    scenario: Optional[Dict[str, Any]] = None
+    abort_policy: Optional[Dict[str, Any]] = None
 
 
 class LoginPayload(BaseModel):
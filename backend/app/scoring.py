@@ -3,6 +3,9 @@ import os
 SUCCESS_RATE_THRESHOLD = float(os.getenv("THRESHOLD_SUCCESS_RATE", 0.95))
 ERROR_RATE_THRESHOLD = float(os.getenv("THRESHOLD_ERROR_RATE", 0.1))
 P90_THRESHOLD_MS = float(os.getenv("THRESHOLD_P90_MS", 1500))
+DROPPED_RATE_THRESHOLD = float(os.getenv("THRESHOLD_DROPPED_RATE", 0.01))
+# Latency limit for SLO checks (capacity search); defaults to the p90 limit.
+P95_SLO_MS = float(os.getenv("THRESHOLD_P95_MS", P90_THRESHOLD_MS))
 
 
 def calculate_score(metrics: dict):
@@ -27,6 +30,12 @@ def calculate_score(metrics: dict):
 
     p90 = duration.get("p(90)") or duration.get("p(95)")
 
+    # Arrival-rate runs: iterations k6 could not start because every VU was
+    # busy. The target never saw that load, so it counts against the score.
+    dropped = int(metrics.get("dropped_iterations", {}).get("count", 0))
+    started = int(metrics.get("http_reqs", {}).get("count", 0))
+    dropped_rate = round(dropped / (dropped + started), 4) if dropped else 0
+
     if p90 is None or error_rate is None or success_rate is None:
         return {
             "p90": None,
@@ -48,6 +57,9 @@ def calculate_score(metrics: dict):
     if p90 > P90_THRESHOLD_MS:
         score -= min((p90 - P90_THRESHOLD_MS) / 50, 40)
 
+    if dropped_rate > DROPPED_RATE_THRESHOLD:
+        score -= min((dropped_rate - DROPPED_RATE_THRESHOLD) * 100, 30)
+
     score = max(0, round(score, 2))
 
     if score >= 90:
@@ -67,8 +79,49 @@ def calculate_score(metrics: dict):
         "p90": p90,
         "error_rate": error_rate,
         "success_rate": success_rate,
+        "dropped_iterations": dropped,
+        "dropped_rate": dropped_rate,
         "grade": grade,
         "score": score,
         "risk": risk
     }
 
+
+
+def evaluate_slo(metrics: dict, p95_ms=None, error_rate=None, dropped_rate=None) -> dict:
+    """Pass/fail of one run's aggregates against a latency/error SLO.
+
+    Limits default to ``THRESHOLD_P95_MS``, ``THRESHOLD_ERROR_RATE`` and
+    ``THRESHOLD_DROPPED_RATE``; a run without latency data fails.
+    """
+    p95_ms = P95_SLO_MS if p95_ms is None else p95_ms
+    error_rate = ERROR_RATE_THRESHOLD if error_rate is None else error_rate
+    dropped_rate = DROPPED_RATE_THRESHOLD if dropped_rate is None else dropped_rate
+
+    p95 = metrics.get("http_req_duration", {}).get("p(95)")
+    if "http_req_failed" in metrics:
+        errors = metrics["http_req_failed"].get("rate") or 0
+    else:
+        errors = metrics.get("checks", {}).get("error_rate") or 0
+    dropped = int(metrics.get("dropped_iterations", {}).get("count", 0))
+    started = int(metrics.get("http_reqs", {}).get("count", 0))
+    dropped_share = dropped / (dropped + started) if dropped else 0
+
+    violations = []
+    if p95 is None:
+        violations.append("no_latency_data")
+    elif p95 > p95_ms:
+        violations.append("p95")
+    if errors > error_rate:
+        violations.append("error_rate")
+    if dropped_share > dropped_rate:
+        violations.append("dropped_iterations")
+
+    return {
+        "passed": not violations,
+        "violations": violations,
+        "p95": p95,
+        "error_rate": round(errors, 4),
+        "dropped_rate": round(dropped_share, 4),
+        "limits": {"p95_ms": p95_ms, "error_rate": error_rate, "dropped_rate": dropped_rate},
+    }
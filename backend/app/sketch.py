@@ -0,0 +1,126 @@
+"""Mergeable latency sketch with bounded relative error (DDSketch-style).
+
+Values are counted in logarithmic buckets: bucket ``i`` covers
+``(gamma**(i-1), gamma**i]`` with ``gamma = (1 + alpha) / (1 - alpha)``, so a
+quantile is returned within ``alpha`` relative error whatever the sample
+count. Sketches with the same ``alpha`` merge by adding bucket counts, which
+is how per-run latency distributions are pooled into a baseline.
+"""
+import math
+import os
+
+import numpy as np
+
+SKETCH_RELATIVE_ACCURACY = float(os.getenv("SKETCH_RELATIVE_ACCURACY", "0.01"))
+# Values at or below this (ms) share one bucket.
+_MIN_VALUE = 1e-3
+
+
+class LatencySketch:
+    def __init__(self, alpha: float = SKETCH_RELATIVE_ACCURACY):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    @classmethod
+    def from_values(cls, values, alpha: float = SKETCH_RELATIVE_ACCURACY) -> "LatencySketch":
+        sketch = cls(alpha)
+        arr = np.asarray(values, dtype=float)
+        if not arr.size:
+            return sketch
+        positive = arr[arr > _MIN_VALUE]
+        sketch.zero = int(arr.size - positive.size)
+        if positive.size:
+            keys, counts = np.unique(np.ceil(np.log(positive) / sketch._log_gamma).astype(np.int64), return_counts=True)
+            sketch.buckets = {int(k): int(c) for k, c in zip(keys, counts)}
+        sketch.count = int(arr.size)
+        sketch.sum = float(arr.sum())
+        sketch.min = float(arr.min())
+        sketch.max = float(arr.max())
+        return sketch
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value > _MIN_VALUE:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        else:
+            self.zero += count
+        self.count += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "LatencySketch") -> "LatencySketch":
+        """Add ``other``'s counts into this sketch (same ``alpha`` required)."""
+        if not math.isclose(self.alpha, other.alpha):
+            raise ValueError("cannot merge sketches with different relative accuracy")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zero += other.zero
+        self.count += other.count
+        self.sum += other.sum
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def _value(self, key: int) -> float:
+        # Midpoint of the bucket in the relative-error sense.
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def _arrays(self):
+        keys = sorted(self.buckets)
+        values = np.array([0.0] + [self._value(k) for k in keys])
+        counts = np.array([self.zero] + [self.buckets[k] for k in keys], dtype=float)
+        return values, counts
+
+    def quantile(self, q: float) -> float | None:
+        """Value at quantile ``q`` (0..1), clamped to the observed min/max."""
+        if not self.count:
+            return None
+        values, counts = self._arrays()
+        rank = q * (self.count - 1)
+        index = int(np.searchsorted(np.cumsum(counts), rank, side="right"))
+        value = values[min(index, len(values) - 1)]
+        return float(min(max(value, self.min), self.max))
+
+    @property
+    def mean(self) -> float | None:
+        return self.sum / self.count if self.count else None
+
+    def bootstrap(self, q: float, rounds: int, rng: np.random.Generator) -> np.ndarray:
+        """Quantile ``q`` of ``rounds`` multinomial resamples of the sketch."""
+        values, counts = self._arrays()
+        draws = rng.multinomial(self.count, counts / counts.sum(), size=rounds)
+        cumulative = np.cumsum(draws, axis=1)
+        index = (cumulative > q * (self.count - 1)).argmax(axis=1)
+        return np.clip(values[index], self.min, self.max)
+
+    def to_dict(self) -> dict:
+        return {
+            "alpha": self.alpha,
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "min": self.min,
+            "max": self.max,
+            "zero": self.zero,
+            # JSON object keys are strings.
+            "buckets": {str(k): c for k, c in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LatencySketch":
+        sketch = cls(data["alpha"])
+        sketch.buckets = {int(k): int(c) for k, c in (data.get("buckets") or {}).items()}
+        sketch.zero = int(data.get("zero", 0))
+        sketch.count = int(data.get("count", 0))
+        sketch.sum = float(data.get("sum", 0.0))
+        sketch.min = data.get("min")
+        sketch.max = data.get("max")
+        return sketch
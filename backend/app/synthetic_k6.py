@@ -0,0 +1,332 @@
+"""Deterministic synthetic k6 output for offline parser and pipeline work.
+
+``synthetic_points`` yields the samples k6 emits for the builder script
+(``http_reqs``, the ``http_req_*`` timings, ``checks``, ``success``/``errors``,
+``iterations``, ``data_*`` and once per second ``vus``/``vus_max``) for a
+load profile of your choice:
+
+- rate: constant ``rps`` or linear ramps over ``stages`` (``[(seconds, rps)]``)
+- latency: lognormal around ``latency_median_ms`` (spread ``latency_sigma``),
+  with a ``slow_fraction`` of requests ``slow_factor`` times slower for a
+  heavier tail
+- errors: ``error_rate`` plus ``bursts`` (``[(start_s, length_s, error_rate,
+  latency_factor)]``) during which the target fails and slows down
+- tags: requests spread over ``tag_cardinality`` distinct URLs (skewed, so a
+  few are hot), each its own ``url``/``name`` tag value
+
+The same arguments (and ``seed``) always give the same samples; only
+``start`` moves the timestamps. ``write_ndjson``/``write_csv`` render them
+as k6 ``--out json`` / ``--out csv`` files and ``Summary`` accumulates the
+``--summary-export`` document. ``app.fake_k6`` replays them as a k6 binary.
+"""
+import argparse
+import bisect
+import csv
+import gzip
+import itertools
+import json
+import math
+import random
+from datetime import datetime, timezone
+
+import numpy as np
+
+METRIC_TYPES = {
+    "http_reqs": ("counter", "default"),
+    "http_req_duration": ("trend", "time"),
+    "http_req_blocked": ("trend", "time"),
+    "http_req_connecting": ("trend", "time"),
+    "http_req_tls_handshaking": ("trend", "time"),
+    "http_req_sending": ("trend", "time"),
+    "http_req_waiting": ("trend", "time"),
+    "http_req_receiving": ("trend", "time"),
+    "http_req_failed": ("rate", "default"),
+    "data_sent": ("counter", "data"),
+    "data_received": ("counter", "data"),
+    "checks": ("rate", "default"),
+    "success": ("rate", "default"),
+    "errors": ("rate", "default"),
+    "iteration_duration": ("trend", "time"),
+    "iterations": ("counter", "default"),
+    "vus": ("gauge", "default"),
+    "vus_max": ("gauge", "default"),
+}
+CSV_HEADER = [
+    "metric_name", "timestamp", "metric_value", "check", "error", "error_code", "expected_response",
+    "group", "method", "name", "proto", "scenario", "service", "status", "subproto", "tls_version",
+    "url", "extra_tags", "metadata",
+]
+SCENARIO_TAGS = {"scenario": "Scenario_1"}
+# Samples per request (``vus``/``vus_max`` add two per second).
+POINTS_PER_REQUEST = 16
+
+
+def rate_at(t: float, rps: float, stages, start_rps: float = 0.0) -> float:
+    """Target requests/s at ``t`` seconds: ``rps``, or the linear ramp through ``stages``."""
+    if not stages:
+        return rps
+    elapsed, previous = 0.0, start_rps
+    for seconds, target in stages:
+        if t < elapsed + seconds:
+            return previous + (target - previous) * (t - elapsed) / seconds if seconds else target
+        elapsed, previous = elapsed + seconds, target
+    return 0.0
+
+
+def profile_seconds(duration: float | None, stages) -> float:
+    return sum(seconds for seconds, _ in stages) if stages else float(duration or 0)
+
+
+def _url_picker(rng: random.Random, base_url: str, cardinality: int):
+    if cardinality <= 1:
+        return lambda: base_url
+    urls = [f"{base_url.rstrip('/')}/items/{i}" for i in range(cardinality)]
+    # Zipf-like skew: low indexes are hit far more often than the tail.
+    weights = list(itertools.accumulate(1 / (i + 1) for i in range(cardinality)))
+    return lambda: urls[min(cardinality - 1, bisect.bisect_left(weights, rng.random() * weights[-1]))]
+
+
+def synthetic_points(
+    duration: float | None = 60,
+    rps: float = 50.0,
+    stages=None,
+    start_rps: float = 0.0,
+    latency_median_ms: float = 80.0,
+    latency_sigma: float = 0.4,
+    slow_fraction: float = 0.0,
+    slow_factor: float = 8.0,
+    error_rate: float = 0.005,
+    bursts=(),
+    tag_cardinality: int = 1,
+    url: str = "https://example.com/",
+    vus: int | None = None,
+    seed: int = 1,
+    start: float | None = None,
+):
+    """Yield ``(metric, epoch_seconds, value, tags)`` in time order, second by second.
+
+    ``start`` is the unix time of the first second (default 2026-01-01 00:00 UTC).
+    """
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp() if start is None else start
+    total = profile_seconds(duration, stages)
+    pick_url = _url_picker(rng, url, tag_cardinality)
+    log_median = math.log(latency_median_ms)
+    carry = 0.0
+
+    for second in range(math.ceil(total)):
+        base = start + second
+        target = max(0.0, rate_at(second + 0.5, rps, stages, start_rps))
+        # Fractional rates accumulate, so 0.5 rps is one request every other second.
+        carry += target * min(1.0, total - second)
+        count = int(carry)
+        carry -= count
+        active_vus = vus or max(1, math.ceil(target * latency_median_ms / 1000))
+        yield "vus", base, active_vus, SCENARIO_TAGS
+        yield "vus_max", base, active_vus, SCENARIO_TAGS
+
+        fail_p, slow_by = error_rate, 1.0
+        for burst_start, length, burst_rate, latency_factor in bursts:
+            if burst_start <= second < burst_start + length:
+                fail_p, slow_by = burst_rate, latency_factor
+        for i in range(count):
+            ts = base + (i + rng.random()) / count
+            duration_ms = rng.lognormvariate(log_median, latency_sigma) * slow_by
+            if slow_fraction and rng.random() < slow_fraction:
+                duration_ms *= slow_factor
+            ok = rng.random() >= fail_p
+            target_url = pick_url()
+            tags = {
+                "expected_response": "true" if ok else "false",
+                "group": "",
+                "method": "GET",
+                "name": target_url,
+                "proto": "HTTP/1.1",
+                "scenario": "Scenario_1",
+                "status": "200" if ok else "503",
+                "tls_version": "tls1.3",
+                "url": target_url,
+            }
+            connecting = rng.random() * 2 if rng.random() < 0.02 else 0.0
+            waiting = duration_ms * 0.9
+            yield "http_reqs", ts, 1, tags
+            yield "http_req_duration", ts, duration_ms, tags
+            yield "http_req_blocked", ts, connecting * 1.5, tags
+            yield "http_req_connecting", ts, connecting, tags
+            yield "http_req_tls_handshaking", ts, connecting * 3, tags
+            yield "http_req_sending", ts, duration_ms * 0.01, tags
+            yield "http_req_waiting", ts, waiting, tags
+            yield "http_req_receiving", ts, duration_ms - waiting - duration_ms * 0.01, tags
+            yield "http_req_failed", ts, 0 if ok else 1, tags
+            yield "data_sent", ts, 92, SCENARIO_TAGS
+            yield "data_received", ts, 1256 if ok else 180, SCENARIO_TAGS
+            yield "checks", ts, 1 if ok else 0, {"check": "status is 200", **SCENARIO_TAGS}
+            yield "success", ts, 1 if ok else 0, SCENARIO_TAGS
+            yield "errors", ts, 0 if ok else 1, SCENARIO_TAGS
+            yield "iteration_duration", ts, duration_ms + 0.5, SCENARIO_TAGS
+            yield "iterations", ts, 1, SCENARIO_TAGS
+
+
+def ndjson_lines(points, declared: set | None = None):
+    """k6 ``--out json`` lines; a ``Metric`` line precedes each metric's first point."""
+    declared = set() if declared is None else declared
+    for metric, ts, value, tags in points:
+        if metric not in declared:
+            declared.add(metric)
+            kind, contains = METRIC_TYPES.get(metric, ("counter", "default"))
+            yield json.dumps({
+                "type": "Metric",
+                "data": {"name": metric, "type": kind, "contains": contains, "thresholds": [], "submetrics": None},
+                "metric": metric,
+            }) + "\n"
+        yield json.dumps({
+            "metric": metric,
+            "type": "Point",
+            "data": {
+                "time": datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="microseconds"),
+                "value": value,
+                "tags": tags,
+            },
+        }) + "\n"
+
+
+def csv_rows(points, time_format: str = "unix_milli"):
+    """k6 ``--out csv`` rows (without the header) in ``K6_CSV_TIME_FORMAT``."""
+    for metric, ts, value, tags in points:
+        if time_format == "unix_milli":
+            stamp = str(int(ts * 1000))
+        elif time_format == "rfc3339_nano":
+            stamp = datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="microseconds")
+        else:
+            stamp = str(int(ts))
+        row = {"metric_name": metric, "timestamp": stamp, "metric_value": f"{value:.6f}", **tags}
+        yield [row.get(column, "") for column in CSV_HEADER]
+
+
+def write_ndjson(path: str, points) -> None:
+    with open(path, "w") as f:
+        f.writelines(ndjson_lines(points))
+
+
+def write_csv(path: str, points, time_format: str = "unix_milli") -> None:
+    """Gzipped when ``path`` ends in ``.gz``, as k6 does."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(csv_rows(points, time_format))
+
+
+# k6's default ``summaryTrendStats``.
+DEFAULT_TREND_STATS = ("avg", "min", "med", "max", "p(90)", "p(95)")
+
+
+def _trend_stat(arr, stat: str) -> float:
+    if stat == "avg":
+        return float(arr.mean())
+    if stat == "min":
+        return float(arr.min())
+    if stat == "max":
+        return float(arr.max())
+    if stat == "med":
+        return float(np.percentile(arr, 50))
+    return float(np.percentile(arr, float(stat[2:-1])))
+
+
+class Summary:
+    """Accumulates points into the k6 ``--summary-export`` document."""
+
+    def __init__(self):
+        self.durations = []
+        self.requests = 0
+        self.passes = 0
+        self.fails = 0
+        self.first = None
+        self.last = None
+
+    def add(self, metric: str, ts: float, value: float) -> None:
+        if metric == "http_req_duration":
+            self.durations.append(value)
+        elif metric == "http_reqs":
+            self.requests += 1
+            self.first = ts if self.first is None else min(self.first, ts)
+            self.last = ts if self.last is None else max(self.last, ts)
+        elif metric == "checks":
+            if value:
+                self.passes += 1
+            else:
+                self.fails += 1
+
+    def export(self, elapsed: float | None = None, trend_stats=DEFAULT_TREND_STATS) -> dict:
+        elapsed = elapsed or ((self.last - self.first) if self.requests > 1 else 0)
+        metrics = {
+            "http_reqs": {"count": self.requests, "rate": self.requests / elapsed if elapsed else 0},
+            "checks": {
+                "passes": self.passes,
+                "fails": self.fails,
+                "value": self.passes / (self.passes + self.fails) if self.passes + self.fails else 0,
+            },
+        }
+        if self.durations:
+            arr = np.array(self.durations)
+            metrics["http_req_duration"] = {stat: _trend_stat(arr, stat) for stat in trend_stats}
+        return {"metrics": metrics}
+
+
+def parse_bursts(spec: str) -> list[tuple]:
+    """``"30:10:0.5:3,90:5:1"`` -> ``[(30, 10, 0.5, 3.0), (90, 5, 1.0, 1.0)]`` (start:length:error_rate[:latency_factor])."""
+    bursts = []
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        fields = [float(x) for x in part.split(":")]
+        if len(fields) not in (3, 4):
+            raise ValueError(f"invalid burst: {part!r}")
+        bursts.append((fields[0], fields[1], fields[2], fields[3] if len(fields) == 4 else 1.0))
+    return bursts
+
+
+def parse_stages(spec: str) -> list[tuple]:
+    """``"30:100,60:100,10:0"`` -> ``[(30.0, 100.0), ...]`` (seconds:rps)."""
+    stages = []
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        seconds, target = part.split(":")
+        stages.append((float(seconds), float(target)))
+    return stages
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.synthetic_k6", description="Write synthetic k6 output.")
+    parser.add_argument("path", help="output file: .json for NDJSON, .csv or .csv.gz for CSV")
+    parser.add_argument("--duration", type=float, default=60, help="seconds (ignored with --stages)")
+    parser.add_argument("--rps", type=float, default=50)
+    parser.add_argument("--stages", default="", help="seconds:rps ramps, e.g. 30:100,60:100,10:0")
+    parser.add_argument("--latency-ms", type=float, default=80, help="median request duration")
+    parser.add_argument("--latency-sigma", type=float, default=0.4)
+    parser.add_argument("--slow-fraction", type=float, default=0.0)
+    parser.add_argument("--slow-factor", type=float, default=8.0)
+    parser.add_argument("--error-rate", type=float, default=0.005)
+    parser.add_argument("--bursts", default="", help="start:length:error_rate[:latency_factor], comma separated")
+    parser.add_argument("--tag-cardinality", type=int, default=1)
+    parser.add_argument("--url", default="https://example.com/")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    points = synthetic_points(
+        duration=args.duration,
+        rps=args.rps,
+        stages=parse_stages(args.stages),
+        latency_median_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        slow_fraction=args.slow_fraction,
+        slow_factor=args.slow_factor,
+        error_rate=args.error_rate,
+        bursts=parse_bursts(args.bursts),
+        tag_cardinality=args.tag_cardinality,
+        url=args.url,
+        seed=args.seed,
+    )
+    name = args.path[:-3] if args.path.endswith(".gz") else args.path
+    (write_csv if name.endswith(".csv") else write_ndjson)(args.path, points)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import delete, select
+
+from .models import LoadTestTimeline
+
+
+def _bucket_epoch(label: str) -> int:
+    ts = datetime.fromisoformat(label.replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp())
+
+
+def parse_time_bound(value: Optional[str]) -> Optional[int]:
+    """Parse a timeline range bound given as unix seconds or an ISO timestamp."""
+    if value is None or value == "":
+        return None
+    value = value.strip()
+    try:
+        return int(float(value))
+    except ValueError:
+        pass
+    try:
+        return _bucket_epoch(value)
+    except ValueError as exc:
+        raise ValueError(f"invalid time bound: {value}") from exc
+
+
+def timeline_rows(run_id: str, timeline: dict) -> list[LoadTestTimeline]:
+    """Flatten a parsed ``timeline`` dict into one row per second bucket."""
+    if not isinstance(timeline, dict):
+        return []
+
+    latency = timeline.get("latency") or {}
+    requests = timeline.get("requests") or {}
+    checks = timeline.get("checks") or {}
+    generator = timeline.get("generator") or {}
+
+    rows: dict[int, LoadTestTimeline] = {}
+    for label in set(latency) | set(requests) | set(checks) | set(generator):
+        try:
+            ts = _bucket_epoch(label)
+        except ValueError:
+            continue
+        row = rows.get(ts)
+        if row is None:
+            row = rows[ts] = LoadTestTimeline(run_id=run_id, ts=ts, bucket=label)
+        if label in latency:
+            row.latency = list(latency[label])
+        if label in requests:
+            row.requests = float(requests[label])
+        if label in checks:
+            row.checks_pass = int(checks[label].get("pass", 0))
+            row.checks_fail = int(checks[label].get("fail", 0))
+        if label in generator:
+            row.generator = (row.generator or []) + list(generator[label])
+
+    return [rows[ts] for ts in sorted(rows)]
+
+
+def filter_timeline(timeline: dict, start: Optional[int] = None, end: Optional[int] = None) -> dict:
+    """Apply a ``[start, end]`` range to a legacy in-blob timeline."""
+    if not isinstance(timeline, dict) or (start is None and end is None):
+        return timeline
+
+    def _keep(label: str) -> bool:
+        try:
+            ts = _bucket_epoch(label)
+        except ValueError:
+            return False
+        if start is not None and ts < start:
+            return False
+        if end is not None and ts > end:
+            return False
+        return True
+
+    return {
+        key: {label: v for label, v in series.items() if _keep(label)} if isinstance(series, dict) else series
+        for key, series in timeline.items()
+    }
+
+
+def add_timeline(session, run_id: str, timeline: dict) -> int:
+    rows = timeline_rows(run_id, timeline)
+    session.add_all(rows)
+    return len(rows)
+
+
+async def load_timeline(
+    session,
+    run_id: str,
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+) -> Optional[dict]:
+    """Load a run timeline from ``load_test_timelines``.
+
+    Returns None when the run has no stored rows (e.g. runs saved before the
+    timeline table existed), so callers can fall back to the legacy blob.
+    """
+    stmt = select(LoadTestTimeline).where(LoadTestTimeline.run_id == run_id)
+    if start is not None:
+        stmt = stmt.where(LoadTestTimeline.ts >= start)
+    if end is not None:
+        stmt = stmt.where(LoadTestTimeline.ts <= end)
+    result = await session.execute(stmt.order_by(LoadTestTimeline.ts))
+    rows = result.scalars().all()
+
+    if not rows:
+        if start is None and end is None:
+            return None
+        # A range that misses every bucket is still a valid (empty) answer
+        # when the run has timeline rows at all.
+        exists = await session.execute(
+            select(LoadTestTimeline.ts).where(LoadTestTimeline.run_id == run_id).limit(1)
+        )
+        if exists.first() is None:
+            return None
+
+    timeline = {"latency": {}, "requests": {}, "checks": {}, "generator": {}}
+    for row in rows:
+        if row.latency is not None:
+            timeline["latency"][row.bucket] = row.latency
+        if row.requests is not None:
+            timeline["requests"][row.bucket] = row.requests
+        if row.checks_pass is not None or row.checks_fail is not None:
+            timeline["checks"][row.bucket] = {
+                "pass": row.checks_pass or 0,
+                "fail": row.checks_fail or 0,
+            }
+        if row.generator is not None:
+            timeline["generator"][row.bucket] = row.generator
+    return timeline
+
+
+async def delete_timeline(session, run_id: Optional[str] = None) -> None:
+    stmt = delete(LoadTestTimeline)
+    if run_id is not None:
+        stmt = stmt.where(LoadTestTimeline.run_id == run_id)
+    await session.execute(stmt)
@@ -0,0 +1,145 @@
+"""OpenTelemetry tracing of the run pipelines.
+
+Each run gets one ``run`` span (attribute ``k6ai.run_id``) with children for
+k6, every probe, every LLM attempt, PDF generation and the DB commit. Spans
+go over OTLP/HTTP to ``OTEL_EXPORTER_OTLP_ENDPOINT`` when it is set, and to
+``TRACING_FILE`` (one JSON span per line) otherwise or whenever the collector
+cannot take a batch.
+
+The pipelines are async generators, so a span is never made the current
+context across a ``yield``: children get their parent passed to ``span``,
+and ``current`` is only used around code that does not yield.
+"""
+import logging
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExportResult
+    from opentelemetry.trace import Status, StatusCode
+except ImportError:  # pragma: no cover - optional, tracing is a no-op without the SDK
+    trace = None
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() in {"1", "true", "yes"}
+TRACING_FILE = os.getenv("TRACING_FILE", os.path.join(os.getenv("RESULT_DIR", "./results"), "traces.jsonl"))
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "k6-ai-backend")
+
+_provider = None
+_tracer = None
+
+
+class _FileExporter:
+    """Appends finished spans to ``path`` as JSON lines."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans) -> "SpanExportResult":
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with self._lock, open(self.path, "a") as f:
+                for s in spans:
+                    f.write(s.to_json(indent=None) + "\n")
+        except OSError:
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+    def shutdown(self) -> None:
+        pass
+
+
+class _FallbackExporter:
+    """Exports to ``primary``; batches it fails on are written by ``fallback``."""
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+
+    def export(self, spans) -> "SpanExportResult":
+        try:
+            result = self.primary.export(spans)
+        except Exception:  # noqa: BLE001
+            result = SpanExportResult.FAILURE
+        if result == SpanExportResult.SUCCESS:
+            return result
+        return self.fallback.export(spans)
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.primary.force_flush(timeout_millis)
+
+    def shutdown(self) -> None:
+        self.primary.shutdown()
+        self.fallback.shutdown()
+
+
+def setup() -> None:
+    """Install the tracer provider; a no-op unless TRACING_ENABLED and the SDK is installed."""
+    global _provider, _tracer
+    if not TRACING_ENABLED or trace is None or _provider is not None:
+        return
+    exporter = _FileExporter(TRACING_FILE)
+    if OTLP_ENDPOINT:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logger.warning("tracing: opentelemetry-exporter-otlp-proto-http not installed, writing spans to file")
+        else:
+            exporter = _FallbackExporter(OTLPSpanExporter(), exporter)
+    _provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    _tracer = _provider.get_tracer("k6ai")
+
+
+def shutdown() -> None:
+    """Flush pending spans."""
+    global _provider, _tracer
+    if _provider is not None:
+        _provider.shutdown()
+    _provider = _tracer = None
+
+
+@contextmanager
+def span(name: str, parent=None, **attributes):
+    """Child span of ``parent`` (default: the current span); yields None when tracing is off.
+
+    ``attributes`` are recorded as ``k6ai.<name>``; None values are dropped.
+    """
+    if _tracer is None:
+        yield None
+        return
+    context = trace.set_span_in_context(parent) if parent is not None else None
+    s = _tracer.start_span(
+        name,
+        context=context,
+        attributes={f"k6ai.{key}": value for key, value in attributes.items() if value is not None},
+    )
+    try:
+        yield s
+    except Exception as exc:
+        s.record_exception(exc)
+        s.set_status(Status(StatusCode.ERROR, str(exc)))
+        raise
+    except BaseException:
+        # Stream closed by the client or the task cancelled.
+        s.set_status(Status(StatusCode.ERROR, "cancelled"))
+        raise
+    finally:
+        s.end()
+
+
+def current(s):
+    """Make ``s`` the current span for a block that does not yield."""
+    if s is None:
+        return nullcontext()
+    return trace.use_span(s, end_on_exit=False)
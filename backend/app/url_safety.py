@@ -1,14 +1,64 @@
+import asyncio
 import ipaddress
 import os
 import socket
+import time
+from dataclasses import dataclass, field
 
 import httpx
 
+try:
+    import dns.asyncresolver
+    import dns.exception
+    import dns.resolver
+except ImportError:  # pragma: no cover - optional, falls back to getaddrinfo
+    dns = None
+
+# Used as the cache lifetime when record TTLs are unknown (getaddrinfo path)
+# and as an upper bound on record TTLs otherwise.
+DNS_CACHE_TTL_SECONDS = int(os.getenv("DNS_CACHE_TTL_SECONDS", "60"))
+DNS_CACHE_MAX_ENTRIES = 1024
+
 
 class UnsafeUrlError(ValueError):
     pass
 
 
+@dataclass(frozen=True)
+class ValidatedTarget:
+    """A target URL that passed SSRF checks, plus the IPs it was validated against.
+
+    Later stages (k6, httpx, Chromium, TLS probes) connect to ``ips`` instead
+    of resolving ``host`` again, so a DNS answer that changes mid-run
+    (rebinding) cannot redirect them to a blocked network.
+    """
+
+    url: str
+    scheme: str
+    host: str
+    port: int
+    ips: tuple[str, ...] = field(default_factory=tuple)
+
+    @property
+    def ip(self) -> str | None:
+        return self.ips[0] if self.ips else None
+
+    @property
+    def pinned_ips(self) -> dict[str, str]:
+        """``{host: ip}`` for hostnames; empty when the URL already uses an IP."""
+        if not self.ip or _is_ip_literal(self.host):
+            return {}
+        return {self.host: self.ip}
+
+
+def _is_ip_literal(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+    except ValueError:
+        return False
+    return True
+
+
 def _is_ip_blocked(ip: str) -> bool:
     addr = ipaddress.ip_address(ip)
 
@@ -19,6 +69,11 @@ def _is_ip_blocked(ip: str) -> bool:
     return False
 
 
+def _ordered_ips(ips) -> tuple[str, ...]:
+    # IPv4 first: it is what k6 `hosts` and most container networks handle best.
+    return tuple(sorted(set(ips), key=lambda ip: (ipaddress.ip_address(ip).version, ip)))
+
+
 def _resolve_host(host: str) -> set[str]:
     out: set[str] = set()
     for family, _, _, _, sockaddr in socket.getaddrinfo(host, None):
@@ -29,15 +84,61 @@ def _resolve_host(host: str) -> set[str]:
     return out
 
 
-def validate_target_url(raw: str) -> str:
-    """Validate and normalize a user-provided target URL.
-
-    Security goals:
-    - only allow http/https
-    - block private/loopback/link-local/reserved IPs (SSRF)
-    - restrict ports by default (80/443)
-    """
-
+# host -> (expires_at monotonic, ips)
+_dns_cache: dict[str, tuple[float, tuple[str, ...]]] = {}
+
+
+async def _query_records(host: str) -> tuple[tuple[str, ...], int]:
+    """Resolve A/AAAA records with dnspython, returning the IPs and min TTL."""
+    resolver = dns.asyncresolver.get_default_resolver()
+    ips: list[str] = []
+    ttls: list[int] = []
+    for rdtype in ("A", "AAAA"):
+        try:
+            answer = await resolver.resolve(host, rdtype)
+        except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+            continue
+        ips.extend(r.address for r in answer)
+        if answer.rrset is not None:
+            ttls.append(answer.rrset.ttl)
+    return tuple(ips), min(ttls) if ttls else DNS_CACHE_TTL_SECONDS
+
+
+async def resolve_host_async(host: str) -> tuple[str, ...]:
+    """Resolve ``host`` without blocking the event loop, with a TTL cache."""
+    if _is_ip_literal(host):
+        return (host.strip("[]"),)
+
+    now = time.monotonic()
+    cached = _dns_cache.get(host)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    ttl = DNS_CACHE_TTL_SECONDS
+    ips: tuple[str, ...] = ()
+    if dns is not None:
+        try:
+            ips, record_ttl = await _query_records(host)
+            ttl = min(record_ttl, DNS_CACHE_TTL_SECONDS)
+        except dns.exception.DNSException:
+            ips = ()
+    if not ips:
+        # Names only known to the system resolver (e.g. /etc/hosts).
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        ips = tuple(
+            sockaddr[0] for family, _, _, _, sockaddr in infos if family in (socket.AF_INET, socket.AF_INET6)
+        )
+
+    ips = _ordered_ips(ips)
+    if ips and ttl > 0:
+        if len(_dns_cache) >= DNS_CACHE_MAX_ENTRIES:
+            _dns_cache.clear()
+        _dns_cache[host] = (now + ttl, ips)
+    return ips
+
+
+def _parse_target(raw: str) -> tuple[httpx.URL, int]:
     if not raw or not isinstance(raw, str):
         raise UnsafeUrlError("missing url")
 
@@ -57,15 +158,91 @@ def validate_target_url(raw: str) -> str:
     if allowed_ports and port not in allowed_ports:
         raise UnsafeUrlError("port not allowed")
 
-    try:
-        ips = _resolve_host(parsed.host)
-    except Exception as exc:  # noqa: BLE001
-        raise UnsafeUrlError(f"dns resolution failed: {exc}") from exc
+    return parsed, port
 
+
+def _check_ips(ips) -> None:
     if not ips:
         raise UnsafeUrlError("dns resolution returned no addresses")
     if any(_is_ip_blocked(ip) for ip in ips):
         raise UnsafeUrlError("host resolves to a blocked network")
 
+
+def validate_target_url(raw: str) -> str:
+    """Validate and normalize a user-provided target URL.
+
+    Security goals:
+    - only allow http/https
+    - block private/loopback/link-local/reserved IPs (SSRF)
+    - restrict ports by default (80/443)
+
+    Blocking; async callers should use ``resolve_target``.
+    """
+    parsed, _port = _parse_target(raw)
+
+    try:
+        ips = _resolve_host(parsed.host)
+    except Exception as exc:  # noqa: BLE001
+        raise UnsafeUrlError(f"dns resolution failed: {exc}") from exc
+
+    _check_ips(ips)
+
     # Return normalized string (keeps path/query)
     return str(parsed)
+
+
+async def resolve_target(raw: str) -> ValidatedTarget:
+    """Async ``validate_target_url`` that also returns the validated IP set."""
+    parsed, port = _parse_target(raw)
+
+    try:
+        ips = await resolve_host_async(parsed.host)
+    except Exception as exc:  # noqa: BLE001
+        raise UnsafeUrlError(f"dns resolution failed: {exc}") from exc
+
+    _check_ips(ips)
+
+    return ValidatedTarget(url=str(parsed), scheme=parsed.scheme, host=parsed.host, port=port, ips=ips)
+
+
+def chromium_resolver_flag(pinned_ips: dict[str, str] | None) -> str | None:
+    """Chromium ``--host-resolver-rules`` flag mapping pinned hosts to their IPs."""
+    if not pinned_ips:
+        return None
+    rules = []
+    for host, ip in pinned_ips.items():
+        target = f"[{ip}]" if ":" in ip else ip
+        rules.append(f"MAP {host} {target}")
+    return "--host-resolver-rules=" + ",".join(rules)
+
+
+class PinnedTransport(httpx.AsyncHTTPTransport):
+    """httpx transport that connects pinned hostnames to fixed IPs.
+
+    The request URL host is swapped for the IP while the ``Host`` header and
+    TLS SNI (and certificate verification) keep using the original hostname.
+    """
+
+    def __init__(self, pinned_ips: dict[str, str] | None = None, **kwargs):
+        super().__init__(**kwargs)
+        self.pinned_ips = dict(pinned_ips or {})
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        ip = self.pinned_ips.get(request.url.host)
+        if ip:
+            # Send a copy so the client still reports the original URL.
+            request = httpx.Request(
+                request.method,
+                request.url.copy_with(host=ip),
+                headers=request.headers,
+                stream=request.stream,
+                extensions={**request.extensions, "sni_hostname": self._original_host(request)},
+            )
+        return await super().handle_async_request(request)
+
+    @staticmethod
+    def _original_host(request: httpx.Request) -> str:
+        host = request.headers.get("host", "")
+        if host.startswith("["):
+            return host.split("]")[0].strip("[")
+        return host.split(":")[0]
@@ -0,0 +1,62 @@
+"""Bytes written and parse time: k6 NDJSON output vs gzipped CSV output.
+
+Writes the same synthetic run (``app.synthetic_k6``, the samples k6 emits
+for the generated builder script) in both formats, then times
+``parse_k6_output`` on each file.
+
+    cd backend
+    python -m benchmarks.bench_k6_output --iterations 50000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from app.k6_parser import parse_k6_output
+from app.synthetic_k6 import synthetic_points, write_csv, write_ndjson
+
+RPS = 200
+
+
+def _timed_parse(path: str, repeat: int) -> tuple[float, dict]:
+    best = float("inf")
+    result = {}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = parse_k6_output(path)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run(iterations: int, repeat: int) -> dict:
+    out = {"iterations": iterations}
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"json": os.path.join(tmp, "out.json"), "csv.gz": os.path.join(tmp, "out.csv.gz")}
+        write_ndjson(paths["json"], synthetic_points(duration=iterations / RPS, rps=RPS))
+        write_csv(paths["csv.gz"], synthetic_points(duration=iterations / RPS, rps=RPS))
+
+        for fmt, path in paths.items():
+            seconds, result = _timed_parse(path, repeat)
+            out[fmt] = {
+                "bytes": os.path.getsize(path),
+                "parse_s": round(seconds, 3),
+                "requests": result["metrics"]["http_reqs"]["count"],
+                "p95_ms": result["metrics"].get("http_req_duration", {}).get("p(95)"),
+            }
+
+    out["bytes_ratio"] = round(out["json"]["bytes"] / out["csv.gz"]["bytes"], 1)
+    out["parse_speedup"] = round(out["json"]["parse_s"] / out["csv.gz"]["parse_s"], 1)
+    return out
+
+
+def main_cli(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_k6_output")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.iterations, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,146 @@
+"""Login throughput and latency next to an active SSE stream.
+
+Starts the API in-process (uvicorn, SQLite), keeps one server-sent-event
+stream open as a stand-in for a k6 run stream, and fires a burst of logins.
+Reports login throughput/percentiles and the largest gaps seen on the stream:
+if password hashing blocks the event loop, the stream stalls.
+
+    cd backend
+    python -m benchmarks.bench_login --logins 200 --concurrency 20
+    PASSWORD_HASH_WORKERS=0 python -m benchmarks.bench_login   # inline hashing, for comparison
+
+Requires ``aiosqlite`` in addition to requirements.txt.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import time
+
+BENCH_DIR = tempfile.mkdtemp(prefix="k6-ai-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{BENCH_DIR}/bench.db")
+os.environ.setdefault("RESULT_DIR", BENCH_DIR)
+os.environ.setdefault("INITIAL_ADMIN_USERNAME", "bench")
+os.environ.setdefault("INITIAL_ADMIN_EMAIL", "bench@example.com")
+os.environ.setdefault("INITIAL_ADMIN_PASSWORD", "bench-password")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi.responses import StreamingResponse  # noqa: E402
+
+from app import main  # noqa: E402
+
+STREAM_TICK_SECONDS = 0.05
+
+
+async def _ticker():
+    while True:
+        yield f"data: {time.perf_counter()}\n\n"
+        await asyncio.sleep(STREAM_TICK_SECONDS)
+
+
+# Benchmark-only route mounted on this process' app instance.
+main.app.add_api_route(
+    "/__bench/stream",
+    lambda: StreamingResponse(_ticker(), media_type="text/event-stream"),
+)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _watch_stream(client: httpx.AsyncClient, gaps: list[float], stop: asyncio.Event):
+    async with client.stream("GET", "/__bench/stream") as resp:
+        last = time.perf_counter()
+        async for line in resp.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+            if stop.is_set():
+                break
+
+
+async def _login(client: httpx.AsyncClient, latencies: list[float], statuses: dict):
+    started = time.perf_counter()
+    resp = await client.post(
+        "/api/auth/login",
+        json={"identifier": os.environ["INITIAL_ADMIN_USERNAME"], "password": os.environ["INITIAL_ADMIN_PASSWORD"]},
+    )
+    latencies.append(time.perf_counter() - started)
+    statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+
+
+async def run(logins: int, concurrency: int) -> dict:
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    gaps: list[float] = []
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    stop = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120) as client:
+        watcher = asyncio.create_task(_watch_stream(client, gaps, stop))
+        await asyncio.sleep(0.5)
+        gaps.clear()
+
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with sem:
+                await _login(client, latencies, statuses)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        await asyncio.wait_for(watcher, timeout=5)
+
+    server.should_exit = True
+    await server_task
+
+    return {
+        "hash_workers": main.hashing_pool.workers,
+        "max_pending": main.hashing_pool.max_pending,
+        "logins": logins,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(logins / elapsed, 2) if elapsed else None,
+        "statuses": statuses,
+        "login_p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "login_p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+        "stream_tick_ms": STREAM_TICK_SECONDS * 1000,
+        "stream_gap_p99_ms": round(_percentile(gaps, 99) * 1000, 1),
+        "stream_gap_max_ms": round(max(gaps, default=0) * 1000, 1),
+    }
+
+
+def main_cli(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_login")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args(argv)
+    print(json.dumps(asyncio.run(run(args.logins, args.concurrency)), indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,353 @@
+"""Benchmark suite for the backend hot paths, compared against stored baselines.
+
+Each case is timed ``--repeat`` times (median and best are reported) and run
+once more under ``tracemalloc`` for its peak Python heap. Results are compared
+with ``benchmarks/baselines.json``: a case regresses when its best time
+(least disturbed by other load on the machine) exceeds the baseline by more
+than ``--time-tolerance`` plus ``--time-floor`` seconds or its peak memory by
+more than ``--memory-tolerance``, and the exit status is then 1. Cases loop
+their work (``_xN``) so each takes about 100 ms or more; shorter timings are
+mostly scheduler noise. A case that regresses is measured again up to
+``--retries`` times and only fails if every attempt does, so a burst of load
+from a neighbour on a shared machine does not fail the run.
+
+Inputs are synthetic and seeded (``app.synthetic_k6``, the generator the fake
+k6 binary replays),
+the database is a throwaway SQLite file (point ``DATABASE_URL`` at an empty
+scratch MySQL database to measure the list query there), and nothing touches
+the network.
+The ``parse_ndjson_*`` cases parse from a file with ``parse_k6_output``, the
+streaming path runs take (``parse_k6_ndjson`` feeds the same NDJSON decoder
+from a string, which would need the whole 10M-point output in memory).
+
+    cd backend
+    python -m benchmarks.suite                      # default cases
+    python -m benchmarks.suite --large              # adds 10M-point parsing (~3 GB of NDJSON on disk)
+    python -m benchmarks.suite -k parse -k score    # cases whose name contains a pattern
+    python -m benchmarks.suite --update-baselines   # record this machine's numbers
+
+Timings only compare on the machine that recorded the baselines; re-record
+them after moving the suite to a new machine or CI runner. Requires
+``aiosqlite`` in addition to requirements.txt.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+
+BENCH_DIR = tempfile.mkdtemp(prefix="k6-ai-suite-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{BENCH_DIR}/suite.db")
+os.environ.setdefault("RESULT_DIR", BENCH_DIR)
+os.environ.setdefault("BACKEND_API_KEY", "bench")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from app import main  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.k6_parser import parse_k6_output  # noqa: E402
+from app.migrations import upgrade_schema  # noqa: E402
+from app.models import LoadTest, User  # noqa: E402
+from app.pdf_generator import error_chart, generate, histogram_chart, latency_chart, throughput_chart  # noqa: E402
+from app.result_summary import summary_columns  # noqa: E402
+from app.scoring import calculate_score  # noqa: E402
+from app.synthetic_k6 import POINTS_PER_REQUEST, synthetic_points, write_ndjson  # noqa: E402
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+PARSE_RPS = 200
+SEEDED_RUNS = 5000
+
+CASES = {}
+
+
+def case(name: str, repeat: int = 5, large: bool = False):
+    """Register ``setup(fixtures) -> callable``; the callable is what gets measured."""
+    def register(setup):
+        CASES[name] = {"setup": setup, "repeat": repeat, "large": large}
+        return setup
+    return register
+
+
+class Fixtures:
+    """Inputs shared by several cases, built on first use."""
+
+    def __init__(self, workdir: str):
+        self.workdir = workdir
+        self.loop = asyncio.new_event_loop()
+        self._cache = {}
+
+    def _cached(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def ndjson(self, points: int) -> str:
+        def build():
+            path = os.path.join(self.workdir, f"points-{points}.json")
+            requests = max(1, points // POINTS_PER_REQUEST)
+            write_ndjson(path, synthetic_points(duration=requests / PARSE_RPS, rps=PARSE_RPS))
+            return path
+        return self._cached(("ndjson", points), build)
+
+    def report(self, size: str) -> dict:
+        """Parsed result of a short busy run (``small``) or an hour-long one (``large``)."""
+        def build():
+            seconds, rps = (60, 20) if size == "small" else (3600, 10)
+            path = os.path.join(self.workdir, f"report-{size}.json")
+            write_ndjson(path, synthetic_points(duration=seconds, rps=rps))
+            parsed = parse_k6_output(path)
+            os.remove(path)
+            parsed["scorecard"] = calculate_score(parsed.get("metrics", {}))
+            parsed["security_headers"] = {"grade": "B", "present": ["strict-transport-security"], "missing": ["content-security-policy"]}
+            parsed["ssl"] = {"rating": "A", "supported_versions": ["TLSv1.2", "TLSv1.3"]}
+            return parsed
+        return self._cached(("report", size), build)
+
+    def analysis(self, size: str) -> str:
+        paragraph = (
+            "- p95 latency stays under the SLA for most of the run; the tail widens during "
+            "the peak stage, which points at connection pool saturation on the target.\n"
+        )
+        return "## Executive summary\n" + paragraph * (10 if size == "small" else 400)
+
+    def database(self) -> dict:
+        """SQLite seeded with ``SEEDED_RUNS`` runs of two users; returns the users."""
+        def build():
+            return self.loop.run_until_complete(_seed_database())
+        return self._cached("database", build)
+
+
+async def _seed_database() -> dict:
+    async with engine.begin() as conn:
+        await conn.run_sync(upgrade_schema)
+    users = {
+        "admin": User(id=str(uuid.uuid4()), username="bench-admin", email="admin@bench", hashed_password="x", role="admin"),
+        "user": User(id=str(uuid.uuid4()), username="bench-user", email="user@bench", hashed_password="x", role="user"),
+    }
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    summary = {
+        "scorecard": {"score": 82.5, "grade": "B"},
+        "metrics": {
+            "checks": {"error_rate": 0.01},
+            "http_reqs": {"count": 12000, "rate": 200.0},
+            "http_req_duration": {"avg": 91.0, "p(95)": 180.0, "p(99)": 260.0},
+        },
+        "ssl": {"rating": "A", "supported_versions": ["TLSv1.3"]},
+    }
+    async with SessionLocal() as session:
+        session.add_all(users.values())
+        for i in range(SEEDED_RUNS):
+            owner = users["user"] if i % 4 == 0 else users["admin"]
+            session.add(LoadTest(
+                id=str(uuid.UUID(int=i)),
+                project_name=f"project-{i % 50:02d}",
+                url=f"https://example.com/{i % 7}",
+                status="completed",
+                result_json=summary,
+                user_id=owner.id,
+                username=owner.username,
+                created_at=start + timedelta(minutes=i),
+                **summary_columns(summary),
+            ))
+        await session.commit()
+    return users
+
+
+# ================= CASES =================
+
+def _parse(points: int, loops: int = 1):
+    def setup(fx: Fixtures):
+        path = fx.ndjson(points)
+
+        def run():
+            for _ in range(loops):
+                parse_k6_output(path)
+        return run
+    return setup
+
+
+case("parse_ndjson_10k_x5", repeat=10)(_parse(10_000, loops=5))
+case("parse_ndjson_1m", repeat=2)(_parse(1_000_000))
+case("parse_ndjson_10m", repeat=1, large=True)(_parse(10_000_000))
+
+
+@case("trim_metrics_for_llm_x5")
+def _trim(fx):
+    parsed = fx.report("large")
+
+    def run():
+        for _ in range(5):
+            main._trim_metrics_for_llm(parsed, max_timeline_buckets=30)
+    return run
+
+
+@case("calculate_score_x100k", repeat=10)
+def _score(fx):
+    metrics = fx.report("large")["metrics"]
+
+    def run():
+        for _ in range(100_000):
+            calculate_score(metrics)
+    return run
+
+
+def _generate(size: str):
+    def setup(fx: Fixtures):
+        payload = json.dumps(fx.report(size))
+        analysis = fx.analysis(size)
+        path = os.path.join(fx.workdir, f"{size}.pdf")
+        return lambda: generate(path, "bench", "https://example.com/", payload, analysis)
+    return setup
+
+
+case("generate_pdf_small", repeat=3)(_generate("small"))
+case("generate_pdf_large", repeat=3)(_generate("large"))
+
+
+@case("render_charts", repeat=3)
+def _charts(fx):
+    timeline = fx.report("large")["timeline"]
+
+    def run():
+        for chart in (latency_chart, throughput_chart, error_chart, histogram_chart):
+            png = chart(timeline)
+            if png:
+                os.remove(png)
+    return run
+
+
+def _list_results(role: str, **params):
+    def setup(fx: Fixtures):
+        user = fx.database()[role]
+
+        async def pages():
+            for _ in range(20):
+                main.result_count_cache.clear()  # measure the count query too
+                await main.list_results(
+                    limit=50, offset=0, cursor=None, q=params.get("q"), include_json=params.get("include_json", False),
+                    x_api_key=main.API_KEY, current_user=user,
+                )
+        return lambda: fx.loop.run_until_complete(pages())
+    return setup
+
+
+case("list_results_admin_x20", repeat=10)(_list_results("admin"))
+case("list_results_user_search_x20", repeat=10)(_list_results("user", q="project-1"))
+case("list_results_include_json_x20", repeat=10)(_list_results("admin", include_json=True))
+
+
+# ================= HARNESS =================
+
+def measure(fn, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds": round(statistics.median(times), 6),
+        "best_seconds": round(min(times), 6),
+        "peak_mb": round(peak / 2**20, 3),
+    }
+
+
+def compare(
+    result: dict, baseline: dict | None, time_tolerance: float, memory_tolerance: float, time_floor: float = 0.0
+) -> list[str]:
+    if not baseline:
+        return []
+    problems = []
+    # Absolute slack as for memory: a few ms of jitter is not a regression.
+    if result["best_seconds"] > baseline["best_seconds"] * (1 + time_tolerance) + time_floor:
+        problems.append(f"time {result['best_seconds']:.4f}s vs {baseline['best_seconds']:.4f}s")
+    # Small absolute slack so sub-MB cases do not flap.
+    if result["peak_mb"] > baseline["peak_mb"] * (1 + memory_tolerance) + 0.5:
+        problems.append(f"memory {result['peak_mb']:.1f}MB vs {baseline['peak_mb']:.1f}MB")
+    return problems
+
+
+def load_baselines(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get("cases", {})
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    parser.add_argument("-k", dest="patterns", action="append", default=[], help="only cases containing this text")
+    parser.add_argument("--large", action="store_true", help="include the large (multi-GB) cases")
+    parser.add_argument("--repeat", type=int, help="override the per-case repeat count")
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument("--update-baselines", action="store_true", help="write the results as the new baselines")
+    parser.add_argument("--time-tolerance", type=float, default=0.25)
+    parser.add_argument("--time-floor", type=float, default=0.01, help="absolute time slack in seconds")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10)
+    parser.add_argument("--retries", type=int, default=2, help="re-measure a regressing case this many times")
+    parser.add_argument("--json", dest="json_out", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    selected = [
+        name for name, spec in CASES.items()
+        if (args.large or not spec["large"]) and (not args.patterns or any(p in name for p in args.patterns))
+    ]
+    baselines = load_baselines(args.baselines)
+    fixtures = Fixtures(BENCH_DIR)
+    results = {}
+    regressions = 0
+
+    print(f"{'case':<30} {'median s':>10} {'best s':>10} {'peak MB':>9}  vs baseline")
+    try:
+        for name in selected:
+            spec = CASES[name]
+            fn = spec["setup"](fixtures)
+            baseline = baselines.get(name)
+            for _ in range(args.retries + 1):
+                result = results[name] = measure(fn, args.repeat or spec["repeat"])
+                problems = compare(result, baseline, args.time_tolerance, args.memory_tolerance, args.time_floor)
+                if not problems or args.update_baselines:
+                    break
+            regressions += bool(problems)
+            if baseline:
+                status = f"{result['best_seconds'] / baseline['best_seconds']:.2f}x time"
+                if problems:
+                    status += "  REGRESSION: " + "; ".join(problems)
+            else:
+                status = "no baseline"
+            print(f"{name:<30} {result['seconds']:>10.4f} {result['best_seconds']:>10.4f} {result['peak_mb']:>9.1f}  {status}")
+    finally:
+        fixtures.loop.run_until_complete(engine.dispose())
+        fixtures.loop.close()
+        shutil.rmtree(BENCH_DIR, ignore_errors=True)
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.update_baselines:
+        merged = {**baselines, **results}
+        with open(args.baselines, "w") as f:
+            json.dump({
+                "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "cases": dict(sorted(merged.items())),
+            }, f, indent=2)
+            f.write("\n")
+        print(f"baselines written to {args.baselines}")
+        return 0
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -89,6 +89,28 @@ export default function ResultDetail() {
 
       {/* Snapshots removed */}
 
+      {data.scorecard?.generator_saturated && (
+        <div className="border border-terminal-amber text-terminal-amber px-4 py-3 text-sm">
+          Load generator saturated ({(data.generator?.reasons ?? []).join(", ").replace(/_/g, " ") || "resource limits"}).
+          Results may reflect the k6 host rather than the target.
+        </div>
+      )}
+
+      {data.abort && (
+        <div className="border border-terminal-magenta text-terminal-magenta px-4 py-3 text-sm">
+          Run aborted after {data.abort.elapsed_s}s ({new Date(data.abort.at).toLocaleString()}):{" "}
+          {String(data.abort.reason).replace(/_/g, " ")} {data.abort.value} exceeded {data.abort.limit} for {data.abort.for_seconds}s.
+          Metrics cover the run up to the abort.
+        </div>
+      )}
+
+      {data.scorecard?.dropped_iterations > 0 && (
+        <div className="border border-terminal-amber text-terminal-amber px-4 py-3 text-sm">
+          {data.scorecard.dropped_iterations} iterations dropped ({(data.scorecard.dropped_rate * 100).toFixed(2)}%).
+          k6 ran out of VUs to start them; raise max_vus or lower the arrival rate.
+        </div>
+      )}
+
       <ResultTable metrics={data.metrics} />
 
       <div className="grid grid-cols-1 md:grid-cols-2 gap-6">
@@ -102,6 +124,43 @@ export default function ResultDetail() {
         />
       </div>
 
+      {data.capacity && (
+        <Card title="Capacity Search">
+          <div className="grid grid-cols-2 md:grid-cols-4 gap-3 sm:gap-4 mb-4">
+            <Stat label="Max RPS" value={data.capacity.max_rps ?? "N/A"} />
+            <Stat label="Step Rate" value={data.capacity.max_rate ?? "N/A"} />
+            <Stat label="Knee" value={data.capacity.knee_rate ?? "not reached"} />
+            <Stat label="Stopped" value={String(data.capacity.stopped ?? "").replace(/_/g, " ")} />
+          </div>
+          <div className="overflow-x-auto">
+            <table className="w-full text-sm">
+              <thead>
+                <tr className="text-left text-terminal-dim">
+                  <th className="py-2 pr-4">Rate/s</th>
+                  <th className="py-2 pr-4">Achieved RPS</th>
+                  <th className="py-2 pr-4">P95 (ms)</th>
+                  <th className="py-2 pr-4">Error Rate</th>
+                  <th className="py-2">Result</th>
+                </tr>
+              </thead>
+              <tbody className="divide-y divide-terminal-border">
+                {(data.capacity.curve ?? []).map((point: any) => (
+                  <tr key={point.rate}>
+                    <td className="py-2 pr-4 font-medium text-terminal-white">{point.rate}</td>
+                    <td className="py-2 pr-4 text-terminal-dim">{point.achieved_rps ?? "N/A"}</td>
+                    <td className="py-2 pr-4 text-terminal-dim">{point.p95 ?? "N/A"}</td>
+                    <td className="py-2 pr-4 text-terminal-dim">{point.error_rate}</td>
+                    <td className={point.passed ? "py-2 text-terminal-phosphor" : "py-2 text-terminal-magenta"}>
+                      {point.passed ? "PASS" : `FAIL (${(point.violations ?? []).join(", ")})`}
+                    </td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          </div>
+        </Card>
+      )}
+
       <Card title="Security Headers">
         <div className="grid grid-cols-2 md:grid-cols-4 gap-3 sm:gap-4 mb-4">
           <Stat label="Status" value={securityStatus} />
@@ -3,6 +3,7 @@
 import { useState } from "react"
 import { useRouter } from "next/navigation"
 import { useAuth } from "@/context/AuthContext"
+import { cancelRun } from "@/lib/api"
 
 interface Stage {
   duration: string
@@ -24,6 +25,8 @@ export default function RunForm() {
   const [logs, setLogs] = useState<string[]>([])
   const [showModal, setShowModal] = useState(false)
   const [progress, setProgress] = useState(0)
+  const [runId, setRunId] = useState<string | null>(null)
+  const [cancelling, setCancelling] = useState(false)
   const [steps, setSteps] = useState<Record<string, "pending" | "running" | "done" | "skip">>({
     load: "pending",
     security_headers: "pending",
@@ -84,6 +87,8 @@ export default function RunForm() {
       setLogs([])
       setShowModal(true)
       setProgress(0)
+      setRunId(null)
+      setCancelling(false)
       setSteps({
         load: "running",
         security_headers: "pending",
@@ -162,8 +167,15 @@ export default function RunForm() {
             setLogs((prev) => [...prev, message])
           }
 
+          if (message.startsWith("RUN_STARTED:")) {
+            setRunId(message.replace("RUN_STARTED:", ""))
+            return
+          }
+
           // Step markers from backend
           if (message.startsWith("PROGRESS:")) {
+            // k6 has finished; nothing left to cancel.
+            setRunId(null)
             const parts = message.split(":")
             // PROGRESS:security_headers:start
             if (parts.length >= 3) {
@@ -186,6 +198,7 @@ export default function RunForm() {
           // Success
           if (message.startsWith("RUN_ID:")) {
             const id = message.replace("RUN_ID:", "")
+            setRunId(null)
             setProgress(100)
             setSteps((prev) => ({ ...prev, load: "done", security_headers: prev.security_headers === "pending" ? "done" : prev.security_headers, ssl: prev.ssl === "pending" ? "done" : prev.ssl, wpt: prev.wpt === "pending" ? "done" : prev.wpt, lighthouse: prev.lighthouse === "pending" ? "done" : prev.lighthouse }))
 
@@ -212,6 +225,21 @@ export default function RunForm() {
     }
   }
 
+  const handleCancel = async () => {
+    if (!runId) return
+    setCancelling(true)
+    try {
+      await cancelRun(runId, token)
+      setLogs((prev) => [...prev, "Cancel requested, stopping k6..."])
+    } catch (err) {
+      setCancelling(false)
+      setToast({
+        type: "error",
+        message: "Failed to cancel run",
+      })
+    }
+  }
+
   return (
     <div className="space-y-6 relative">
 
@@ -407,6 +435,16 @@ export default function RunForm() {
                 <div key={i}>{log}</div>
               ))}
             </div>
+
+            {runId && steps.load === "running" && (
+              <button
+                onClick={handleCancel}
+                disabled={cancelling}
+                className="mt-4 border border-terminal-magenta text-terminal-magenta px-4 py-2 hover:bg-terminal-magenta hover:text-black disabled:opacity-50 self-end"
+              >
+                {cancelling ? "Cancelling..." : "Cancel Run"}
+              </button>
+            )}
           </div>
         </div>
       )}
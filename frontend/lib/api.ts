@@ -130,6 +130,7 @@ export type ResultListResponse<T = any> = {
   total: number
   limit: number
   offset: number
+  next_cursor?: string | null
   q?: string
 }
 
@@ -148,6 +149,10 @@ export async function getResult(id: string, token?: string) {
   return request(`/api/result/${id}`, {}, token)
 }
 
+export async function cancelRun(id: string, token?: string) {
+  return request(`/api/run/${id}/cancel`, { method: "POST" }, token)
+}
+
 export async function downloadResult(id: string, token?: string, variant: "load" | "security" = "load") {
   const path =
     variant === "security"